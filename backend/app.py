@@ -3,13 +3,14 @@
 提供数据查询、分析和可视化接口
 """
 
-from flask import Flask, jsonify, request, send_file
+from flask import Flask, Response, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
 import json
 import joblib
 from pathlib import Path
+from contextlib import contextmanager
 import logging
 from datetime import datetime
 import io
@@ -20,31 +21,35 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from typing import Dict, List, Any, Optional
 import random
+import sys
+
+from services.cluster_service import ClusterPredictor, load_clustering_artifacts
+from services.embedding_service import EmbeddingService, encode_typed_array, feature_matrix_hash, DEFAULT_MAX_POINTS
+from services.forecast_service import ForecastModel, ForecastLookupError, FORECAST_GROUPS
+from services.restaurant_index import RestaurantIndex, restaurants_to_records
+from services.json_provider import create_json_provider
+from services.restaurant_export import EXPORT_FORMATS, check_export_format, iter_export, export_headers
+from services.compression import ResponseCompressor
+from services.batch import parse_batch_requests, execute_batch
+from services.metrics import RequestMetrics, DataLoadTimer, PROMETHEUS_CONTENT_TYPE, record_cache, render_metrics
+
+# 在线特征转换器定义在 scripts/feature_transform.py，反序列化前需要能导入该模块
+sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+from feature_transform import FeatureTransform  # noqa: F401
 
 # 设置中文字体
 plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
 
 
-class NpEncoder(json.JSONEncoder):
-    """自定义JSON编码器，处理numpy数据类型和NaN值"""
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            if np.isnan(obj):
-                return None
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if pd.isna(obj):
-            return None
-        return super(NpEncoder, self).default(obj)
-
-
 app = Flask(__name__)
-app.json_encoder = NpEncoder
+# Flask 2.3 起 app.json_encoder 不再生效，序列化通过 JSON provider 接口注册（优先orjson，可回退标准库）
+app.json = create_json_provider(app)
 CORS(app)  # 允许跨域请求
+# 按 Accept-Encoding 协商 br/zstd/gzip 压缩响应，并缓存GeoJSON等大响应的预压缩字节
+response_compressor = ResponseCompressor(app)
+# 记录各接口的请求数、耗时和响应体积，由 /api/metrics 输出
+RequestMetrics(app)
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -54,6 +59,8 @@ logger = logging.getLogger(__name__)
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 PROCESSED_DIR = DATA_DIR / "processed"
+# 在线特征计算的单次最大记录数
+MAX_TRANSFORM_BATCH = 5000
 
 
 class DataService:
@@ -61,49 +68,200 @@ class DataService:
     
     def __init__(self):
         self.data_cache = {}
+        # 按数据版本缓存的预计算响应，数据重新加载后自动失效
+        self.payload_cache = {}
+        self.data_version = 0
+        # 数据加载完成（至少包含清洗后的餐厅数据）后为True，供就绪检查使用
+        self.is_loaded = False
+        self.embedding_service = EmbeddingService(PROCESSED_DIR / "embeddings")
         self.load_all_data()
     
     def load_all_data(self):
-        """加载所有处理后的数据"""
-        try:
-            # 加载清洗后的数据
-            cleaned_csv_path = BASE_DIR / "data" / "cleaned" / "restaurants_cleaned.csv"
-            if cleaned_csv_path.exists():
+        """
+        加载所有处理后的数据
+        
+        清洗后的餐厅数据加载成功即视为就绪；其余数据集各自独立加载，
+        某一个加载失败时记录错误并跳过，不影响其他数据集和就绪状态
+        """
+        self.data_version += 1
+        self.payload_cache.clear()
+        self.is_loaded = False
+        timer = DataLoadTimer()
+        
+        # 加载清洗后的数据
+        cleaned_csv_path = BASE_DIR / "data" / "cleaned" / "restaurants_cleaned.csv"
+        if cleaned_csv_path.exists():
+            with self._loading('cleaned', timer):
                 self.data_cache['cleaned'] = pd.read_csv(cleaned_csv_path)
                 logger.info(f"加载清洗数据: {len(self.data_cache['cleaned'])} 条记录")
-            
-            # 加载特征工程数据
-            features_path = PROCESSED_DIR / "features.joblib"
-            if features_path.exists():
+        self.is_loaded = 'cleaned' in self.data_cache
+        if self.is_loaded:
+            # 预计算各排序字段的行置换，供列表接口分页
+            with self._loading('restaurant_index', timer):
+                self.data_cache['restaurant_index'] = RestaurantIndex(self.data_cache['cleaned'], self.data_version)
+        
+        # 加载特征工程数据
+        features_path = PROCESSED_DIR / "features.joblib"
+        if features_path.exists():
+            with self._loading('features', timer):
                 self.data_cache['features'] = joblib.load(features_path)
-                logger.info(f"加载特征数据: {len(self.data_cache['features'])} 条记录")
-            
-            # 加载聚类结果
-            clustering_path = PROCESSED_DIR / "clusters.joblib"
-            if clustering_path.exists():
+                # 稀疏格式的特征产物为字典，基础特征表位于 frame
+                features = self.data_cache['features']
+                feature_rows = len(features['frame']) if isinstance(features, dict) else len(features)
+                logger.info(f"加载特征数据: {feature_rows} 条记录")
+        
+        # 加载聚类结果（优先使用紧凑格式，兼容旧版joblib）
+        clustering_manifest_path = PROCESSED_DIR / "clusters" / "manifest.json"
+        clustering_path = PROCESSED_DIR / "clusters.joblib"
+        if clustering_manifest_path.exists():
+            with self._loading('clustering', timer):
+                self.data_cache['clustering'] = load_clustering_artifacts(clustering_manifest_path.parent)
+                logger.info("加载聚类结果（紧凑格式）")
+        elif clustering_path.exists():
+            with self._loading('clustering', timer):
                 self.data_cache['clustering'] = joblib.load(clustering_path)
                 logger.info("加载聚类结果")
-            
-            # 加载预测结果
-            forecast_path = PROCESSED_DIR / "forecasts.joblib"
-            if forecast_path.exists():
+        
+        # 加载高级聚类分析结果
+        advanced_clustering_path = PROCESSED_DIR / "advanced_clustering_results.joblib"
+        if advanced_clustering_path.exists():
+            with self._loading('advanced_clustering', timer):
+                self.data_cache['advanced_clustering'] = joblib.load(advanced_clustering_path)
+                logger.info("加载高级聚类分析结果")
+        
+        # 加载聚类预测模型
+        cluster_model_path = PROCESSED_DIR / "cluster_model.joblib"
+        if cluster_model_path.exists():
+            with self._loading('cluster_model', timer):
+                self.data_cache['cluster_model'] = ClusterPredictor.load(cluster_model_path)
+                logger.info("加载聚类预测模型")
+        
+        # 加载在线特征转换器
+        feature_transform_path = PROCESSED_DIR / "feature_transform.joblib"
+        if feature_transform_path.exists():
+            with self._loading('feature_transform', timer):
+                self.data_cache['feature_transform'] = joblib.load(feature_transform_path)
+                logger.info(f"加载在线特征转换器: {len(self.data_cache['feature_transform'].feature_columns)} 个特征")
+        
+        # 加载带聚类标签的餐厅数据（用于降维嵌入）
+        clustered_path = PROCESSED_DIR / "restaurants_with_clusters.csv"
+        if clustered_path.exists():
+            with self._loading('clustered', timer):
+                clustered_columns = ['name', 'city', 'region', 'cuisine', 'price', 'stars', 'latitude', 'longitude', 'cluster']
+                self.data_cache['clustered'] = pd.read_csv(clustered_path, usecols=lambda col: col in clustered_columns)
+                logger.info(f"加载聚类餐厅数据: {len(self.data_cache['clustered'])} 条记录")
+        
+        # 加载预测结果
+        forecast_path = PROCESSED_DIR / "forecasts.joblib"
+        if forecast_path.exists():
+            with self._loading('forecasts', timer):
                 self.data_cache['forecasts'] = joblib.load(forecast_path)
                 logger.info("加载预测结果")
-            
-            # 加载GeoJSON数据
-            geojson_path = BASE_DIR / "data" / "cleaned" / "restaurants_geo.json"
-            if geojson_path.exists():
+        
+        # 加载预测模型参数（按需计算任意年数的预测）
+        forecast_models_path = PROCESSED_DIR / "forecast_models.joblib"
+        if forecast_models_path.exists():
+            with self._loading('forecast_model', timer):
+                self.data_cache['forecast_model'] = ForecastModel.load(forecast_models_path)
+                logger.info(f"加载预测模型参数: {self.data_cache['forecast_model'].get_info()}")
+        
+        # 加载GeoJSON数据
+        geojson_path = BASE_DIR / "data" / "cleaned" / "restaurants_geo.json"
+        if geojson_path.exists():
+            with self._loading('geojson', timer):
                 with open(geojson_path, 'r', encoding='utf-8') as f:
                     self.data_cache['geojson'] = json.load(f)
                 logger.info("加载GeoJSON数据")
-                
+        
+        timer.finish()
+    
+    @contextmanager
+    def _loading(self, data_type: str, timer: DataLoadTimer):
+        """
+        加载一个数据集并记录耗时；失败时记录错误并移除该数据集（不保留上一版本的数据），
+        异常不向外传播，其余数据集继续加载
+        """
+        try:
+            yield
         except Exception as e:
-            logger.error(f"加载数据时出错: {e}")
+            self.data_cache.pop(data_type, None)
+            logger.error(f"加载数据 {data_type} 时出错: {e}")
+        finally:
+            timer.lap(data_type)
     
     def get_data(self, data_type: str) -> Any:
         """获取指定类型的数据"""
         return self.data_cache.get(data_type)
     
+    def get_clustering_payload(self) -> Optional[Dict]:
+        """获取预计算的聚类分析响应（每个数据版本只构建一次）"""
+        cache_key = ('clustering', self.data_version)
+        record_cache('payload', cache_key in self.payload_cache)
+        if cache_key not in self.payload_cache:
+            # 优先使用高级聚类分析结果
+            clustering_data = self.data_cache.get('advanced_clustering') or self.data_cache.get('clustering')
+            self.payload_cache[cache_key] = build_clustering_payload(clustering_data)
+        return self.payload_cache[cache_key]
+    
+    def get_embedding_inputs(self) -> Optional[tuple]:
+        """获取用于降维嵌入的标准化特征矩阵及其哈希（每个数据版本只构建一次）"""
+        cache_key = ('embedding_matrix', self.data_version)
+        record_cache('payload', cache_key in self.payload_cache)
+        if cache_key not in self.payload_cache:
+            predictor = self.data_cache.get('cluster_model')
+            clustered_df = self.data_cache.get('clustered')
+            if predictor is None or clustered_df is None:
+                return None
+            X = np.ascontiguousarray(predictor.transform(clustered_df))
+            self.payload_cache[cache_key] = (X, feature_matrix_hash(X))
+        return self.payload_cache[cache_key]
+    
+    def get_forecast_payload(self, group_by: str, key: Optional[str], horizon: int) -> Optional[Dict]:
+        """
+        按 (分组维度, 分组键, 预测年数, 数据版本) 缓存按需计算的预测结果
+        
+        预测模型参数未加载或为空时，使用 forecasts.joblib 中预先计算的结果（预测年数固定）
+        """
+        forecast_model = self.data_cache.get('forecast_model')
+        if forecast_model is None or not forecast_model.groups:
+            return self._get_precomputed_forecast(group_by, key, horizon)
+        cache_key = ('forecast', group_by, key, horizon, self.data_version)
+        record_cache('payload', cache_key in self.payload_cache)
+        if cache_key not in self.payload_cache:
+            self.payload_cache[cache_key] = forecast_model.predict(group_by, key, horizon)
+        return self.payload_cache[cache_key]
+    
+    def _get_precomputed_forecast(self, group_by: str, key: Optional[str], horizon: int) -> Optional[Dict]:
+        """
+        从预先计算的预测结果中取出一个分组维度（或其中一个序列），格式与 ForecastModel.predict 一致
+        
+        预先计算的结果只有 forecast_years 年，其他预测年数返回ValueError；
+        分组维度有效但没有预先计算的序列时返回空的 series
+        """
+        forecast_data = self.data_cache.get('forecasts')
+        if forecast_data is None:
+            return None
+        if group_by not in FORECAST_GROUPS:
+            raise ForecastLookupError(f"未知的分组维度: {group_by}，可选: {', '.join(FORECAST_GROUPS)}")
+        parameters = forecast_data.get('forecast_parameters', {})
+        forecast_years = parameters.get('forecast_years')
+        if forecast_years is not None and horizon != forecast_years:
+            raise ValueError(f"预测模型参数未加载，只提供预先计算的 {forecast_years} 年预测，horizon必须为{forecast_years}")
+        
+        series = forecast_data.get('forecasts', {}).get(group_by, {})
+        if key is not None:
+            if key not in series:
+                raise ForecastLookupError(f"{group_by} 中不存在: {key}")
+            series = {key: series[key]}
+        
+        return {
+            'group_by': group_by,
+            'horizon': parameters.get('forecast_years'),
+            'history_range': parameters.get('history_range'),
+            'forecast_period': parameters.get('forecast_period'),
+            'series': series
+        }
+    
     def get_summary_stats(self) -> Dict:
         """获取数据摘要统计"""
         if 'cleaned' not in self.data_cache:
@@ -141,6 +299,23 @@ def health_check():
     })
 
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """就绪检查接口：数据加载完成前返回503，供负载均衡和启动脚本判断是否可以接收流量"""
+    ready = data_service.is_loaded
+    return jsonify({
+        'ready': ready,
+        'data_version': data_service.data_version,
+        'timestamp': datetime.now().isoformat()
+    }), 200 if ready else 503
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """运行指标（Prometheus文本格式）：接口耗时和响应体积、缓存命中率、筛选行数、数据加载耗时"""
+    return app.response_class(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.route('/api/summary', methods=['GET'])
 def get_summary():
     """获取数据摘要统计"""
@@ -160,127 +335,52 @@ def get_summary():
 
 @app.route('/api/restaurants', methods=['GET'])
 def get_restaurants():
-    """获取餐厅数据"""
+    """
+    获取餐厅数据
+    
+    排序使用加载时预计算的行置换，同一筛选条件的命中位置会被缓存；
+    传入上一页返回的 next_cursor 可从上一页最后一行之后继续，无需重新筛选和排序
+    
+    Query Parameters:
+        page (int): 页码，默认1（提供cursor时忽略）
+        per_page (int): 每页条数，默认50
+        sort_by (str): 排序字段 name/stars/year/city/cuisine，默认保持原始顺序
+        sort_order (str): asc 或 desc，默认asc
+        cursor (str): 上一页返回的 next_cursor
+        q, stars, region, city, cuisine, price_level, year_start, year_end: 筛选条件
+    """
     try:
         # 获取查询参数
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 50))
-        stars = request.args.get('stars')
-        region = request.args.get('region')
-        city = request.args.get('city')
-        cuisine = request.args.get('cuisine')
-        price_level = request.args.get('price_level')
-        year_start = request.args.get('year_start')
-        year_end = request.args.get('year_end')
-        search_query = request.args.get('q')  # 添加搜索查询参数
-        
-        # 调试信息
-        logger.info(f"查询参数: page={page}, per_page={per_page}, stars={stars}, region={region}, city={city}, cuisine={cuisine}")
+        sort_by = request.args.get('sort_by') or None
+        sort_order = request.args.get('sort_order', 'asc').lower()
+        cursor = request.args.get('cursor') or None
         
-        df = data_service.get_data('cleaned')
-        if df is None:
+        restaurant_index = data_service.get_data('restaurant_index')
+        if restaurant_index is None:
             return jsonify({'success': False, 'error': '数据未加载'}), 404
         
-        logger.info(f"原始数据量: {len(df)}")
-        
-        # 应用过滤器
-        filtered_df = df.copy()
-        
-        # 应用搜索查询（多字段搜索）
-        if search_query and search_query.strip():
-            search_term = search_query.strip()
-            search_condition = (
-                filtered_df['name'].str.contains(search_term, case=False, na=False) |
-                filtered_df['city'].str.contains(search_term, case=False, na=False) |
-                filtered_df['region'].str.contains(search_term, case=False, na=False) |
-                filtered_df['cuisine'].str.contains(search_term, case=False, na=False)
-            )
-            filtered_df = filtered_df[search_condition]
-            logger.info(f"搜索 '{search_term}' 后数据量: {len(filtered_df)}")
-        
-        if stars:
-            before_count = len(filtered_df)
-            filtered_df = filtered_df[filtered_df['stars'] == int(stars)]
-            logger.info(f"筛选 {stars} 星后数据量: {before_count} -> {len(filtered_df)}")
-        
-        if region:
-            before_count = len(filtered_df)
-            filtered_df = filtered_df[filtered_df['region'].str.contains(region, case=False, na=False)]
-            logger.info(f"筛选地区 '{region}' 后数据量: {before_count} -> {len(filtered_df)}")
-        
-        if city:
-            before_count = len(filtered_df)
-            filtered_df = filtered_df[filtered_df['city'].str.contains(city, case=False, na=False)]
-            logger.info(f"筛选城市 '{city}' 后数据量: {before_count} -> {len(filtered_df)}")
-        
-        if cuisine:
-            before_count = len(filtered_df)
-            filtered_df = filtered_df[filtered_df['cuisine'].str.contains(cuisine, case=False, na=False)]
-            logger.info(f"筛选菜系 '{cuisine}' 后数据量: {before_count} -> {len(filtered_df)}")
-        
-        if price_level:
-            before_count = len(filtered_df)
-            if 'price_level' in filtered_df.columns:
-                filtered_df = filtered_df[filtered_df['price_level'] == price_level]
-            else:
-                # 如果没有price_level列，使用price列
-                filtered_df = filtered_df[filtered_df['price'] == price_level]
-            logger.info(f"筛选价格 '{price_level}' 后数据量: {before_count} -> {len(filtered_df)}")
-        
-        if year_start:
-            before_count = len(filtered_df)
-            filtered_df = filtered_df[filtered_df['year'] >= int(year_start)]
-            logger.info(f"筛选年份 >= {year_start} 后数据量: {before_count} -> {len(filtered_df)}")
-        
-        if year_end:
-            before_count = len(filtered_df)
-            filtered_df = filtered_df[filtered_df['year'] <= int(year_end)]
-            logger.info(f"筛选年份 <= {year_end} 后数据量: {before_count} -> {len(filtered_df)}")
+        filters = RestaurantIndex.normalize_filters(request.args)
+        logger.info(f"查询参数: page={page}, per_page={per_page}, sort_by={sort_by}, cursor={bool(cursor)}, filters={filters}")
         
-        # 分页
-        total = len(filtered_df)
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        page_data = filtered_df.iloc[start_idx:end_idx]
-        
-        logger.info(f"最终数据量: {total}, 分页: {start_idx}-{end_idx}, 返回: {len(page_data)}")
-        
-        # 清理NaN值
-        page_data = page_data.fillna('')
-        
-        # 转换为JSON格式
-        restaurants = []
-        for _, row in page_data.iterrows():
-            restaurant = {
-                'name': row.get('name', ''),
-                'city': row.get('city', ''),
-                'region': row.get('region', ''),
-                'stars': int(row.get('stars', 0)) if pd.notna(row.get('stars')) else 0,
-                'cuisine': row.get('cuisine', ''),
-                'price': row.get('price', '') if pd.notna(row.get('price')) else '',
-                'price_level': row.get('price_level', '') if pd.notna(row.get('price_level')) else '',
-                'year': int(row.get('year', 0)) if pd.notna(row.get('year')) else 0,
-                'latitude': float(row.get('latitude', 0)) if pd.notna(row.get('latitude')) else None,
-                'longitude': float(row.get('longitude', 0)) if pd.notna(row.get('longitude')) else None,
-                'url': row.get('url', '') if pd.notna(row.get('url')) else '',
-                'continent': row.get('continent', '') if pd.notna(row.get('continent')) else '',
-                'climate_zone': row.get('climate_zone', '') if pd.notna(row.get('climate_zone')) else ''
-            }
-            restaurants.append(restaurant)
+        page_data, pagination = restaurant_index.page(filters, sort_by=sort_by, sort_order=sort_order,
+                                                      page=page, per_page=per_page, cursor=cursor)
+        logger.info(f"最终数据量: {pagination['total']}, 返回: {len(page_data)}")
         
         return jsonify({
             'success': True,
             'data': {
-                'restaurants': restaurants,
-                'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': total,
-                    'pages': (total + per_page - 1) // per_page
-                }
+                'restaurants': restaurants_to_records(page_data),
+                'pagination': pagination
             }
         })
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"获取餐厅数据时出错: {e}")
         return jsonify({
@@ -289,18 +389,72 @@ def get_restaurants():
         }), 500
 
 
+@app.route('/api/restaurants/export', methods=['GET'])
+def export_restaurants():
+    """
+    导出筛选后的全部餐厅数据
+    
+    按固定行数分块编码并以流式响应输出；ndjson/csv由压缩中间件按协商的编码逐块压缩
+    
+    Query Parameters:
+        format (str): ndjson / csv / parquet，默认ndjson
+        sort_by, sort_order: 同 /api/restaurants
+        q, stars, region, city, cuisine, price_level, year_start, year_end: 同 /api/restaurants
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        sort_by = request.args.get('sort_by') or None
+        sort_order = request.args.get('sort_order', 'asc').lower()
+        check_export_format(export_format)
+        
+        restaurant_index = data_service.get_data('restaurant_index')
+        if restaurant_index is None:
+            return jsonify({'success': False, 'error': '数据未加载'}), 404
+        
+        filters = RestaurantIndex.normalize_filters(request.args)
+        rows = restaurant_index.row_indices(filters, sort_by=sort_by, sort_order=sort_order)
+        logger.info(f"导出餐厅数据: format={export_format}, filters={filters}, 行数={len(rows)}")
+        
+        mimetype = EXPORT_FORMATS[export_format][0]
+        # 生成器持有当前数据版本的引用，导出过程中重新加载数据不影响本次导出
+        chunks = iter_export(restaurant_index.df, rows, export_format)
+        
+        response = Response(stream_with_context(chunks), mimetype=mimetype,
+                            headers=export_headers(export_format))
+        response.headers['X-Total-Count'] = str(len(rows))
+        return response
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"导出餐厅数据时出错: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/geojson', methods=['GET'])
 def get_geojson():
     """获取餐厅地理数据（GeoJSON格式）"""
     try:
+        # 同一数据版本的响应字节及其预压缩结果只生成一次
+        cache_key = ('geojson', data_service.data_version)
+        cached = response_compressor.cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
         # 检查是否有缓存的GeoJSON数据
         if 'geojson' in data_service.data_cache:
             geojson_data = data_service.data_cache['geojson']
-            return jsonify({
+            return response_compressor.cache_response(cache_key, jsonify({
                 'success': True,
                 'data': geojson_data,
                 'message': f'成功获取{len(geojson_data["features"])}家餐厅的地理数据'
-            })
+            }))
             
         # 如果没有缓存的GeoJSON数据，则从cleaned数据生成
         df = data_service.get_data('cleaned')
@@ -348,11 +502,11 @@ def get_geojson():
         # 缓存生成的GeoJSON数据
         data_service.data_cache['geojson'] = geojson_data
         
-        return jsonify({
+        return response_compressor.cache_response(cache_key, jsonify({
             'success': True,
             'data': geojson_data,
             'message': f'成功获取{len(features)}家餐厅的地理数据'
-        })
+        }))
 
     except Exception as e:
         logger.error(f"获取地理数据时出错: {e}")
@@ -448,162 +602,119 @@ def get_trends_analysis():
         }), 500
 
 
+def _cluster_label_list(labels) -> List[int]:
+    """将聚类标签一次性转换为Python整数列表"""
+    return np.asarray(labels).astype(int).tolist()
+
+
+def build_clustering_payload(clustering_data: Optional[Dict]) -> Optional[Dict]:
+    """根据聚类结果构建聚类分析响应数据，无法识别时返回None"""
+    if not clustering_data or 'best_algorithm' not in clustering_data:
+        return None
+    
+    best_algorithm = clustering_data.get('best_algorithm')
+    
+    # 高级聚类结果结构
+    if 'best_result' in clustering_data:
+        best_result = clustering_data['best_result']
+        metrics = best_result.get('metrics', {})
+        n_clusters = metrics.get('n_clusters', 0)
+        noise_ratio = metrics.get('noise_ratio', 0)
+        labels = _cluster_label_list(best_result.get('labels', []))
+        
+        # 准备集群统计信息
+        cluster_stats = {}
+        business_insights = clustering_data.get('business_insights', {})
+        for cluster_id, insights in business_insights.items():
+            cluster_key = cluster_id.replace('cluster_', '')
+            cluster_stats[cluster_key] = insights.get('size', 0)
+        
+        return {
+            'algorithm': str(best_algorithm).upper(),
+            'n_clusters': int(n_clusters),
+            'silhouette_score': float(metrics.get('silhouette_score', 0)),
+            'noise_ratio': float(noise_ratio),
+            'composite_score': float(metrics.get('composite_score', 0)),
+            'cluster_labels': sorted(set(labels) - {-1}),
+            'labels': labels,
+            'summary': f'使用优化{str(best_algorithm).upper()}算法成功识别出{int(n_clusters)}个高质量餐厅聚类，噪声比例{noise_ratio*100:.1f}%',
+            'cluster_stats': cluster_stats,
+            'business_insights': business_insights,
+            'optimization_type': 'advanced'
+        }
+    
+    # 传统聚类结果结构
+    if 'clustering_experiments' in clustering_data:
+        experiments = clustering_data['clustering_experiments']
+        best_result = experiments.get(best_algorithm, {}).get('best_result', {})
+        labels = _cluster_label_list(best_result.get('labels', []))
+        cluster_labels = sorted(set(labels) - {-1})
+        
+        # 准备集群统计信息
+        cluster_stats = {}
+        cluster_sizes = clustering_data.get('cluster_analysis', {}).get('cluster_sizes', {})
+        for key, value in cluster_sizes.items():
+            cluster_stats[str(key)] = int(value)
+        
+        return {
+            'algorithm': str(best_algorithm).upper(),
+            'n_clusters': len(cluster_labels),
+            'silhouette_score': float(best_result.get('silhouette_score', 0)),
+            'cluster_labels': cluster_labels,
+            'labels': labels,
+            'summary': f'使用{str(best_algorithm).upper()}算法成功识别出{len(cluster_labels)}个不同的餐厅聚类',
+            'cluster_stats': cluster_stats,
+            'optimization_type': 'traditional'
+        }
+    
+    return None
+
+
 @app.route('/api/analytics/clustering', methods=['GET'])
 def get_clustering_analysis():
-    """获取聚类分析结果"""
+    """
+    获取聚类分析结果
+    
+    Query Parameters:
+        include_labels (bool): 是否返回逐餐厅标签，默认true
+        labels_page (int): 标签分页页码，不传则返回全部标签
+        labels_per_page (int): 每页标签数量，默认1000，最大10000
+    """
     try:
-        # 优先加载高级聚类分析结果
-        advanced_clustering_path = PROCESSED_DIR / "advanced_clustering_results.joblib"
-        advanced_report_path = PROCESSED_DIR / "advanced_clustering_report.json"
-        
-        clustering_data = None
-        
-        # 尝试加载高级聚类结果
-        if advanced_clustering_path.exists():
-            try:
-                import joblib
-                clustering_data = joblib.load(advanced_clustering_path)
-                logger.info("成功加载高级聚类分析结果")
-            except Exception as e:
-                logger.error(f"加载高级聚类结果失败: {e}")
-        
-        # 如果高级聚类结果不可用，加载传统结果
-        if clustering_data is None:
-            clustering_data = data_service.get_data('clustering')
-            if clustering_data is None:
-                logger.warning("聚类数据未加载，尝试加载传统聚类结果文件")
-                clustering_path = PROCESSED_DIR / "clusters.joblib"
-                if clustering_path.exists():
-                    try:
-                        import joblib
-                        clustering_data = joblib.load(clustering_path)
-                        logger.info("成功从传统文件加载聚类数据")
-                    except Exception as e:
-                        logger.error(f"从文件加载聚类数据失败: {e}")
-                        clustering_data = None
-        
-        # 处理高级聚类结果
-        if clustering_data and 'best_algorithm' in clustering_data:
-            best_algorithm = clustering_data.get('best_algorithm')
+        include_labels = request.args.get('include_labels', 'true').lower() not in ('false', '0', 'no')
+        paginated = 'labels_page' in request.args or 'labels_per_page' in request.args
+        # 默认请求（全部标签）的响应字节及其预压缩结果按数据版本缓存
+        cache_key = ('clustering', data_service.data_version) if include_labels and not paginated else None
+        if cache_key is not None:
+            cached = response_compressor.cached_response(cache_key)
+            if cached is not None:
+                return cached
+        
+        payload = data_service.get_clustering_payload()
+        
+        if payload is not None:
+            cluster_info = dict(payload)
+            labels = payload['labels']
             
-            # 高级聚类结果结构
-            if 'best_result' in clustering_data:
-                best_result = clustering_data['best_result']
-                
-                # 提取聚类信息
-                n_clusters = 0
-                silhouette_score = 0
-                labels = []
-                noise_ratio = 0
-                composite_score = 0
-                
-                if 'metrics' in best_result:
-                    metrics = best_result['metrics']
-                    n_clusters = metrics.get('n_clusters', 0)
-                    silhouette_score = metrics.get('silhouette_score', 0)
-                    noise_ratio = metrics.get('noise_ratio', 0)
-                    composite_score = metrics.get('composite_score', 0)
-                
-                if 'labels' in best_result:
-                    labels = best_result['labels']
-                
-                # 准备集群统计信息
-                cluster_stats = {}
-                business_insights = clustering_data.get('business_insights', {})
-                
-                for cluster_id, insights in business_insights.items():
-                    cluster_key = cluster_id.replace('cluster_', '')
-                    cluster_stats[cluster_key] = insights.get('size', 0)
-                
-                # 获取聚类标签
-                cluster_labels = []
-                if labels is not None:
-                    unique_labels = set(labels)
-                    if -1 in unique_labels:
-                        unique_labels.remove(-1)
-                    cluster_labels = [int(label) for label in unique_labels]
-                
-                # 转换标签为Python列表
-                python_labels = []
-                if hasattr(labels, 'tolist'):
-                    python_labels = [int(label) for label in labels.tolist()]
-                else:
-                    python_labels = [int(label) for label in labels]
-                
-                # 构建集群信息对象
-                cluster_info = {
-                    'algorithm': str(best_algorithm).upper(),
-                    'n_clusters': int(n_clusters),
-                    'silhouette_score': float(silhouette_score),
-                    'noise_ratio': float(noise_ratio),
-                    'composite_score': float(composite_score),
-                    'cluster_labels': cluster_labels,
-                    'labels': python_labels,
-                    'summary': f'使用优化{str(best_algorithm).upper()}算法成功识别出{int(n_clusters)}个高质量餐厅聚类，噪声比例{noise_ratio*100:.1f}%',
-                    'cluster_stats': cluster_stats,
-                    'business_insights': business_insights,
-                    'optimization_type': 'advanced'
+            if not include_labels:
+                cluster_info.pop('labels')
+            elif paginated:
+                labels_page = max(int(request.args.get('labels_page', 1)), 1)
+                labels_per_page = min(max(int(request.args.get('labels_per_page', 1000)), 1), 10000)
+                start_idx = (labels_page - 1) * labels_per_page
+                cluster_info['labels'] = labels[start_idx:start_idx + labels_per_page]
+                cluster_info['labels_pagination'] = {
+                    'page': labels_page,
+                    'per_page': labels_per_page,
+                    'total': len(labels),
+                    'pages': (len(labels) + labels_per_page - 1) // labels_per_page
                 }
-                
-                return jsonify({
-                    'success': True,
-                    'data': cluster_info
-                })
             
-            # 传统聚类结果结构
-            elif 'clustering_experiments' in clustering_data:
-                experiments = clustering_data['clustering_experiments']
-                best_result = experiments.get(best_algorithm, {}).get('best_result', {})
-                
-                # 提取聚类信息
-                n_clusters = 0
-                silhouette_score = 0
-                labels = []
-                
-                if 'labels' in best_result:
-                    labels = best_result['labels']
-                    n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-                
-                if 'silhouette_score' in best_result:
-                    silhouette_score = best_result['silhouette_score']
-                
-                # 准备集群统计信息
-                cluster_stats = {}
-                if 'cluster_analysis' in clustering_data and 'cluster_sizes' in clustering_data['cluster_analysis']:
-                    for key, value in clustering_data['cluster_analysis']['cluster_sizes'].items():
-                        cluster_stats[str(key)] = int(value)
-                
-                # 获取聚类标签
-                cluster_labels = []
-                if labels is not None:
-                    unique_labels = set(labels)
-                    if -1 in unique_labels:
-                        unique_labels.remove(-1)
-                    cluster_labels = [int(label) for label in unique_labels]
-                
-                # 转换标签为Python列表
-                python_labels = []
-                if hasattr(labels, 'tolist'):
-                    python_labels = [int(label) for label in labels.tolist()]
-                else:
-                    python_labels = [int(label) for label in labels]
-                
-                # 构建集群信息对象
-                cluster_info = {
-                    'algorithm': str(best_algorithm).upper(),
-                    'n_clusters': int(n_clusters),
-                    'silhouette_score': float(silhouette_score),
-                    'cluster_labels': cluster_labels,
-                    'labels': python_labels,
-                    'summary': f'使用{str(best_algorithm).upper()}算法成功识别出{int(n_clusters)}个不同的餐厅聚类',
-                    'cluster_stats': cluster_stats,
-                    'optimization_type': 'traditional'
-                }
-                
-                return jsonify({
-                    'success': True,
-                    'data': cluster_info
-                })
+            response = jsonify({
+                'success': True,
+                'data': cluster_info
+            })
+            return response_compressor.cache_response(cache_key, response) if cache_key is not None else response
         
         # 如果没有获取到真实聚类数据，返回默认值
         logger.warning("未能获取真实聚类数据，返回默认值")
@@ -636,17 +747,183 @@ def get_clustering_analysis():
         })
 
 
+@app.route('/api/analytics/clustering/predict', methods=['POST'])
+def predict_clusters():
+    """批量预测餐厅所属聚类"""
+    try:
+        predictor = data_service.get_data('cluster_model')
+        if predictor is None:
+            return jsonify({'success': False, 'error': '聚类预测模型未加载'}), 404
+        
+        request_data = request.get_json(silent=True) or {}
+        records = request_data.get('restaurants')
+        if not isinstance(records, list) or not records:
+            return jsonify({'success': False, 'error': 'restaurants必须是非空列表'}), 400
+        
+        result = predictor.predict(records)
+        result['model'] = predictor.get_info()
+        
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"预测聚类归属时出错: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/features/transform', methods=['POST'])
+def transform_features():
+    """
+    为新餐厅在线计算特征
+    
+    使用特征工程阶段拟合的统计量（价格分位、分组均值、编码和标准化参数），
+    单条记录走纯Python路径，批量记录走向量化路径
+    
+    Request Body:
+        restaurants (list): 餐厅字段字典列表，字段同地理编码后的数据
+    """
+    try:
+        feature_transform = data_service.get_data('feature_transform')
+        if feature_transform is None:
+            return jsonify({'success': False, 'error': '在线特征转换器未加载'}), 404
+        
+        request_data = request.get_json(silent=True) or {}
+        records = request_data.get('restaurants')
+        if not isinstance(records, list) or not records:
+            return jsonify({'success': False, 'error': 'restaurants必须是非空列表'}), 400
+        if not all(isinstance(record, dict) for record in records):
+            return jsonify({'success': False, 'error': 'restaurants中的每一项必须是对象'}), 400
+        if len(records) > MAX_TRANSFORM_BATCH:
+            return jsonify({'success': False, 'error': f'单次最多计算{MAX_TRANSFORM_BATCH}条记录'}), 400
+        
+        if len(records) == 1:
+            features = [feature_transform.transform_record(records[0])]
+        else:
+            frame = feature_transform.transform(pd.DataFrame.from_records(records))
+            features = frame.to_dict('records')
+        
+        # numpy标量转为Python类型，NaN/inf 不是合法JSON，统一转为null
+        def to_json_value(value):
+            if isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, float) and not np.isfinite(value):
+                return None
+            return value
+        
+        features = [{name: to_json_value(value) for name, value in row.items()} for row in features]
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'features': features,
+                'feature_columns': feature_transform.feature_columns,
+                'count': len(features),
+                'transform': feature_transform.get_info()
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"计算在线特征时出错: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@app.route('/api/analytics/clustering/embedding', methods=['GET'])
+def get_clustering_embedding():
+    """
+    获取聚类特征的二维嵌入坐标
+    
+    Query Parameters:
+        method (str): pca 或 tsne，默认tsne
+        perplexity (float): t-SNE困惑度，默认30
+        max_points (int): 最大返回点数，超过时下采样，默认5000
+        encoding (str): base64（类型化数组字节）或 json，默认base64
+    """
+    try:
+        embedding_inputs = data_service.get_embedding_inputs()
+        if embedding_inputs is None:
+            return jsonify({'success': False, 'error': '聚类特征数据未加载'}), 404
+        X, matrix_hash = embedding_inputs
+        
+        method = request.args.get('method', 'tsne').lower()
+        perplexity = float(request.args.get('perplexity', 30))
+        max_points = min(int(request.args.get('max_points', DEFAULT_MAX_POINTS)), DEFAULT_MAX_POINTS)
+        encoding = 'json' if request.args.get('encoding', 'base64').lower() == 'json' else 'base64'
+        
+        embedding = data_service.embedding_service.get_embedding(X, method=method, perplexity=perplexity,
+                                                               max_points=max_points, matrix_hash=matrix_hash)
+        indices = embedding['indices']
+        clustered_df = data_service.get_data('clustered')
+        clusters = clustered_df['cluster'].to_numpy()[indices].astype(np.int16)
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'method': method,
+                'perplexity': perplexity if method == 'tsne' else None,
+                'n_total': int(len(X)),
+                'n_points': int(len(indices)),
+                'downsampled': bool(len(indices) < len(X)),
+                'cache_key': embedding['cache_key'],
+                'cached': embedding['cached'],
+                'coords': encode_typed_array(embedding['coords'], encoding),
+                'indices': encode_typed_array(indices, encoding),
+                'clusters': encode_typed_array(clusters, encoding),
+                'names': clustered_df['name'].iloc[indices].fillna('').tolist()
+            }
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"获取聚类嵌入时出错: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/analytics/forecasts', methods=['GET'])
 def get_forecasts():
-    """获取预测分析结果"""
+    """
+    获取预测分析结果
+    
+    预测值由拟合参数按需计算，只返回请求的序列
+    
+    Query Parameters:
+        group_by (str): 分组维度 overall/stars/region/city/cuisine，默认overall
+        key (str): 分组键（如 France），不指定时返回该维度的全部序列
+        horizon (int): 预测年数，默认5
+    """
     try:
         forecast_data = data_service.get_data('forecasts')
         if forecast_data is None:
             return jsonify({'success': False, 'error': '预测数据未加载'}), 404
         
-        # 提取主要预测结果
+        group_by = request.args.get('group_by', 'overall')
+        key = request.args.get('key') or None
+        horizon = int(request.args.get('horizon', forecast_data.get('forecast_parameters', {}).get('forecast_years', 5)))
+        
+        forecast = data_service.get_forecast_payload(group_by, key, horizon)
+        
         result = {
-            'forecasts': forecast_data.get('forecasts', {}),
+            'forecasts': {group_by: forecast['series']},
+            'query': {key_name: value for key_name, value in forecast.items() if key_name != 'series'},
             'insights': forecast_data.get('insights', {}),
             'model_performance': forecast_data.get('model_performance', {})
         }
@@ -656,6 +933,16 @@ def get_forecasts():
             'data': result
         })
         
+    except ForecastLookupError as e:
+        return jsonify({
+            'success': False,
+            'error': e.args[0]
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         logger.error(f"获取预测分析时出错: {e}")
         return jsonify({
@@ -821,6 +1108,11 @@ def get_filter_options():
 def get_feature_analysis():
     """获取特征重要性分析"""
     try:
+        cache_key = ('features', data_service.data_version)
+        cached = response_compressor.cached_response(cache_key)
+        if cached is not None:
+            return cached
+        
         # 获取真实数据
         df = data_service.get_data('cleaned')
         if df is None:
@@ -927,10 +1219,10 @@ def get_feature_analysis():
             'selected_features': len(features)
         }
         
-        return jsonify({
+        return response_compressor.cache_response(cache_key, jsonify({
             'success': True,
             'data': feature_importance
-        })
+        }))
         
     except Exception as e:
         logger.error(f"获取特征分析时出错: {e}")
@@ -956,12 +1248,45 @@ def get_feature_analysis():
         })
 
 
+@app.route('/api/batch', methods=['POST'])
+def batch_requests():
+    """
+    批量执行多个GET查询，一次往返返回全部结果
+    
+    子请求在进程内直接调用对应接口，共享数据服务和查询索引的缓存，相同筛选条件只求值一次
+    
+    Request Body:
+        requests (list): 子请求列表，每项为 {"id": str, "path": "/api/...", "params": {...}} 或路径字符串
+        params (dict): 所有子请求共享的查询参数（如筛选条件），子请求的同名参数优先
+    
+    Returns:
+        {"success": true, "data": {"responses": [{"id", "path", "status", "body"}, ...]}}
+    """
+    try:
+        sub_requests = parse_batch_requests(request.get_json(silent=True))
+        body = execute_batch(app, sub_requests, excluded_endpoints=('batch_requests', 'export_restaurants'))
+        return app.response_class(body, mimetype='application/json')
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logger.error(f"执行批量请求时出错: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @app.route('/api/data/reload', methods=['POST'])
 def reload_data():
     """重新加载数据"""
     try:
         # 清除缓存
         data_service.data_cache.clear()
+        response_compressor.clear()
         
         # 重新加载所有数据
         data_service.load_all_data()
@@ -0,0 +1,68 @@
+"""
+米其林餐厅数据可视化后端API服务（ASGI入口）
+用法（在 backend 目录下）: uvicorn asgi:application，
+或 gunicorn --config gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application
+
+与 app.py 提供相同的接口：GeoJSON、聚类分析、特征分析等已缓存的响应在事件循环中直接返回，
+其余请求在线程池中由Flask处理，图表渲染、聚类预测、导出等计算密集的接口使用单独的线程池
+"""
+
+import os
+from urllib.parse import parse_qs
+
+from app import app, data_service, response_compressor
+from services.asgi_adapter import ASGIAdapter
+from services.metrics import observe_request
+
+# 计算密集的接口（前缀匹配）
+CPU_BOUND_PATHS = (
+    '/api/charts/generate',
+    '/api/analytics/clustering/predict',
+    '/api/analytics/clustering/embedding',
+    '/api/features/transform',
+    '/api/restaurants/export',
+    '/api/batch',
+    '/api/data/reload'
+)
+
+
+def _default_request_key(name: str):
+    """无查询参数时使用按数据版本缓存的响应（与 app.py 中 cache_response 的缓存键一致）"""
+    def cache_key(query_string: str):
+        return (name, data_service.data_version) if not parse_qs(query_string) else None
+    return cache_key
+
+
+FAST_PATHS = {
+    '/api/geojson': _default_request_key('geojson'),
+    '/api/analytics/clustering': _default_request_key('clustering'),
+    '/api/analytics/features': _default_request_key('features')
+}
+
+
+def cors_headers(scope) -> dict:
+    """快速路径不经过Flask-CORS，按 CORS(app) 的默认配置（允许所有来源，回显请求的Origin）补充响应头"""
+    for name, value in scope.get('headers', []):
+        if name == b'origin':
+            return {'Access-Control-Allow-Origin': value.decode('latin-1'), 'Vary': 'Origin'}
+    return {}
+
+
+# 快速路径对应的Flask端点名，使其请求指标与经过Flask的请求合并统计
+FAST_PATH_ENDPOINTS = {path: app.url_map.bind('localhost').match(path)[0] for path in FAST_PATHS}
+
+
+def observe_cached(scope, size: int, seconds: float):
+    observe_request('GET', FAST_PATH_ENDPOINTS[scope['path']], 200, size, seconds)
+
+
+application = ASGIAdapter(
+    app,
+    fast_paths=FAST_PATHS,
+    cache_lookup=response_compressor.lookup_encoded,
+    cpu_paths=CPU_BOUND_PATHS,
+    io_threads=int(os.environ.get('MICHELIN_ASGI_THREADS', 32)),
+    cpu_threads=int(os.environ.get('MICHELIN_CPU_THREADS', os.cpu_count() or 4)),
+    extra_headers=cors_headers,
+    observe_cached=observe_cached
+)
@@ -0,0 +1,54 @@
+"""
+Gunicorn 生产环境配置
+用法（在 backend 目录下）: gunicorn --config gunicorn.conf.py app:app，或 python start_app.py --production
+ASGI模式: gunicorn --config gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:application（threads不生效，
+线程池大小由 MICHELIN_ASGI_THREADS / MICHELIN_CPU_THREADS 设置）
+
+preload_app 使主进程在fork前导入应用并加载全部数据，各worker通过写时复制共享同一份数据；
+fork前冻结GC，避免垃圾回收遍历共享对象时修改引用计数所在的内存页而触发复制
+
+进程管理：
+- kill -HUP <主进程>：平滑重启所有worker（数据由主进程预加载，不会重新读取）
+- kill -USR2 <主进程> 后 kill -TERM <旧主进程>：启动新主进程重新加载数据后再退出旧主进程，不中断服务
+- kill -TERM <主进程>：等待进行中的请求完成（最多 graceful_timeout 秒）后退出
+
+多worker模式下 /api/data/reload 只会重新加载处理该请求的worker，数据更新后应使用USR2方式重启
+"""
+
+import gc
+import os
+import multiprocessing
+
+bind = os.environ.get('MICHELIN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('MICHELIN_WORKERS', multiprocessing.cpu_count()))
+# 每个worker的线程数，大于1时使用gthread worker，IO等待（读取、发送响应）期间可以处理其他请求
+threads = int(os.environ.get('MICHELIN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+preload_app = True
+# 聚类嵌入、图表生成等接口的单次计算可能较久
+timeout = int(os.environ.get('MICHELIN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('MICHELIN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+# 每个worker处理一定数量请求后平滑替换，限制内存增长（0为不替换）；抖动避免所有worker同时重启
+max_requests = int(os.environ.get('MICHELIN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('MICHELIN_ACCESS_LOG', '-')
+loglevel = os.environ.get('MICHELIN_LOG_LEVEL', 'info')
+pidfile = os.environ.get('MICHELIN_PIDFILE')
+
+
+def when_ready(server):
+    """主进程已预加载应用并开始监听"""
+    from app import data_service
+    if data_service.is_loaded:
+        server.log.info(f"数据已预加载 (版本 {data_service.data_version})，启动 {server.num_workers} 个worker")
+    else:
+        server.log.warning("数据未加载，/api/ready 将返回503")
+    # 将已加载的对象移入永久代，fork后的GC不再扫描（修改）它们
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    server.log.info(f"worker {worker.pid} 已启动")
@@ -0,0 +1,228 @@
+"""
+ASGI适配模块
+将Flask（WSGI）应用包装为ASGI应用：连接由事件循环管理，空闲的长连接不占用线程；
+已缓存的只读响应直接在事件循环中返回，其余请求按路径分发到IO线程池或CPU线程池中执行，
+计算密集的接口（图表渲染、聚类预测、导出等）不会耗尽处理普通请求的线程
+"""
+
+import io
+import sys
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 请求体上限（字节），超过时返回413
+MAX_REQUEST_BODY = 16 * 1024 * 1024
+
+# 路径 -> 返回缓存键的函数（返回None表示该请求不能走快速路径）
+FastPathRoutes = Dict[str, Callable[[str], Optional[Hashable]]]
+# 缓存查找：(缓存键, Accept-Encoding) -> (响应体, 响应头) 或 None
+CacheLookup = Callable[[Hashable, str], Optional[Tuple[bytes, Dict[str, str]]]]
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    """按 PEP 3333 由ASGI的HTTP scope构建WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': str(client[0]),
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _request_header(scope: dict, name: bytes) -> str:
+    for raw_name, raw_value in scope.get('headers', []):
+        if raw_name.lower() == name:
+            return raw_value.decode('latin-1')
+    return ''
+
+
+class _WSGIResponse:
+    """在线程池中调用WSGI应用，记录 start_response 的状态和响应头"""
+
+    def __init__(self, wsgi_app, environ: dict):
+        self.status = 500
+        self.headers = []
+        self.body = None
+        self.iterator = None
+        self._iterable = wsgi_app(environ, self._start_response)
+        if any(name.lower() == 'content-length' for name, _ in self.headers):
+            # 非流式响应：一次取出全部字节
+            try:
+                self.body = b''.join(self._iterable)
+            finally:
+                self.close()
+        else:
+            self.iterator = iter(self._iterable)
+
+    def _start_response(self, status: str, headers, exc_info=None):
+        self.status = int(status.split(' ', 1)[0])
+        self.headers = headers
+
+    def next_chunk(self) -> Optional[bytes]:
+        return next(self.iterator, None)
+
+    def close(self):
+        if hasattr(self._iterable, 'close'):
+            self._iterable.close()
+
+
+class ASGIAdapter:
+    """
+    Flask应用的ASGI适配器
+
+    功能：
+    1. fast_paths 中登记的GET接口在无查询参数时先查响应缓存，命中则在事件循环中直接发送
+    2. 未命中的请求在线程池中执行完整的Flask请求处理（含after_request钩子）
+    3. cpu_paths 中的接口使用单独的线程池，流式响应逐块在该线程池中生成
+    """
+
+    def __init__(self, wsgi_app, fast_paths: Optional[FastPathRoutes] = None, cache_lookup: Optional[CacheLookup] = None,
+                 cpu_paths: Iterable[str] = (), io_threads: int = 32, cpu_threads: int = 4,
+                 extra_headers: Optional[Callable[[dict], Dict[str, str]]] = None,
+                 observe_cached: Optional[Callable[[dict, int, float], None]] = None):
+        """
+        初始化适配器
+
+        Args:
+            wsgi_app: WSGI应用（Flask应用）
+            fast_paths: 可走快速路径的接口，路径 -> 根据查询字符串返回缓存键的函数
+            cache_lookup: 按缓存键和 Accept-Encoding 查找已编码响应的函数
+            cpu_paths: 计算密集的接口路径（前缀匹配）
+            io_threads: 普通请求线程池大小
+            cpu_threads: 计算密集请求线程池大小
+            extra_headers: 快速路径响应需要补充的头（如CORS），参数为ASGI scope
+            observe_cached: 快速路径响应发送后的回调，参数为 (scope, 响应体字节数, 耗时秒数)，
+                用于记录不经过Flask的请求的指标
+        """
+        self.wsgi_app = wsgi_app
+        self.fast_paths = fast_paths or {}
+        self.cache_lookup = cache_lookup
+        self.cpu_paths = tuple(cpu_paths)
+        self.extra_headers = extra_headers
+        self.observe_cached = observe_cached
+        self.io_executor = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix='asgi-io')
+        self.cpu_executor = ThreadPoolExecutor(max_workers=cpu_threads, thread_name_prefix='asgi-cpu')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise NotImplementedError(f"不支持的ASGI连接类型: {scope['type']}")
+
+        if await self._serve_cached(scope, send):
+            return
+
+        body = await self._read_body(receive)
+        if body is None:
+            await self._send_response(send, 413, [('Content-Type', 'application/json')],
+                                      b'{"success":false,"error":"request body too large"}')
+            return
+
+        loop = asyncio.get_running_loop()
+        executor = self.cpu_executor if scope['path'].startswith(self.cpu_paths) else self.io_executor
+        environ = build_environ(scope, body)
+        response = await loop.run_in_executor(executor, _WSGIResponse, self.wsgi_app, environ)
+
+        if response.body is not None:
+            await self._send_response(send, response.status, response.headers, response.body)
+            return
+
+        # 流式响应：每块在线程池中生成，生成期间事件循环继续处理其他连接
+        await send({'type': 'http.response.start', 'status': response.status,
+                    'headers': self._encode_headers(response.headers)})
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, response.next_chunk)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            await loop.run_in_executor(executor, response.close)
+
+    async def _serve_cached(self, scope, send) -> bool:
+        """快速路径：命中响应缓存时直接发送，返回是否已处理"""
+        if scope['method'] != 'GET' or self.cache_lookup is None or scope['path'] not in self.fast_paths:
+            return False
+        start = time.perf_counter()
+        cache_key = self.fast_paths[scope['path']](scope.get('query_string', b'').decode('latin-1'))
+        if cache_key is None:
+            return False
+        cached = self.cache_lookup(cache_key, _request_header(scope, b'accept-encoding'))
+        if cached is None:
+            return False
+
+        body, headers = cached
+        if self.extra_headers is not None:
+            headers = dict(headers)
+            for name, value in self.extra_headers(scope).items():
+                headers[name] = f"{headers[name]}, {value}" if name == 'Vary' and name in headers else value
+        await self._send_response(send, 200, list(headers.items()), body)
+        if self.observe_cached is not None:
+            self.observe_cached(scope, len(body), time.perf_counter() - start)
+        return True
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_REQUEST_BODY:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    def _encode_headers(headers) -> list:
+        return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers]
+
+    async def _send_response(self, send, status: int, headers, body: bytes):
+        await send({'type': 'http.response.start', 'status': status, 'headers': self._encode_headers(headers)})
+        await send({'type': 'http.response.body', 'body': body, 'more_body': False})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.io_executor.shutdown(wait=False)
+                self.cpu_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
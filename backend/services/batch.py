@@ -0,0 +1,129 @@
+"""
+批量查询模块
+在一次HTTP请求中执行多个GET子请求：按URL规则匹配到进程内的视图函数直接调用，
+子请求之间共享数据服务和查询索引的缓存（相同筛选条件只求值一次），
+各子响应已序列化的字节直接拼接为批量响应，不做二次解析和序列化
+"""
+
+import logging
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl
+
+from werkzeug.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+# 单次批量请求的最大子请求数
+MAX_BATCH_REQUESTS = 20
+# 只允许调用 /api/ 下的接口
+BATCH_PATH_PREFIX = '/api/'
+
+
+def parse_batch_requests(payload: Any) -> List[Dict[str, Any]]:
+    """
+    校验并规范化批量请求体
+
+    请求体格式: {"requests": [{"id": "summary", "path": "/api/summary", "params": {...}}, ...],
+                "params": {...}}，顶层 params 为所有子请求共享的查询参数，子请求的同名参数优先
+
+    Returns:
+        子请求列表，每项包含 id、path、params
+
+    Raises:
+        ValueError: 请求体格式错误或子请求过多
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('requests'), list):
+        raise ValueError("请求体必须包含requests列表")
+    items = payload['requests']
+    if not items:
+        raise ValueError("requests不能为空")
+    if len(items) > MAX_BATCH_REQUESTS:
+        raise ValueError(f"单次最多{MAX_BATCH_REQUESTS}个子请求")
+    shared_params = payload.get('params') or {}
+    if not isinstance(shared_params, dict):
+        raise ValueError("params必须是对象")
+
+    requests = []
+    for index, item in enumerate(items):
+        if isinstance(item, str):
+            item = {'path': item}
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            raise ValueError(f"第{index + 1}个子请求缺少path")
+        params = item.get('params') or {}
+        if not isinstance(params, dict):
+            raise ValueError(f"第{index + 1}个子请求的params必须是对象")
+
+        path, _, query = item['path'].partition('?')
+        merged = dict(shared_params)
+        merged.update(parse_qsl(query))
+        merged.update(params)
+        requests.append({
+            'id': str(item.get('id', index)),
+            'path': path,
+            # 与浏览器查询参数一致：去掉空值，其余转为字符串
+            'params': {key: str(value) for key, value in merged.items() if value is not None and value != ''}
+        })
+    return requests
+
+
+def _error_body(app, message: str) -> bytes:
+    return app.json.dumps({'success': False, 'error': message}).encode('utf-8')
+
+
+def dispatch(app, path: str, params: Dict[str, str], excluded_endpoints=()) -> tuple:
+    """
+    在独立的请求上下文中调用子请求对应的视图函数
+
+    子请求不经过 before/after_request 钩子（不压缩、不加CORS头），只支持返回JSON的非流式GET接口
+
+    Returns:
+        (状态码, 已序列化的JSON响应体)
+    """
+    if not path.startswith(BATCH_PATH_PREFIX):
+        return 400, _error_body(app, f"只支持{BATCH_PATH_PREFIX}下的接口")
+
+    adapter = app.url_map.bind('localhost')
+    try:
+        endpoint, view_args = adapter.match(path, method='GET')
+    except HTTPException as e:
+        return e.code or 404, _error_body(app, f"{path}: {e.name}")
+    if endpoint in excluded_endpoints:
+        return 400, _error_body(app, f"{path} 不支持批量调用")
+
+    with app.test_request_context(path, method='GET', query_string=params):
+        try:
+            response = app.make_response(app.view_functions[endpoint](**view_args))
+        except HTTPException as e:
+            return e.code or 500, _error_body(app, e.description or e.name)
+        except Exception as e:
+            logger.error(f"批量子请求 {path} 出错: {e}")
+            return 500, _error_body(app, str(e))
+
+        if response.is_streamed or not response.is_json:
+            response.close()
+            return 400, _error_body(app, f"{path} 不返回JSON，不支持批量调用")
+        return response.status_code, response.get_data()
+
+
+def execute_batch(app, requests: List[Dict[str, Any]], excluded_endpoints=()) -> bytes:
+    """
+    依次执行子请求并拼接批量响应体
+
+    响应体格式: {"success": true, "data": {"responses": [{"id", "path", "status", "body"}, ...]}}，
+    顺序与请求一致；单个子请求失败只体现在其 status 和 body 中
+
+    Args:
+        app: Flask应用
+        requests: parse_batch_requests 返回的子请求列表
+        excluded_endpoints: 禁止批量调用的端点名
+
+    Returns:
+        序列化后的响应体
+    """
+    parts = []
+    for item in requests:
+        status, body = dispatch(app, item['path'], item['params'], excluded_endpoints)
+        meta = app.json.dumps({'id': item['id'], 'path': item['path'], 'status': status})
+        # 在元信息对象末尾追加 body 字段，原样嵌入子响应的JSON字节
+        parts.append(meta.rstrip()[:-1].encode('utf-8') + b',"body":' + body.strip() + b'}')
+    return b'{"success":true,"data":{"responses":[' + b','.join(parts) + b']}}'
@@ -0,0 +1,214 @@
+"""
+聚类服务模块
+加载聚类分析脚本导出的紧凑格式结果和模型包，为新餐厅批量计算聚类归属
+"""
+
+import numpy as np
+import pandas as pd
+import joblib
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Any
+from sklearn.metrics import pairwise_distances_argmin_min
+
+logger = logging.getLogger(__name__)
+
+# 单次预测请求允许的最大记录数
+MAX_PREDICT_BATCH = 5000
+
+
+def load_clustering_artifacts(artifact_dir: Path, mmap: bool = True) -> Dict[str, Any]:
+    """
+    加载紧凑格式的聚类结果（manifest.json + .npy数组）
+
+    Args:
+        artifact_dir: 聚类结果目录
+        mmap: 是否以只读内存映射方式加载数组
+
+    Returns:
+        与旧版 clusters.joblib 结构一致的聚类结果字典
+    """
+    with open(artifact_dir / 'manifest.json', 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    def load_array(name):
+        array_info = manifest['arrays'][name]
+        return np.load(artifact_dir / array_info['file'], mmap_mode='r' if mmap else None)
+
+    def unpack_result(packed):
+        result = {key: value for key, value in packed.items() if key != '_arrays'}
+        for key, array_name in packed.get('_arrays', {}).items():
+            result[key] = load_array(array_name)
+        return result
+
+    experiments = {}
+    for algorithm, entry in manifest['algorithms'].items():
+        experiment = {key: value for key, value in entry.items() if key not in ('best_result', 'candidates')}
+        experiment['best_result'] = unpack_result(entry['best_result'])
+        if 'candidates' in entry:
+            experiment['candidates'] = {key: unpack_result(value) for key, value in entry['candidates'].items()}
+        experiments[algorithm] = experiment
+
+    return {
+        'best_algorithm': manifest['best_algorithm'],
+        'clustering_experiments': experiments,
+        'pca_components': load_array('pca.components'),
+        'pca_explained_variance': manifest['pca_explained_variance'],
+        'visualizations': {
+            'pca': {
+                'data': load_array('pca.data'),
+                'explained_variance': manifest['pca_explained_variance']
+            }
+        },
+        'cluster_analysis': manifest['cluster_analysis'],
+        'format_version': manifest.get('format_version'),
+        'created_at': manifest.get('created_at')
+    }
+
+
+class ClusterPredictor:
+    """
+    聚类预测器
+
+    功能：
+    1. 按训练时的特征定义构建特征矩阵（全部为向量化操作）
+    2. 复用训练时的缺失值填充和标准化参数
+    3. 计算每条记录的聚类归属和距离
+    """
+
+    def __init__(self, cluster_model: Dict):
+        """
+        初始化聚类预测器
+
+        Args:
+            cluster_model: scripts/clustering.py 导出的模型包
+        """
+        self.algorithm = cluster_model['algorithm']
+        self.features = list(cluster_model['features'])
+        self.major_cuisines = list(cluster_model['major_cuisines'])
+        self.major_regions = list(cluster_model['major_regions'])
+        self.imputer_statistics = np.asarray(cluster_model['imputer_statistics'], dtype=float)
+        self.scaler_mean = np.asarray(cluster_model['scaler_mean'], dtype=float)
+        self.scaler_scale = np.asarray(cluster_model['scaler_scale'], dtype=float)
+        self.pca_mean = np.asarray(cluster_model['pca_mean'], dtype=float)
+        self.pca_components = np.asarray(cluster_model['pca_components'], dtype=float)
+        self.cluster_ids = np.asarray(cluster_model['cluster_ids'], dtype=int)
+        self.centroids = np.asarray(cluster_model['centroids'], dtype=float)
+        self.created_at = cluster_model.get('created_at')
+
+        # DBSCAN使用核心样本做近邻归属
+        self.core_samples = cluster_model.get('core_samples')
+        self.core_labels = cluster_model.get('core_labels')
+        self.eps = cluster_model.get('eps')
+
+    @classmethod
+    def load(cls, model_path: Path) -> 'ClusterPredictor':
+        """从joblib文件加载聚类预测器"""
+        return cls(joblib.load(model_path))
+
+    def build_feature_matrix(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        构建与训练时一致的特征矩阵
+
+        Args:
+            df: 餐厅记录DataFrame
+
+        Returns:
+            未标准化的特征矩阵
+        """
+        n = len(df)
+        columns = {}
+
+        def column(name, default=None):
+            if name in df.columns:
+                return df[name]
+            return pd.Series([default] * n, index=df.index, dtype=object)
+
+        # 数值字段与训练预处理保持一致：缺失填0
+        for name in ['stars', 'latitude', 'longitude']:
+            columns[name] = pd.to_numeric(column(name), errors='coerce').fillna(0).to_numpy(dtype=float)
+
+        # 价格级别：¥符号按个数计级，数值价格按500为一档，其余默认为2
+        # 与训练时的规则一致，只有数字（不含布尔值）和全部由数字组成的字符串按数值处理，"12.5"、" 500" 等取默认值
+        price = column('price').fillna('未知').astype(object)
+        price_text = price.astype(str)
+        is_number = price.map(lambda value: isinstance(value, (int, float, np.number)) and not isinstance(value, (bool, np.bool_)))
+        is_digit_text = price.where(price.map(lambda value: isinstance(value, str))).str.isdigit().fillna(False).astype(bool)
+        numeric_mask = (is_number | is_digit_text).to_numpy()
+        price_numeric = pd.to_numeric(price.where(numeric_mask), errors='coerce').to_numpy(dtype=float)
+        numeric_mask &= ~np.isnan(price_numeric)
+        price_level = np.full(n, 2.0)
+        price_level[numeric_mask] = np.trunc(price_numeric[numeric_mask] / 500)
+        yen_mask = price_text.str.startswith('¥').to_numpy()
+        price_level[yen_mask] = price_text.str.len().to_numpy()[yen_mask]
+        columns['price_level'] = price_level
+
+        # 主要菜系和区域的One-Hot编码
+        main_cuisine = column('cuisine').fillna('未知').astype(str).str.split(',').str[0].str.strip()
+        for cuisine in self.major_cuisines:
+            columns[f'cuisine_{cuisine}'] = (main_cuisine == cuisine).to_numpy(dtype=float)
+
+        region = column('region').fillna('未知').astype(str)
+        for region_name in self.major_regions:
+            columns[f'region_{region_name}'] = (region == region_name).to_numpy(dtype=float)
+
+        X = np.column_stack([columns[feature] for feature in self.features]) if n else np.empty((0, len(self.features)))
+
+        # 缺失值使用训练时的均值填充
+        nan_mask = np.isnan(X)
+        if nan_mask.any():
+            X[nan_mask] = np.take(self.imputer_statistics, np.nonzero(nan_mask)[1])
+
+        return X
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """构建特征矩阵并使用训练时的参数标准化"""
+        return (self.build_feature_matrix(df) - self.scaler_mean) / self.scaler_scale
+
+    def predict(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        批量预测聚类归属
+
+        Args:
+            records: 餐厅记录列表
+
+        Returns:
+            包含聚类ID、距离和PCA坐标的列式结果
+        """
+        if len(records) > MAX_PREDICT_BATCH:
+            raise ValueError(f"单次最多预测{MAX_PREDICT_BATCH}条记录")
+
+        df = pd.DataFrame.from_records(records)
+        X_scaled = self.transform(df)
+
+        if len(X_scaled) == 0:
+            clusters = np.empty(0, dtype=int)
+            distances = np.empty(0)
+        elif self.core_samples is not None:
+            # DBSCAN：距离最近核心样本不超过eps则归入其聚类，否则为噪声
+            nearest, distances = pairwise_distances_argmin_min(X_scaled, self.core_samples)
+            clusters = np.where(distances <= self.eps, np.asarray(self.core_labels)[nearest], -1)
+        else:
+            nearest, distances = pairwise_distances_argmin_min(X_scaled, self.centroids)
+            clusters = self.cluster_ids[nearest]
+
+        pca_coords = (X_scaled - self.pca_mean) @ self.pca_components.T
+
+        return {
+            'algorithm': str(self.algorithm).upper(),
+            'count': int(len(clusters)),
+            'clusters': clusters.astype(int).tolist(),
+            'distances': np.round(distances, 6).tolist(),
+            'pca': np.round(pca_coords, 6).tolist()
+        }
+
+    def get_info(self) -> Dict[str, Any]:
+        """获取模型摘要信息"""
+        return {
+            'algorithm': str(self.algorithm).upper(),
+            'n_clusters': int(len(self.cluster_ids)),
+            'n_features': len(self.features),
+            'max_batch_size': MAX_PREDICT_BATCH,
+            'created_at': self.created_at
+        }
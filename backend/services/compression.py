@@ -0,0 +1,323 @@
+"""
+响应压缩模块
+按 Accept-Encoding 协商 brotli / zstd / gzip，对普通响应整体压缩、对流式响应逐块压缩，
+并为可缓存的响应保存编码后的字节及各编码的预压缩结果
+"""
+
+import gzip
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+from flask import current_app, request
+from werkzeug.http import parse_accept_header
+
+from services.metrics import record_cache
+
+try:
+    import brotli
+except ImportError:  # brotli为可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard为可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# 小于该字节数的响应不压缩（压缩收益抵不过头部和CPU开销）
+MIN_COMPRESS_SIZE = 1024
+# 可压缩的MIME类型（text/* 均可压缩）
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/geo+json', 'application/x-ndjson',
+    'application/javascript', 'image/svg+xml'
+}
+# 动态响应使用较快的压缩级别；缓存响应在后台以较高级别重新压缩一次
+DYNAMIC_LEVELS = {'br': 5, 'zstd': 3, 'gzip': 6}
+PRECOMPRESS_LEVELS = {'br': 11, 'zstd': 19, 'gzip': 9}
+# 超过该大小的缓存响应不做高级别预压缩，只保留动态级别的结果
+PRECOMPRESS_MAX_SIZE = 8 * 1024 * 1024
+
+
+def available_encodings() -> list:
+    """服务端支持的编码，按优先级排列"""
+    encodings = []
+    if brotli is not None:
+        encodings.append('br')
+    if zstandard is not None:
+        encodings.append('zstd')
+    encodings.append('gzip')
+    return encodings
+
+
+def negotiate_encoding(accept_encodings, encodings: Optional[list] = None) -> Optional[str]:
+    """
+    根据请求的 Accept-Encoding 选择编码
+
+    Args:
+        accept_encodings: werkzeug 解析后的 request.accept_encodings
+        encodings: 可选编码（按服务端优先级排列），默认为全部已安装的编码
+
+    Returns:
+        质量值最高的编码，同质量时按服务端优先级；客户端都不接受时返回None
+    """
+    best, best_quality = None, 0
+    for encoding in encodings or available_encodings():
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_bytes(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """整体压缩字节串"""
+    level = DYNAMIC_LEVELS[encoding] if level is None else level
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str, level: Optional[int] = None) -> Iterator[bytes]:
+    """
+    逐块压缩字节流
+
+    每块之后执行flush，使已生成的数据立即发送给客户端，而不是等压缩器缓冲区写满
+    """
+    level = DYNAMIC_LEVELS[encoding] if level is None else level
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=level)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    elif encoding == 'zstd':
+        compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        process = compressor.compress
+        flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        finish = compressor.flush
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        process = compressor.compress
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = process(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def _is_compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_MIMETYPES)
+
+
+def _add_vary(response):
+    vary = {value.strip().lower() for value in response.headers.get('Vary', '').split(',') if value.strip()}
+    if 'accept-encoding' not in vary:
+        response.headers.add('Vary', 'Accept-Encoding')
+
+
+class ResponseCompressor:
+    """
+    响应压缩中间件
+
+    功能：
+    1. after_request 中按 Accept-Encoding 协商编码，小响应和不可压缩类型不处理
+    2. 流式响应（生成器）包装为逐块压缩的生成器
+    3. cache_response / cached_response 按缓存键保存编码后的响应字节，命中时跳过视图的数据构建、
+       JSON序列化和压缩；某编码首次被请求时以动态级别压缩并立即返回，高级别预压缩在后台线程中
+       完成后替换，请求不等待高级别压缩
+    """
+
+    def __init__(self, app=None, min_size: int = MIN_COMPRESS_SIZE, max_cached_payloads: int = 32):
+        """
+        初始化压缩中间件
+
+        Args:
+            app: Flask应用，可稍后调用 init_app
+            min_size: 小于该字节数的响应不压缩
+            max_cached_payloads: 预压缩缓存的最大响应数
+        """
+        self.min_size = min_size
+        self.max_cached_payloads = max_cached_payloads
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.compress_response)
+        logger.info(f"响应压缩已启用，支持编码: {', '.join(available_encodings())}")
+
+    def compress_response(self, response):
+        """after_request 钩子：按协商结果压缩响应"""
+        if (response.direct_passthrough or 'Content-Encoding' in response.headers
+                or not 200 <= response.status_code < 300 or response.status_code == 204
+                or not _is_compressible(response.mimetype)):
+            return response
+
+        _add_vary(response)
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = encoding
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        compressed = compress_bytes(body, encoding)
+        if len(compressed) >= len(body):
+            return response
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def cached_response(self, cache_key: Hashable):
+        """
+        按缓存键返回已缓存的响应，按客户端协商的编码直接使用预压缩字节
+
+        Returns:
+            Flask响应，未缓存时返回None
+        """
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None:
+                self._cache.move_to_end(cache_key)
+        record_cache('response', entry is not None)
+        if entry is None:
+            return None
+        return self._encoded_response(entry)
+
+    def cache_response(self, cache_key: Hashable, response):
+        """
+        缓存响应的字节并返回按协商编码的响应
+
+        缓存键必须唯一确定响应内容（通常包含数据版本）；非200响应和流式响应原样返回，不缓存
+
+        Args:
+            cache_key: 缓存键
+            response: 视图生成的Flask响应
+        """
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        entry = {
+            'mimetype': response.mimetype,
+            'content_type': response.content_type,
+            'variants': {'identity': response.get_data()},
+            # 已安排后台高级别预压缩的编码
+            'precompressing': set()
+        }
+        with self._lock:
+            self._cache[cache_key] = entry
+            while len(self._cache) > self.max_cached_payloads:
+                self._cache.popitem(last=False)
+        return self._encoded_response(entry)
+
+    def _negotiate_variant(self, entry: dict, accept_encodings) -> Optional[str]:
+        """缓存响应应使用的编码，不压缩时返回None"""
+        if _is_compressible(entry['mimetype']) and len(entry['variants']['identity']) >= self.min_size:
+            return negotiate_encoding(accept_encodings)
+        return None
+
+    def _variant(self, entry: dict, encoding: str) -> bytes:
+        """
+        缓存响应的指定编码字节
+
+        尚未生成时以动态级别压缩（并发请求可能各自压缩一次，只保留先完成的结果），
+        并安排后台线程以高级别重新压缩
+        """
+        with self._lock:
+            body = entry['variants'].get(encoding)
+        if body is not None:
+            return body
+
+        identity = entry['variants']['identity']
+        body = compress_bytes(identity, encoding)
+        with self._lock:
+            body = entry['variants'].setdefault(encoding, body)
+            schedule = len(identity) <= PRECOMPRESS_MAX_SIZE and encoding not in entry['precompressing']
+            if schedule:
+                entry['precompressing'].add(encoding)
+        if schedule:
+            # 每个 (缓存响应, 编码) 最多一次；不使用常驻线程池，gunicorn预加载fork后同样可用
+            threading.Thread(target=self._precompress, args=(entry, encoding),
+                             name=f'precompress-{encoding}', daemon=True).start()
+        return body
+
+    def _precompress(self, entry: dict, encoding: str):
+        """后台线程：以高压缩级别重新压缩，结果更小时替换动态级别的结果"""
+        try:
+            body = compress_bytes(entry['variants']['identity'], encoding, PRECOMPRESS_LEVELS[encoding])
+        except Exception as e:
+            logger.warning(f"预压缩响应 ({encoding}) 失败: {e}")
+            return
+        with self._lock:
+            if len(body) < len(entry['variants'][encoding]):
+                entry['variants'][encoding] = body
+
+    def _encoded_response(self, entry: dict):
+        """构建响应，按协商的编码使用缓存的压缩结果"""
+        body = entry['variants']['identity']
+        encoding = self._negotiate_variant(entry, request.accept_encodings)
+        if encoding is not None:
+            body = self._variant(entry, encoding)
+
+        response = current_app.response_class(body, content_type=entry['content_type'])
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+        if _is_compressible(entry['mimetype']):
+            _add_vary(response)
+        return response
+
+    def lookup_encoded(self, cache_key: Hashable, accept_encoding: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        """
+        不依赖Flask请求上下文地查找缓存响应（供ASGI服务在事件循环中直接返回）
+
+        只返回已经生成的编码结果，不在调用方线程中做任何压缩
+
+        Args:
+            cache_key: 缓存键
+            accept_encoding: 请求的 Accept-Encoding 头
+
+        Returns:
+            (响应体, 响应头)，未缓存或协商的编码尚未生成时返回None
+        """
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is None:
+                return None
+            self._cache.move_to_end(cache_key)
+
+        encoding = self._negotiate_variant(entry, parse_accept_header(accept_encoding))
+        with self._lock:
+            body = entry['variants'].get(encoding or 'identity')
+        if body is None:
+            return None
+        record_cache('response', True)
+        headers = {'Content-Type': entry['content_type'], 'Content-Length': str(len(body))}
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        if _is_compressible(entry['mimetype']):
+            headers['Vary'] = 'Accept-Encoding'
+        return body, headers
+
+    def clear(self):
+        """清空预压缩缓存"""
+        with self._lock:
+            self._cache.clear()
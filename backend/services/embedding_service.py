@@ -0,0 +1,234 @@
+"""
+降维嵌入服务模块
+为聚类特征矩阵计算PCA / Barnes-Hut t-SNE 二维嵌入，按特征矩阵哈希缓存结果
+"""
+
+import os
+import math
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+from sklearn.decomposition import PCA
+from sklearn.manifold import TSNE
+
+from services.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_METHODS = ('pca', 'tsne')
+# 嵌入计算的默认最大样本数，超过时进行确定性下采样
+DEFAULT_MAX_POINTS = 5000
+# t-SNE之前先用PCA降到的维度
+TSNE_PCA_COMPONENTS = 50
+
+
+def feature_matrix_hash(X: np.ndarray) -> str:
+    """计算特征矩阵的内容哈希（包含形状和数据类型）"""
+    X = np.ascontiguousarray(X)
+    hasher = hashlib.sha256(f"{X.shape}:{X.dtype.str}".encode())
+    hasher.update(X.tobytes())
+    return hasher.hexdigest()
+
+
+def encode_typed_array(array: np.ndarray, encoding: str = 'base64') -> Dict[str, Any]:
+    """
+    将数组编码为类型化数组描述
+
+    Args:
+        array: numpy数组
+        encoding: base64（小端字节，前端可直接构造TypedArray）或 json（嵌套列表）
+
+    Returns:
+        包含dtype、shape和data的字典
+    """
+    array = np.ascontiguousarray(array)
+    if encoding == 'json':
+        data = array.tolist()
+    else:
+        data = base64.b64encode(array.astype(array.dtype.newbyteorder('<'), copy=False).tobytes()).decode('ascii')
+    return {
+        'dtype': array.dtype.name,
+        'shape': list(array.shape),
+        'encoding': encoding,
+        'data': data
+    }
+
+
+class EmbeddingService:
+    """
+    嵌入计算服务
+
+    功能：
+    1. 大样本时按固定随机种子下采样
+    2. PCA预降维后运行Barnes-Hut t-SNE
+    3. 内存LRU缓存 + 磁盘.npy缓存，键为特征矩阵哈希与参数
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_memory_entries: int = 16):
+        """
+        初始化嵌入服务
+
+        Args:
+            cache_dir: 磁盘缓存目录，为None时只使用内存缓存
+            max_memory_entries: 内存缓存的最大条目数
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_entries = max_memory_entries
+        self._memory_cache = OrderedDict()
+        # _lock 只保护内存缓存和 _key_locks；同一缓存键的计算由各自的锁串行化
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _cache_key(self, matrix_hash: str, method: str, perplexity: float, max_points: int, random_state: int) -> str:
+        params = f"{method}:{perplexity:g}:{max_points}:{random_state}"
+        return hashlib.sha256(f"{matrix_hash}:{params}".encode()).hexdigest()[:32]
+
+    def _load_from_disk(self, cache_key: str) -> Optional[Dict[str, np.ndarray]]:
+        if self.cache_dir is None:
+            return None
+        coords_path = self.cache_dir / f"{cache_key}.coords.npy"
+        indices_path = self.cache_dir / f"{cache_key}.indices.npy"
+        if coords_path.exists() and indices_path.exists():
+            return {'coords': np.load(coords_path), 'indices': np.load(indices_path)}
+        return None
+
+    def _save_to_disk(self, cache_key: str, result: Dict[str, np.ndarray]):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for name in ('coords', 'indices'):
+                final_path = self.cache_dir / f"{cache_key}.{name}.npy"
+                tmp_path = self.cache_dir / f"{cache_key}.{name}.tmp.npy"
+                np.save(tmp_path, result[name])
+                os.replace(tmp_path, final_path)
+        except OSError as e:
+            logger.warning(f"写入嵌入缓存失败: {e}")
+
+    def _remember(self, cache_key: str, result: Dict[str, np.ndarray]):
+        self._memory_cache[cache_key] = result
+        self._memory_cache.move_to_end(cache_key)
+        while len(self._memory_cache) > self.max_memory_entries:
+            self._memory_cache.popitem(last=False)
+
+    @staticmethod
+    def sample_indices(n: int, max_points: int, random_state: int = 42) -> np.ndarray:
+        """确定性下采样，返回升序的行索引"""
+        if n <= max_points:
+            return np.arange(n, dtype=np.int32)
+        rng = np.random.default_rng(random_state)
+        return np.sort(rng.choice(n, size=max_points, replace=False)).astype(np.int32)
+
+    @staticmethod
+    def compute(X: np.ndarray, method: str = 'tsne', perplexity: float = 30.0, random_state: int = 42) -> np.ndarray:
+        """
+        计算二维嵌入（不经过缓存）
+
+        Args:
+            X: 已标准化的特征矩阵
+            method: pca 或 tsne
+            perplexity: t-SNE困惑度，会被限制在样本数以内
+            random_state: 随机种子
+
+        Returns:
+            float32类型的 (n, 2) 坐标数组
+        """
+        n_samples, n_features = X.shape
+        if n_samples < 3:
+            coords = np.zeros((n_samples, 2))
+            coords[:, :min(2, n_features)] = X[:, :2]
+            return coords.astype(np.float32)
+
+        if method == 'pca':
+            return PCA(n_components=2, random_state=random_state).fit_transform(X).astype(np.float32)
+
+        # 先用PCA降维以降低Barnes-Hut t-SNE的近邻计算成本
+        n_components = min(TSNE_PCA_COMPONENTS, n_features, n_samples)
+        if n_components < n_features:
+            X = PCA(n_components=n_components, random_state=random_state).fit_transform(X)
+
+        tsne = TSNE(
+            n_components=2,
+            perplexity=min(perplexity, n_samples - 1),
+            method='barnes_hut',
+            init='pca',
+            learning_rate='auto',
+            random_state=random_state
+        )
+        return tsne.fit_transform(X).astype(np.float32)
+
+    def get_embedding(self, X: np.ndarray, method: str = 'tsne', perplexity: float = 30.0,
+                      max_points: int = DEFAULT_MAX_POINTS, random_state: int = 42,
+                      matrix_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取特征矩阵的二维嵌入（带缓存）
+
+        Args:
+            X: 已标准化的特征矩阵
+            method: pca 或 tsne
+            perplexity: t-SNE困惑度
+            max_points: 最大样本数，超过时下采样
+            random_state: 随机种子
+            matrix_hash: 预先计算的特征矩阵哈希，避免每次请求重复哈希
+
+        Returns:
+            包含coords、indices、cache_key和cached标记的字典
+        """
+        if method not in SUPPORTED_METHODS:
+            raise ValueError(f"不支持的嵌入方法: {method}，可选: {', '.join(SUPPORTED_METHODS)}")
+        if not math.isfinite(perplexity) or perplexity <= 0:
+            raise ValueError("perplexity必须为正数")
+        if max_points < 1:
+            raise ValueError("max_points必须为正整数")
+
+        cache_key = self._cache_key(matrix_hash or feature_matrix_hash(X), method, perplexity, max_points, random_state)
+
+        with self._lock:
+            result = self._memory_cache.get(cache_key)
+            if result is not None:
+                self._memory_cache.move_to_end(cache_key)
+            else:
+                key_lock = self._key_locks.setdefault(cache_key, threading.Lock())
+        cached = result is not None
+
+        if result is None:
+            # 相同参数的并发请求等待同一次计算，不同参数的嵌入可以并行计算
+            with key_lock:
+                try:
+                    with self._lock:
+                        result = self._memory_cache.get(cache_key)
+                    if result is None:
+                        result = self._load_from_disk(cache_key)
+                    cached = result is not None
+                    if result is None:
+                        indices = self.sample_indices(len(X), max_points, random_state)
+                        logger.info(f"计算{method}嵌入: {len(indices)}/{len(X)} 个样本")
+                        result = {
+                            'coords': self.compute(X[indices], method, perplexity, random_state),
+                            'indices': indices
+                        }
+                        self._save_to_disk(cache_key, result)
+                    with self._lock:
+                        self._remember(cache_key, result)
+                finally:
+                    with self._lock:
+                        self._key_locks.pop(cache_key, None)
+        record_cache('embedding', cached)
+
+        return {
+            'coords': result['coords'],
+            'indices': result['indices'],
+            'cache_key': cache_key,
+            'cached': cached
+        }
+
+    def clear(self):
+        """清空内存缓存"""
+        with self._lock:
+            self._memory_cache.clear()
@@ -0,0 +1,135 @@
+"""
+预测查询服务模块
+加载 scripts/forecast.py 导出的各序列拟合参数，按需计算任意年数的预测
+"""
+
+import logging
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import joblib
+
+logger = logging.getLogger(__name__)
+
+# 单次查询允许的最大预测年数
+MAX_FORECAST_HORIZON = 20
+
+# 可查询的分组维度（与 scripts/forecast.py 中的 FORECAST_GROUPS 一致）
+FORECAST_GROUPS = ('overall', 'stars', 'region', 'city', 'cuisine')
+
+
+class ForecastLookupError(LookupError):
+    """分组维度或分组键不存在"""
+
+
+class ForecastModel:
+    """
+    预测模型参数集合
+
+    每个分组维度保存所有序列的末期水平、趋势和残差标准差，
+    预测值为 水平 + 步数×趋势，95%区间宽度随步数的平方根增长
+    """
+
+    def __init__(self, forecast_models: Dict[str, Dict]):
+        """
+        初始化预测模型
+
+        Args:
+            forecast_models: scripts/forecast.py 导出的 分组维度 -> 参数 字典
+        """
+        self.groups = {}
+        for group_by, params in forecast_models.items():
+            keys = list(params['keys'])
+            self.groups[group_by] = {
+                'keys': keys,
+                'key_index': {key: index for index, key in enumerate(keys)},
+                'years': np.asarray(params['years'], dtype=int),
+                'counts': np.asarray(params['counts'], dtype=float),
+                'model': np.asarray(params['model'], dtype=int),
+                'level': np.asarray(params['level'], dtype=float),
+                'trend': np.asarray(params['trend'], dtype=float),
+                'sigma': np.asarray(params['sigma'], dtype=float),
+                'model_names': list(params['model_names']),
+                'interval_z': float(params['interval_z'])
+            }
+
+    @classmethod
+    def load(cls, model_path: Path) -> 'ForecastModel':
+        """从joblib文件加载预测模型参数"""
+        return cls(joblib.load(model_path))
+
+    def predict(self, group_by: str, key: Optional[str] = None, horizon: int = 5) -> Dict[str, Any]:
+        """
+        计算一个分组维度下指定序列（默认全部序列）的预测
+
+        Args:
+            group_by: 分组维度（overall/stars/region/city/cuisine）
+            key: 分组键，为None时返回该维度的全部序列
+            horizon: 预测年数
+
+        Returns:
+            包含历史值、预测值及区间的字典
+
+        Raises:
+            ForecastLookupError: 分组维度或分组键不存在
+            ValueError: 预测年数超出范围
+        """
+        if group_by not in self.groups:
+            raise ForecastLookupError(f"未知的分组维度: {group_by}，可选: {', '.join(self.groups)}")
+        if not 1 <= horizon <= MAX_FORECAST_HORIZON:
+            raise ValueError(f"horizon必须在1到{MAX_FORECAST_HORIZON}之间")
+
+        group = self.groups[group_by]
+        if key is None:
+            columns = np.arange(len(group['keys']))
+        elif key in group['key_index']:
+            columns = np.array([group['key_index'][key]])
+        else:
+            raise ForecastLookupError(f"{group_by} 中不存在: {key}")
+
+        # 所选序列的预测一次性按矩阵计算，shape=(horizon, 序列数)
+        steps = np.arange(1, horizon + 1, dtype=float)[:, None]
+        point = group['level'][columns] + steps * group['trend'][columns]
+        spread = group['interval_z'] * group['sigma'][columns] * np.sqrt(steps)
+        point, lower, upper = (np.round(np.maximum(values, 0), 2).T.tolist()
+                               for values in (point, point - spread, point + spread))
+        history = group['counts'][:, columns].T.tolist()
+
+        years = group['years']
+        history_years = [str(year) for year in years.tolist()]
+        future_years = [str(year) for year in range(int(years[-1]) + 1, int(years[-1]) + 1 + horizon)]
+        model_names = group['model_names']
+
+        series = {}
+        for position, column in enumerate(columns.tolist()):
+            series[group['keys'][column]] = {
+                'model': model_names[group['model'][column]],
+                'history': dict(zip(history_years, history[position])),
+                'forecast': dict(zip(future_years, point[position])),
+                'lower_bound': dict(zip(future_years, lower[position])),
+                'upper_bound': dict(zip(future_years, upper[position])),
+                'trend': round(float(group['trend'][column]), 4)
+            }
+
+        return {
+            'group_by': group_by,
+            'horizon': horizon,
+            'history_range': f"{years[0]}-{years[-1]}",
+            'forecast_period': f"{future_years[0]}-{future_years[-1]}",
+            'series': series
+        }
+
+    def list_keys(self, group_by: str) -> List[str]:
+        """返回分组维度下的全部分组键"""
+        return list(self.groups[group_by]['keys'])
+
+    def get_info(self) -> Dict[str, Any]:
+        """返回各分组维度的序列数和历史年份范围"""
+        return {
+            group_by: {
+                'series_count': len(group['keys']),
+                'history_range': f"{group['years'][0]}-{group['years'][-1]}"
+            }
+            for group_by, group in self.groups.items()
+        }
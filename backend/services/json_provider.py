@@ -0,0 +1,154 @@
+"""
+JSON序列化模块
+通过Flask的JSON provider接口注册序列化实现：安装了orjson时使用orjson（原生支持numpy数组），
+否则回退到标准库json；两者都能直接序列化numpy标量/数组和pandas对象，浮点NaN/inf都输出为null
+"""
+
+import os
+import math
+import logging
+from typing import Any, Dict, List, Optional, Type
+
+import numpy as np
+import pandas as pd
+from flask.json.provider import JSONProvider, DefaultJSONProvider, _default as flask_default
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# 通过环境变量选择序列化实现：auto（默认，优先orjson）/ orjson / stdlib
+JSON_BACKEND_ENV = 'MICHELIN_JSON_BACKEND'
+
+
+def frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """按列一次性将DataFrame转换为Python原生类型的记录列表，缺失值为None"""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def numpy_default(obj: Any) -> Any:
+    """
+    序列化json/orjson不能直接处理的对象
+
+    numpy标量转为Python标量（NaN/inf转为None），数组、Series和Index转为列表，
+    DataFrame转为记录列表，其余类型交给Flask的默认处理
+    """
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj) if np.isfinite(obj) else None
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, pd.DataFrame):
+        return frame_to_records(obj)
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.tolist()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    return flask_default(obj)
+
+
+def replace_non_finite(obj: Any) -> Any:
+    """递归地将浮点NaN/inf替换为None（numpy数组和pandas对象先转换为Python类型）"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: replace_non_finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [replace_non_finite(value) for value in obj]
+    if isinstance(obj, (np.ndarray, pd.DataFrame, pd.Series, pd.Index)):
+        return replace_non_finite(numpy_default(obj))
+    return obj
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    基于标准库json的provider
+
+    不转义非ASCII字符、不排序键，以减小响应体积和序列化开销；
+    标准库默认把Python浮点NaN/inf输出为不合法的 NaN/Infinity，这里与orjson一致输出null
+    """
+
+    default = staticmethod(numpy_default)
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        kwargs.setdefault('allow_nan', False)
+        try:
+            return super().dumps(obj, **kwargs)
+        except ValueError as e:
+            # 含有NaN/inf时才遍历替换，不含时不增加开销；循环引用等其他错误原样抛出
+            if 'Out of range float values' not in str(e):
+                raise
+            return super().dumps(replace_non_finite(obj), **kwargs)
+
+
+class OrjsonJSONProvider(JSONProvider):
+    """
+    基于orjson的provider
+
+    numpy数组由orjson原生序列化，浮点NaN/inf输出为null；响应体直接使用orjson生成的字节
+    """
+
+    mimetype = 'application/json'
+    compact: Optional[bool] = None
+
+    @staticmethod
+    def _options(indent: bool = False) -> int:
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=numpy_default, option=self._options(bool(kwargs.get('indent')))).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=numpy_default, option=self._options(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+JSON_PROVIDERS: Dict[str, Type[JSONProvider]] = {
+    'stdlib': NumpyJSONProvider,
+    'orjson': OrjsonJSONProvider
+}
+
+
+def get_json_provider_class(backend: Optional[str] = None) -> Type[JSONProvider]:
+    """
+    选择JSON provider
+
+    Args:
+        backend: auto / orjson / stdlib，为None时读取环境变量 MICHELIN_JSON_BACKEND
+
+    Raises:
+        ValueError: 未知的实现名称，或指定orjson但未安装
+    """
+    backend = (backend or os.environ.get(JSON_BACKEND_ENV, 'auto')).lower()
+    if backend == 'auto':
+        backend = 'orjson' if orjson is not None else 'stdlib'
+    if backend not in JSON_PROVIDERS:
+        raise ValueError(f"未知的JSON序列化实现: {backend}，可选: auto, {', '.join(JSON_PROVIDERS)}")
+    if backend == 'orjson' and orjson is None:
+        raise ValueError("orjson未安装，无法使用orjson序列化")
+    return JSON_PROVIDERS[backend]
+
+
+def create_json_provider(app, backend: Optional[str] = None) -> JSONProvider:
+    """为Flask应用创建JSON provider，用法: app.json = create_json_provider(app)"""
+    provider_class = get_json_provider_class(backend)
+    logger.info(f"JSON序列化: {provider_class.__name__}")
+    return provider_class(app)
@@ -0,0 +1,294 @@
+"""
+运行指标模块
+进程内的计数器、仪表和直方图，以 Prometheus 文本格式输出；
+记录各接口的耗时和响应体积、各级缓存的命中情况、筛选扫描/命中/返回的行数以及数据加载耗时
+
+指标按进程统计：多worker部署时每个worker分别计数，由Prometheus按实例抓取后汇总
+"""
+
+import time
+import logging
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for suffix, labelvalues, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, labelvalues, extra)} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """单调递增的计数器"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [('', key, None, value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的当前值；提供 callback 时在输出时计算各标签组合的值"""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                logger.warning(f"计算指标 {self.name} 时出错: {e}")
+                values = {}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [('', key, None, value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """累计分桶的直方图"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        samples = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', key, ('le', _format_value(bound)), cumulative))
+            samples.append(('_sum', key, None, total))
+            samples.append(('_count', key, None, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """指标注册表，按注册顺序输出"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (), callback=None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_COUNT = registry.counter(
+    'michelin_http_requests_total', 'HTTP请求数', ('method', 'endpoint', 'status'))
+REQUEST_DURATION = registry.histogram(
+    'michelin_http_request_duration_seconds', 'HTTP请求耗时（至响应体发送完毕）', ('method', 'endpoint'))
+RESPONSE_SIZE = registry.histogram(
+    'michelin_http_response_size_bytes', 'HTTP响应体字节数（压缩后）', ('endpoint',), SIZE_BUCKETS)
+CACHE_REQUESTS = registry.counter(
+    'michelin_cache_requests_total', '缓存查找次数', ('cache', 'result'))
+FILTER_ROWS_SCANNED = registry.counter(
+    'michelin_filter_rows_scanned_total', '筛选条件求值时扫描的行数（命中掩码缓存时不扫描）')
+FILTER_ROWS_MATCHED = registry.counter(
+    'michelin_filter_rows_matched_total', '筛选条件求值时命中的行数')
+ROWS_RETURNED = registry.counter(
+    'michelin_rows_returned_total', '查询返回的行数', ('query',))
+DATA_LOAD_DURATION = registry.gauge(
+    'michelin_data_load_duration_seconds', '最近一次数据加载中各数据集的加载耗时', ('dataset',))
+
+
+def record_cache(cache: str, hit: bool):
+    """记录一次缓存查找"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def cache_hit_ratios() -> Dict[Tuple, float]:
+    """各缓存的命中率"""
+    with CACHE_REQUESTS._lock:
+        values = dict(CACHE_REQUESTS._values)
+    ratios = {}
+    for cache in {cache for cache, _ in values}:
+        hits, misses = values.get((cache, 'hit'), 0), values.get((cache, 'miss'), 0)
+        ratios[(cache,)] = hits / (hits + misses) if hits + misses else 0.0
+    return ratios
+
+
+registry.gauge('michelin_cache_hit_ratio', '各缓存的命中率', ('cache',), callback=cache_hit_ratios)
+
+
+class DataLoadTimer:
+    """按顺序记录数据加载各阶段耗时：每次 lap 记录距上一次 lap 的时间"""
+
+    def __init__(self):
+        self.start = self._last = time.perf_counter()
+
+    def lap(self, dataset: str):
+        now = time.perf_counter()
+        DATA_LOAD_DURATION.set(now - self._last, dataset=dataset)
+        self._last = now
+
+    def finish(self):
+        DATA_LOAD_DURATION.set(time.perf_counter() - self.start, dataset='total')
+
+
+class _MeteredIterable:
+    """包装WSGI响应体：统计发送的字节数，在关闭时记录请求耗时和响应体积"""
+
+    def __init__(self, iterable, on_close: Callable[[int], None]):
+        self._iterable = iterable
+        self._on_close = on_close
+        self._size = 0
+
+    def __iter__(self):
+        for chunk in self._iterable:
+            self._size += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            self._on_close(self._size)
+
+
+class RequestMetrics:
+    """
+    请求指标中间件
+
+    以WSGI中间件包装Flask应用，在响应体发送完毕（包括流式响应和after_request中的压缩）后
+    记录请求数、耗时和响应体积；接口按Flask端点名统计，未匹配的路径记为 unmatched
+    """
+
+    ENVIRON_KEY = 'michelin.endpoint'
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._tag_endpoint)
+        app.wsgi_app = self.wrap(app.wsgi_app)
+
+    @classmethod
+    def _tag_endpoint(cls):
+        from flask import request
+        request.environ[cls.ENVIRON_KEY] = request.endpoint or 'unmatched'
+
+    def wrap(self, wsgi_app):
+        def metered_app(environ, start_response):
+            start = time.perf_counter()
+            status = {}
+
+            def metered_start_response(status_line, headers, exc_info=None):
+                status['code'] = status_line.split(' ', 1)[0]
+                return start_response(status_line, headers, exc_info)
+
+            def on_close(size: int):
+                observe_request(environ['REQUEST_METHOD'], environ.get(self.ENVIRON_KEY, 'unmatched'),
+                                status.get('code', '500'), size, time.perf_counter() - start)
+
+            return _MeteredIterable(wsgi_app(environ, metered_start_response), on_close)
+        return metered_app
+
+
+def observe_request(method: str, endpoint: str, status, size: int, seconds: float):
+    """记录一次请求"""
+    REQUEST_COUNT.inc(method=method, endpoint=endpoint, status=status)
+    REQUEST_DURATION.observe(seconds, method=method, endpoint=endpoint)
+    RESPONSE_SIZE.observe(size, endpoint=endpoint)
+
+
+def render_metrics() -> str:
+    """Prometheus文本格式的全部指标"""
+    return registry.render()
@@ -0,0 +1,143 @@
+"""
+餐厅数据导出模块
+将筛选后的餐厅数据按固定行数分块编码为 NDJSON / CSV / Parquet，
+以生成器逐块输出，不在内存中构建完整的导出内容；传输压缩由响应压缩中间件逐块完成
+"""
+
+import io
+import logging
+from typing import Dict, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow为可选依赖，未安装时不支持parquet导出
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# 每个编码块的行数
+EXPORT_CHUNK_ROWS = 5000
+
+# 格式 -> (MIME类型, 文件扩展名)；parquet列块内部已压缩，其MIME类型不在中间件的可压缩列表中
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+
+
+def check_export_format(export_format: str) -> None:
+    """
+    校验导出格式
+
+    Raises:
+        ValueError: 格式不支持，或parquet所需的pyarrow未安装
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"format只能是{'、'.join(EXPORT_FORMATS)}")
+    if export_format == 'parquet' and pq is None:
+        raise ValueError("parquet导出需要安装pyarrow")
+
+
+def _iter_frames(df: pd.DataFrame, rows: np.ndarray, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(rows), chunk_rows):
+        yield df.iloc[rows[start:start + chunk_rows]]
+
+
+def _iter_ndjson(frames: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    for frame in frames:
+        text = frame.to_json(orient='records', lines=True, force_ascii=False, date_format='iso')
+        yield (text if text.endswith('\n') else text + '\n').encode('utf-8')
+
+
+def _iter_csv(frames: Iterable[pd.DataFrame], columns) -> Iterator[bytes]:
+    # 结果为空时仍输出表头
+    yield pd.DataFrame(columns=columns).to_csv(index=False).encode('utf-8')
+    for frame in frames:
+        yield frame.to_csv(index=False, header=False).encode('utf-8')
+
+
+class _DrainableBuffer(io.RawIOBase):
+    """只追加的写缓冲，每次取走已写入的字节，供ParquetWriter按行组流式输出"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_schema(df: pd.DataFrame, sample_rows: int):
+    """
+    确定所有行组共用的schema
+
+    数值列由dtype决定，object列的类型从前 sample_rows 行推断；样本中全为缺失值的列按字符串处理
+    """
+    schema = pa.Schema.from_pandas(df.iloc[:sample_rows], preserve_index=False)
+    for index, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(index, field.with_type(pa.string()))
+    return schema
+
+
+def _iter_parquet(frames: Iterable[pd.DataFrame], schema) -> Iterator[bytes]:
+    buffer = _DrainableBuffer()
+    writer = pq.ParquetWriter(buffer, schema, compression='snappy')
+    try:
+        for frame in frames:
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            yield buffer.drain()
+    finally:
+        writer.close()
+    yield buffer.drain()
+
+
+def iter_export(df: pd.DataFrame, rows: np.ndarray, export_format: str,
+                chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    按导出格式逐块编码选中的行
+
+    Args:
+        df: 餐厅数据
+        rows: 导出的行号（已按排序排列）
+        export_format: ndjson / csv / parquet
+        chunk_rows: 每块行数
+
+    Returns:
+        字节块生成器
+    """
+    check_export_format(export_format)
+    frames = _iter_frames(df, rows, chunk_rows)
+    if export_format == 'ndjson':
+        return _iter_ndjson(frames)
+    if export_format == 'csv':
+        return _iter_csv(frames, df.columns)
+    return _iter_parquet(frames, _parquet_schema(df, chunk_rows))
+
+
+def export_headers(export_format: str, filename: str = 'restaurants') -> Dict[str, str]:
+    """导出响应的附件文件名头"""
+    return {
+        'Content-Disposition': f'attachment; filename="{filename}.{EXPORT_FORMATS[export_format][1]}"',
+        # 禁止反向代理缓冲，使数据块尽快到达客户端
+        'X-Accel-Buffering': 'no'
+    }
@@ -0,0 +1,330 @@
+"""
+餐厅查询索引模块
+在数据加载时为每个可排序字段预计算排序置换，按筛选条件缓存命中位置，
+支持页码分页和不透明游标分页，翻页只需 O(每页条数) 的开销
+"""
+
+import json
+import base64
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.metrics import record_cache, FILTER_ROWS_SCANNED, FILTER_ROWS_MATCHED, ROWS_RETURNED
+
+logger = logging.getLogger(__name__)
+
+# 允许排序的字段
+SORT_FIELDS = ('name', 'stars', 'year', 'city', 'cuisine')
+SORT_ORDERS = ('asc', 'desc')
+# 支持子串匹配（不区分大小写）的文本字段
+TEXT_FIELDS = ('name', 'city', 'region', 'cuisine')
+# 关键词搜索匹配的字段
+SEARCH_FIELDS = ('name', 'city', 'region', 'cuisine')
+# 筛选参数（与 /api/restaurants 的查询参数同名）
+FILTER_PARAMS = ('q', 'stars', 'region', 'city', 'cuisine', 'price_level', 'year_start', 'year_end')
+# 列表接口返回的字段
+RESTAURANT_FIELDS = ('name', 'city', 'region', 'stars', 'cuisine', 'price', 'price_level', 'year',
+                     'latitude', 'longitude', 'url', 'continent', 'climate_zone')
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析，或与当前数据版本、排序方式、筛选条件不匹配"""
+
+
+def _sort_keys(column: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将列转换为保持排序关系的整数键
+
+    Returns:
+        (升序键, 降序键)，两个方向上缺失值都排在最后（与 sort_values 的 na_position='last' 一致）
+    """
+    codes, uniques = pd.factorize(column, sort=True)
+    missing = codes < 0
+    n_unique = len(uniques)
+    return np.where(missing, n_unique, codes), np.where(missing, n_unique, n_unique - 1 - codes)
+
+
+class RestaurantIndex:
+    """
+    餐厅查询索引
+
+    功能：
+    1. 加载时为每个排序字段预计算升序/降序的行置换（同值按原始行号排列，结果确定）
+    2. 文本字段在去重后的取值上做子串匹配，再按编码映射回行
+    3. 筛选条件对应的行掩码和命中位置按LRU缓存，同一筛选条件的后续翻页、换排序方式
+       以及批量请求中的其他子请求都无需重新筛选
+    4. 游标记录上一页最后一行在排序置换中的位置，下一页从该位置之后继续
+    """
+
+    def __init__(self, df: pd.DataFrame, data_version: int, max_cached_filters: int = 64):
+        """
+        初始化查询索引
+
+        Args:
+            df: 清洗后的餐厅数据
+            data_version: 数据版本，写入游标以便数据重新加载后识别失效游标
+            max_cached_filters: 缓存的筛选条件数量上限
+        """
+        self.df = df.reset_index(drop=True)
+        self.data_version = data_version
+        self.max_cached_filters = max_cached_filters
+        self._match_cache = OrderedDict()
+        self._mask_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        n = len(self.df)
+        row_ids = np.arange(n)
+        self.orders = {}
+        for field in SORT_FIELDS:
+            if field not in self.df.columns:
+                continue
+            ascending_keys, descending_keys = _sort_keys(self.df[field])
+            self.orders[(field, 'asc')] = np.lexsort((row_ids, ascending_keys))
+            self.orders[(field, 'desc')] = np.lexsort((row_ids, descending_keys))
+
+        # 文本字段的 (行编码, 去重取值)
+        self.text_values = {}
+        for field in TEXT_FIELDS:
+            if field in self.df.columns:
+                codes, uniques = pd.factorize(self.df[field])
+                self.text_values[field] = (codes, pd.Series(uniques, dtype=object))
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    @staticmethod
+    def normalize_filters(params) -> Dict[str, str]:
+        """从请求参数中提取非空的筛选条件"""
+        filters = {}
+        for name in FILTER_PARAMS:
+            value = params.get(name)
+            if value is not None and str(value).strip():
+                filters[name] = str(value).strip()
+        return filters
+
+    def _contains(self, field: str, term: str) -> np.ndarray:
+        """不区分大小写的子串匹配，只对去重后的取值求值"""
+        if field not in self.text_values:
+            return np.zeros(len(self.df), dtype=bool)
+        codes, uniques = self.text_values[field]
+        hits = uniques.str.contains(term, case=False, regex=False, na=False).to_numpy(dtype=bool)
+        # 编码-1（缺失值）映射到末尾追加的False
+        return np.append(hits, False)[codes]
+
+    def filter_mask(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """
+        计算筛选条件的行掩码
+
+        Args:
+            filters: normalize_filters 返回的筛选条件
+
+        Returns:
+            布尔数组，没有筛选条件时返回None
+        """
+        if not filters:
+            return None
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+
+        if 'q' in filters:
+            search = np.zeros(len(df), dtype=bool)
+            for field in SEARCH_FIELDS:
+                search |= self._contains(field, filters['q'])
+            mask &= search
+        if 'stars' in filters:
+            mask &= (df['stars'] == int(filters['stars'])).to_numpy()
+        for field in ('region', 'city', 'cuisine'):
+            if field in filters:
+                mask &= self._contains(field, filters[field])
+        if 'price_level' in filters:
+            price_column = 'price_level' if 'price_level' in df.columns else 'price'
+            mask &= (df[price_column] == filters['price_level']).to_numpy()
+        if 'year_start' in filters:
+            mask &= (df['year'] >= int(filters['year_start'])).to_numpy()
+        if 'year_end' in filters:
+            mask &= (df['year'] <= int(filters['year_end'])).to_numpy()
+        return mask
+
+    def cached_filter_mask(self, filters: Dict[str, str]) -> Optional[np.ndarray]:
+        """按筛选条件签名缓存的 filter_mask，不同排序方式共用同一掩码"""
+        if not filters:
+            return None
+        signature = self.filter_signature(filters)
+        with self._lock:
+            if signature in self._mask_cache:
+                self._mask_cache.move_to_end(signature)
+                record_cache('filter_mask', True)
+                return self._mask_cache[signature]
+
+        mask = self.filter_mask(filters)
+        record_cache('filter_mask', False)
+        FILTER_ROWS_SCANNED.inc(len(mask))
+        FILTER_ROWS_MATCHED.inc(int(mask.sum()))
+
+        with self._lock:
+            self._mask_cache[signature] = mask
+            while len(self._mask_cache) > self.max_cached_filters:
+                self._mask_cache.popitem(last=False)
+        return mask
+
+    @staticmethod
+    def filter_signature(filters: Dict[str, str]) -> str:
+        return hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:16]
+
+    def _order(self, sort_by: str, sort_order: str) -> Optional[np.ndarray]:
+        if sort_by is None:
+            return None
+        if sort_order not in SORT_ORDERS:
+            raise ValueError(f"sort_order只能是{'或'.join(SORT_ORDERS)}")
+        if (sort_by, sort_order) not in self.orders:
+            available = [field for field in SORT_FIELDS if (field, 'asc') in self.orders]
+            raise ValueError(f"sort_by只能是{'、'.join(available)}")
+        return self.orders[(sort_by, sort_order)]
+
+    def matched_positions(self, filters: Dict[str, str], sort_by: Optional[str] = None,
+                          sort_order: str = 'asc') -> Optional[np.ndarray]:
+        """
+        返回满足筛选条件的行在排序置换中的位置（升序），没有筛选条件时返回None
+
+        结果按 (筛选条件, 排序方式) 缓存
+        """
+        if not filters:
+            return None
+        cache_key = (self.filter_signature(filters), sort_by, sort_order)
+        with self._lock:
+            if cache_key in self._match_cache:
+                self._match_cache.move_to_end(cache_key)
+                record_cache('filter_positions', True)
+                return self._match_cache[cache_key]
+        record_cache('filter_positions', False)
+
+        mask = self.cached_filter_mask(filters)
+        order = self._order(sort_by, sort_order)
+        positions = np.flatnonzero(mask if order is None else mask[order])
+
+        with self._lock:
+            self._match_cache[cache_key] = positions
+            while len(self._match_cache) > self.max_cached_filters:
+                self._match_cache.popitem(last=False)
+        return positions
+
+    def row_indices(self, filters: Dict[str, str], sort_by: Optional[str] = None,
+                    sort_order: str = 'asc') -> np.ndarray:
+        """返回满足筛选条件的全部行号，按排序方式排列"""
+        order = self._order(sort_by, sort_order)
+        matched = self.matched_positions(filters, sort_by, sort_order)
+        if matched is None:
+            rows = np.arange(len(self.df)) if order is None else order
+        else:
+            rows = matched if order is None else order[matched]
+        ROWS_RETURNED.inc(len(rows), query='all')
+        return rows
+
+    def encode_cursor(self, sort_by: Optional[str], sort_order: str, filters: Dict[str, str], position: int) -> str:
+        """生成不透明游标：记录数据版本、排序方式、筛选条件签名和最后一行的排序位置"""
+        payload = json.dumps([self.data_version, sort_by, sort_order, self.filter_signature(filters), position],
+                             separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor: str, sort_by: Optional[str], sort_order: str, filters: Dict[str, str]) -> int:
+        """
+        解析游标并校验其与当前查询一致
+
+        Returns:
+            上一页最后一行在排序置换中的位置
+
+        Raises:
+            InvalidCursorError: 游标格式错误或已失效
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            version, cursor_sort_by, cursor_order, signature, position = json.loads(base64.urlsafe_b64decode(padded))
+            position = int(position)
+        except (ValueError, TypeError) as e:
+            raise InvalidCursorError(f"游标格式错误: {e}")
+        if version != self.data_version:
+            raise InvalidCursorError("数据已重新加载，游标已失效，请从第一页重新开始")
+        if (cursor_sort_by, cursor_order, signature) != (sort_by, sort_order, self.filter_signature(filters)):
+            raise InvalidCursorError("游标与当前的排序或筛选条件不一致")
+        if position < 0 or position >= len(self.df):
+            raise InvalidCursorError("游标位置超出范围")
+        return position
+
+    def page(self, filters: Dict[str, str], sort_by: Optional[str] = None, sort_order: str = 'asc',
+             page: int = 1, per_page: int = 50, cursor: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        获取一页数据
+
+        Args:
+            filters: 筛选条件
+            sort_by: 排序字段，为None时保持原始顺序
+            sort_order: asc 或 desc
+            page: 页码（从1开始），提供游标时忽略
+            per_page: 每页条数
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            (当前页数据, 分页信息)
+        """
+        if page < 1 or per_page < 1:
+            raise ValueError("page和per_page必须为正整数")
+        order = self._order(sort_by, sort_order)
+        matched = self.matched_positions(filters, sort_by, sort_order)
+        total = len(self.df) if matched is None else len(matched)
+
+        # start 为当前页第一条在筛选结果中的序号
+        if cursor:
+            last_position = self.decode_cursor(cursor, sort_by, sort_order, filters)
+            start = last_position + 1 if matched is None else int(np.searchsorted(matched, last_position, side='right'))
+        else:
+            start = (page - 1) * per_page
+        end = min(start + per_page, total)
+
+        positions = np.arange(start, end) if matched is None else matched[start:end]
+        rows = positions if order is None else order[positions]
+        page_df = self.df.iloc[rows]
+        ROWS_RETURNED.inc(len(rows), query='page')
+
+        next_cursor = None
+        if end < total and len(positions):
+            next_cursor = self.encode_cursor(sort_by, sort_order, filters, int(positions[-1]))
+
+        pagination = {
+            'page': start // per_page + 1,
+            'per_page': per_page,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page,
+            'sort_by': sort_by,
+            'sort_order': sort_order,
+            'next_cursor': next_cursor
+        }
+        return page_df, pagination
+
+
+def restaurants_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    将餐厅数据转换为列表接口的记录格式
+
+    文本字段缺失时为空字符串，星级和年份缺失时为0，坐标缺失时为None
+    """
+    columns = {}
+    n = len(df)
+    for field in RESTAURANT_FIELDS:
+        if field not in df.columns:
+            columns[field] = [None if field in ('latitude', 'longitude') else ''] * n
+            continue
+        column = df[field]
+        if field in ('stars', 'year'):
+            columns[field] = pd.to_numeric(column, errors='coerce').fillna(0).astype(int).tolist()
+        elif field in ('latitude', 'longitude'):
+            values = pd.to_numeric(column, errors='coerce').astype(object)
+            columns[field] = values.where(values.notna(), None).tolist()
+        else:
+            columns[field] = column.astype(object).where(column.notna(), '').tolist()
+    return [dict(zip(RESTAURANT_FIELDS, values)) for values in zip(*(columns[field] for field in RESTAURANT_FIELDS))]
@@ -0,0 +1,195 @@
+"""
+特征工程向量化基准测试
+在合成的大表上对比逐行 .apply 参考实现与 FeatureEngineer 的向量化实现，
+校验结果完全一致并输出耗时和加速比；并校验 FeatureTransform 的批量、单条记录结果与 FeatureEngineer 一致
+
+用法: python benchmarks/bench_feature_engineering.py [--rows 1000000]
+"""
+
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+
+import feature_engineering as fe
+from feature_engineering import FeatureEngineer
+from feature_transform import ASIAN_CUISINES, EUROPEAN_CUISINES, MODERN_CUISINES, FeatureTransform
+
+# 单条记录路径校验的行数（逐条调用 transform_record）
+RECORD_CHECK_ROWS = 5000
+
+
+def make_synthetic_restaurants(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成与地理编码数据结构一致的合成餐厅表"""
+    rng = np.random.default_rng(seed)
+
+    # 缺失的菜系为NaN，与从CSV读取的数据一致
+    cuisines = ASIAN_CUISINES + EUROPEAN_CUISINES + MODERN_CUISINES + ['Seafood', 'Steakhouse', 'Market cuisine', np.nan]
+    cities = ['Paris', 'Tokyo', 'New York', 'London', 'Hong Kong', 'Singapore', 'Wien', 'Salzburg', 'Chicago', 'Seoul']
+    name_parts = ['Le', 'La', 'Café', 'Maison', 'Royal', 'Grand', 'Sushi', 'Москва', '東京', 'House', 'Kitchen',
+                  'Bistro', 'Osteria', 'No.', '7', 'Ünique', 'Garden', 'Table', 'Palace', 'Manor']
+
+    # 名称由词片段组合而成，取值数量接近真实数据的重复程度
+    n_names = max(n_rows // 4, 1)
+    name_pool = np.array([' '.join(rng.choice(name_parts, size=rng.integers(1, 4))) for _ in range(n_names)], dtype=object)
+
+    price = rng.integers(1, 6, size=n_rows).astype(float)
+    price[rng.random(n_rows) < 0.05] = np.nan
+
+    return pd.DataFrame({
+        'name': name_pool[rng.integers(0, n_names, size=n_rows)],
+        'city': np.array(cities, dtype=object)[rng.integers(0, len(cities), size=n_rows)],
+        'cuisine': np.array(cuisines, dtype=object)[rng.integers(0, len(cuisines), size=n_rows)],
+        'price_numeric': price,
+        'stars': rng.integers(1, 4, size=n_rows),
+        'year': np.full(n_rows, 2019),
+        'latitude': rng.uniform(-60, 70, size=n_rows),
+        'longitude': rng.uniform(-170, 170, size=n_rows),
+        'city_restaurant_density': rng.integers(1, 200, size=n_rows).astype(float),
+        'years_since_award': np.full(n_rows, 6),
+        'continent': np.array(['Europe', 'Asia', 'North America'], dtype=object)[rng.integers(0, 3, size=n_rows)]
+    })
+
+
+# ---- 逐行参考实现（与向量化之前的 FeatureEngineer 逻辑相同） ----
+
+def reference_price_category(df):
+    def price_category(price_num):
+        if price_num <= 1:
+            return 'Budget'
+        elif price_num <= 2:
+            return 'Moderate'
+        elif price_num <= 3:
+            return 'Expensive'
+        elif price_num <= 4:
+            return 'Very Expensive'
+        else:
+            return 'Luxury'
+    return df['price_numeric'].apply(price_category)
+
+
+def reference_density_level(df):
+    density_quantiles = df['city_restaurant_density'].quantile([0.25, 0.5, 0.75])
+
+    def density_level(density):
+        if density <= density_quantiles[0.25]:
+            return 'Low Density'
+        elif density <= density_quantiles[0.5]:
+            return 'Medium Density'
+        elif density <= density_quantiles[0.75]:
+            return 'High Density'
+        else:
+            return 'Very High Density'
+    return df['city_restaurant_density'].apply(density_level)
+
+
+def reference_cuisine_type(df):
+    def classify_cuisine_type(cuisine):
+        if cuisine in ASIAN_CUISINES:
+            return 'Asian'
+        elif cuisine in EUROPEAN_CUISINES:
+            return 'European'
+        elif cuisine in MODERN_CUISINES:
+            return 'Modern'
+        else:
+            return 'Other'
+    return df['cuisine'].apply(classify_cuisine_type)
+
+
+def reference_name_complexity(df):
+    return df['name'].astype(str).apply(lambda x: len(re.findall(r'[A-Z]', x)) + len(re.findall(r'[0-9]', x)))
+
+
+def reference_name_style(df):
+    def detect_name_style(name):
+        name = str(name).lower()
+        if re.search(r'[àáâãäåæçèéêëìíîïñòóôõöøùúûüý]', name):
+            return 'European'
+        elif re.search(r'[亜-熹一-龯]', name):
+            return 'Asian'
+        elif re.search(r'[а-я]', name):
+            return 'Cyrillic'
+        else:
+            return 'English'
+    return df['name'].apply(detect_name_style)
+
+
+# (特征列, 逐行参考实现, 向量化实现)
+CASES = [
+    ('price_category', reference_price_category, lambda df: fe.price_category(df['price_numeric'])),
+    ('density_level', reference_density_level, lambda df: fe.density_level(
+        df['city_restaurant_density'], df['city_restaurant_density'].quantile([0.25, 0.5, 0.75]))),
+    ('cuisine_type', reference_cuisine_type, lambda df: fe.classify_cuisine_type(df['cuisine'])),
+    ('name_complexity', reference_name_complexity, lambda df: fe.name_complexity(df['name'])),
+    ('name_style', reference_name_style, lambda df: fe.detect_name_style(df['name']))
+]
+
+
+def check_feature_transform(df: pd.DataFrame):
+    """
+    校验 FeatureTransform：transform 与 FeatureEngineer 的稠密输出一致，transform_record 与 transform 一致
+
+    目标编码列不与 FeatureEngineer 比较：训练特征为折外编码，FeatureTransform 保存的是全量数据的平滑统计量
+    """
+    engineer = FeatureEngineer()
+    dense = engineer.process_features(df.copy(), use_cache=False)
+    transform = FeatureTransform().fit(df, engineer.aggregation_specs)
+    batch = transform.transform(df)
+
+    for column in transform.feature_columns:
+        if column.endswith(('_target_encoded', '_target_std')):
+            continue
+        pd.testing.assert_series_equal(batch[column], dense[column], check_dtype=False, check_categorical=False)
+
+    sample = df.iloc[:RECORD_CHECK_ROWS]
+    records = pd.DataFrame([transform.transform_record(record) for record in sample.to_dict('records')],
+                           index=sample.index)
+    for column in transform.feature_columns:
+        pd.testing.assert_series_equal(records[column], batch[column].loc[sample.index],
+                                       check_dtype=False, check_categorical=False)
+    print(f"FeatureTransform: {len(transform.feature_columns)} 个特征，transform / transform_record / FeatureEngineer 一致")
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(n_rows: int):
+    print(f"生成 {n_rows:,} 行合成数据...")
+    df = make_synthetic_restaurants(n_rows)
+
+    print(f"\n{'特征':<18}{'逐行apply(s)':>14}{'向量化(s)':>12}{'加速比':>10}  一致")
+    for column, reference, vectorized in CASES:
+        expected, reference_time = timed(reference, df)
+        actual, vectorized_time = timed(vectorized, df)
+        pd.testing.assert_series_equal(
+            pd.Series(actual, name=column), expected.reset_index(drop=True).rename(column),
+            check_dtype=False
+        )
+        print(f"{column:<18}{reference_time:>14.3f}{vectorized_time:>12.3f}{reference_time / vectorized_time:>9.1f}x  ok")
+
+    print()
+    check_feature_transform(df.iloc[:n_rows // 10])
+
+    # 线性扩展性：完整流程在不同规模下的单行耗时
+    print("\n完整 process_features 单行耗时:")
+    for size in (n_rows // 10, n_rows):
+        sample = df.iloc[:size].copy()
+        _, elapsed = timed(lambda frame: FeatureEngineer().process_features(frame, use_cache=False), sample)
+        print(f"  {size:>10,} 行: {elapsed:.2f}s ({elapsed / size * 1e6:.2f} µs/行)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='特征工程向量化基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='合成数据行数')
+    args = parser.parse_args()
+
+    run_benchmark(args.rows)
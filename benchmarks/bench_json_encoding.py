@@ -0,0 +1,116 @@
+"""
+JSON序列化基准测试
+对比Flask默认provider（即原 jsonify 路径）、标准库provider和orjson provider
+在GeoJSON、聚类标签和餐厅列表分页三类响应上的编码耗时，并校验解码结果一致
+
+用法: python benchmarks/bench_json_encoding.py [--rows 200000] [--pages 500]
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.append(str(Path(__file__).parent.parent / "backend"))
+
+from services.json_provider import NumpyJSONProvider, OrjsonJSONProvider, orjson
+from services.restaurant_index import restaurants_to_records
+
+
+def make_synthetic_restaurants(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成与清洗后数据结构一致的合成餐厅表"""
+    rng = np.random.default_rng(seed)
+    cities = ['Paris', 'Tokyo', 'New York', 'London', 'Hong Kong', '東京', 'Wien', 'São Paulo']
+    cuisines = ['Creative', 'Modern cuisine', 'Japanese', 'Classic', 'Seafood']
+    return pd.DataFrame({
+        'name': [f"Restaurant {i}" for i in range(n_rows)],
+        'city': np.array(cities, dtype=object)[rng.integers(0, len(cities), size=n_rows)],
+        'region': np.array(['France', 'Japan', 'United Kingdom'], dtype=object)[rng.integers(0, 3, size=n_rows)],
+        'cuisine': np.array(cuisines, dtype=object)[rng.integers(0, len(cuisines), size=n_rows)],
+        'price': np.array(['$', '$$', '$$$', '$$$$'], dtype=object)[rng.integers(0, 4, size=n_rows)],
+        'price_level': np.array(['Budget', 'Moderate', 'Expensive'], dtype=object)[rng.integers(0, 3, size=n_rows)],
+        'stars': rng.integers(1, 4, size=n_rows),
+        'year': np.full(n_rows, 2019),
+        'latitude': rng.uniform(-60, 70, size=n_rows),
+        'longitude': rng.uniform(-170, 170, size=n_rows),
+        'url': [f"https://guide.michelin.com/restaurant/{i}" for i in range(n_rows)],
+        'continent': np.array(['Europe', 'Asia'], dtype=object)[rng.integers(0, 2, size=n_rows)],
+        'climate_zone': np.array(['Temperate', 'Tropical'], dtype=object)[rng.integers(0, 2, size=n_rows)]
+    })
+
+
+def make_geojson(df: pd.DataFrame) -> dict:
+    """与 restaurants_geo.json 加载后结构一致的GeoJSON（Python原生类型）"""
+    records = restaurants_to_records(df)
+    return {
+        'success': True,
+        'data': {
+            'type': 'FeatureCollection',
+            'features': [
+                {
+                    'type': 'Feature',
+                    'geometry': {'type': 'Point', 'coordinates': [record['longitude'], record['latitude']]},
+                    'properties': record
+                }
+                for record in records
+            ]
+        }
+    }
+
+
+def timed(func, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(n_rows: int, n_pages: int):
+    app = Flask(__name__)
+    providers = [('flask默认', DefaultJSONProvider(app)), ('标准库', NumpyJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonJSONProvider(app)))
+    else:
+        print("未安装orjson，跳过orjson provider")
+
+    print(f"生成 {n_rows:,} 行合成数据...")
+    df = make_synthetic_restaurants(n_rows)
+    labels = np.random.default_rng(0).integers(-1, 30, size=n_rows)
+
+    # (响应, 每个provider的输入构造, 重复次数)：
+    # flask默认provider不支持numpy，需要先转换为列表；新provider直接接收numpy数组
+    cases = [
+        ('GeoJSON', lambda native: make_geojson(df), 1),
+        ('聚类标签', lambda native: {'success': True, 'data': {'labels': labels.tolist() if native else labels}}, 1),
+        ('餐厅分页x100', lambda native: {'success': True, 'data': {'restaurants': restaurants_to_records(df.iloc[:100])}},
+         n_pages)
+    ]
+
+    header = f"{'响应':<14}" + ''.join(f"{name + '(s)':>14}" for name, _ in providers) + f"{'大小(KB)':>12}{'加速比':>10}  一致"
+    print("\n" + header)
+    for case_name, build, repeat in cases:
+        times, bodies = [], []
+        for provider_name, provider in providers:
+            payload = build(provider_name == 'flask默认')
+            body, elapsed = timed(lambda: provider.response(payload).get_data(), repeat)
+            times.append(elapsed)
+            bodies.append(body)
+        expected = json.loads(bodies[0])
+        consistent = all(json.loads(body) == expected for body in bodies[1:])
+        print(f"{case_name:<14}" + ''.join(f"{elapsed:>14.3f}" for elapsed in times)
+              + f"{len(bodies[-1]) / 1024:>12.1f}{times[0] / times[-1]:>9.1f}x  {'ok' if consistent else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='JSON序列化基准测试')
+    parser.add_argument('--rows', type=int, default=200_000, help='GeoJSON要素数和聚类标签数')
+    parser.add_argument('--pages', type=int, default=500, help='餐厅分页响应的编码次数')
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.pages)
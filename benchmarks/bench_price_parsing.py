@@ -0,0 +1,167 @@
+"""
+价格解析与大洲分类基准测试
+在合成的大表上对比清洗阶段原有的逐行 .apply 实现与 utils 中共享的向量化实现，
+校验结果完全一致并输出耗时和加速比
+
+用法: python benchmarks/bench_price_parsing.py [--rows 1000000]
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+
+import utils
+
+
+def make_synthetic_prices(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成包含各种价格格式和全球坐标的合成数据"""
+    rng = np.random.default_rng(seed)
+
+    symbol_prices = ['$', '$$', '$$$', '$$$$', '$$$$$', 'N/A', None]
+    mixed_prices = ['¥', '¥¥¥', '¥¥¥¥¥', '250', '799.5', '1500', '4200', '.5', '12.', '未知', 'abc', None]
+
+    # 读成数值列的价格（没有任何字符串取值）
+    numeric_prices = np.array([250.0, 799.5, 1500.0, 4200.0, np.nan])
+
+    latitude = rng.uniform(-60, 70, size=n_rows)
+    longitude = rng.uniform(-180, 180, size=n_rows)
+    latitude[rng.random(n_rows) < 0.01] = np.nan
+    longitude[rng.random(n_rows) < 0.01] = np.nan
+
+    return pd.DataFrame({
+        'price': np.array(symbol_prices, dtype=object)[rng.integers(0, len(symbol_prices), size=n_rows)],
+        'mixed_price': np.array(mixed_prices, dtype=object)[rng.integers(0, len(mixed_prices), size=n_rows)],
+        'numeric_price': numeric_prices[rng.integers(0, len(numeric_prices), size=n_rows)],
+        'latitude': latitude,
+        'longitude': longitude
+    })
+
+
+# ---- 逐行参考实现（与向量化之前的 DataCleaner / preprocess_restaurant_data 逻辑相同） ----
+
+def reference_price_level(df):
+    def map_price_level(price_str):
+        if pd.isna(price_str) or price_str == 'N/A':
+            return 'Unknown'
+
+        price_str = str(price_str)
+        dollar_count = price_str.count('$')
+
+        if dollar_count == 1:
+            return 'Budget'
+        elif dollar_count == 2:
+            return 'Moderate'
+        elif dollar_count == 3:
+            return 'Expensive'
+        elif dollar_count == 4:
+            return 'Very Expensive'
+        elif dollar_count >= 5:
+            return 'Luxury'
+        else:
+            return 'Unknown'
+    return df['price'].apply(map_price_level)
+
+
+def reference_price_numeric(df):
+    def map_price_numeric(price_str):
+        if pd.isna(price_str) or price_str == 'N/A':
+            return 0
+
+        price_str = str(price_str)
+        dollar_count = price_str.count('$')
+        return min(dollar_count, 5)
+    return df['price'].apply(map_price_numeric)
+
+
+def reference_parse_price_level(df, column='mixed_price'):
+    def parse_price_level(price):
+        if pd.isna(price) or price == '未知':
+            return 2
+        if isinstance(price, str):
+            if price.startswith('¥'):
+                return len(price)
+            elif price.isdigit() or (price.replace('.', '', 1).isdigit() and price.count('.') <= 1):
+                try:
+                    price_val = float(price)
+                    if price_val < 300:
+                        return 1
+                    elif price_val < 800:
+                        return 2
+                    elif price_val < 1500:
+                        return 3
+                    elif price_val < 3000:
+                        return 4
+                    else:
+                        return 5
+                except ValueError:
+                    return 2
+        return 2
+    return df[column].apply(parse_price_level)
+
+
+def reference_hemisphere(df):
+    return df['latitude'].apply(lambda x: 'Northern' if x >= 0 else 'Southern')
+
+
+def reference_continent(df):
+    def classify_continent(lat, lon):
+        if -180 <= lon <= -30:
+            return 'Americas'
+        elif -30 < lon <= 60:
+            if lat >= 35:
+                return 'Europe'
+            else:
+                return 'Africa'
+        else:
+            if lat >= -10:
+                return 'Asia'
+            else:
+                return 'Oceania'
+    return df.apply(lambda row: classify_continent(row['latitude'], row['longitude']), axis=1)
+
+
+# (结果列, 逐行参考实现, 向量化实现)
+CASES = [
+    ('price_level', reference_price_level, lambda df: utils.price_level_from_symbols(df['price'])),
+    ('price_numeric', reference_price_numeric, lambda df: utils.price_numeric_from_symbols(df['price'])),
+    ('mixed_price_level', reference_parse_price_level, lambda df: utils.parse_price_level(df['mixed_price'])),
+    ('numeric_price_level', lambda df: reference_parse_price_level(df, 'numeric_price'),
+     lambda df: utils.parse_price_level(df['numeric_price'])),
+    ('hemisphere', reference_hemisphere, lambda df: utils.classify_hemisphere(df['latitude'])),
+    ('continent', reference_continent, lambda df: utils.classify_continent(df['latitude'], df['longitude']))
+]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run_benchmark(n_rows: int):
+    print(f"生成 {n_rows:,} 行合成数据...")
+    df = make_synthetic_prices(n_rows)
+
+    print(f"\n{'字段':<20}{'逐行apply(s)':>14}{'向量化(s)':>12}{'加速比':>10}  一致")
+    for column, reference, vectorized in CASES:
+        expected, reference_time = timed(reference, df)
+        actual, vectorized_time = timed(vectorized, df)
+        pd.testing.assert_series_equal(
+            pd.Series(actual, name=column), expected.reset_index(drop=True).rename(column),
+            check_dtype=False
+        )
+        print(f"{column:<20}{reference_time:>14.3f}{vectorized_time:>12.3f}{reference_time / vectorized_time:>9.1f}x  ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='价格解析与大洲分类基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='合成数据行数')
+    args = parser.parse_args()
+
+    run_benchmark(args.rows)
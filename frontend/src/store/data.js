@@ -72,61 +72,67 @@ export const useDataStore = defineStore('data', () => {
     }
   }
 
-  const fetchRestaurants = async (params = {}) => {
-    try {
-      loading.value = true
-      const queryParams = {
-        page: pagination.value.page,
-        per_page: pagination.value.per_page,
-        ...filters.value,
-        ...params
+  const buildRestaurantParams = (params = {}) => {
+    const queryParams = {
+      page: pagination.value.page,
+      per_page: pagination.value.per_page,
+      ...filters.value,
+      ...params
+    }
+    
+    // 移除空值
+    Object.keys(queryParams).forEach(key => {
+      if (queryParams[key] === null || queryParams[key] === '') {
+        delete queryParams[key]
       }
-      
-      // 移除空值
-      Object.keys(queryParams).forEach(key => {
-        if (queryParams[key] === null || queryParams[key] === '') {
-          delete queryParams[key]
-        }
-      })
+    })
+    return queryParams
+  }
 
-      const response = await api.get('/restaurants', { params: queryParams })
-      
-      // 处理可能的JSON字符串响应
-      let parsedData = response.data
-      if (typeof response.data === 'string') {
-        try {
-          parsedData = JSON.parse(response.data)
-        } catch (parseError) {
-          throw new Error('API响应格式错误')
-        }
+  const applyRestaurantsResponse = (responseData) => {
+    // 处理可能的JSON字符串响应
+    let parsedData = responseData
+    if (typeof responseData === 'string') {
+      try {
+        parsedData = JSON.parse(responseData)
+      } catch (parseError) {
+        throw new Error('API响应格式错误')
+      }
+    }
+    
+    // 添加数据验证和安全访问
+    if (parsedData && parsedData.success && parsedData.data) {
+      const apiData = parsedData.data
+      const restaurantsData = apiData.restaurants || []
+      const paginationData = apiData.pagination || {
+        page: 1,
+        per_page: 50,
+        total: 0,
+        pages: 0
       }
       
-      // 添加数据验证和安全访问
-      if (parsedData && parsedData.success && parsedData.data) {
-        const apiData = parsedData.data
-        const restaurantsData = apiData.restaurants || []
-        const paginationData = apiData.pagination || {
-          page: 1,
-          per_page: 50,
-          total: 0,
-          pages: 0
-        }
-        
-        restaurants.value = restaurantsData
-        pagination.value = paginationData
-        
-        return parsedData.data
-      } else {
-        // 如果数据结构不符合预期，设置默认值
-        restaurants.value = []
-        pagination.value = {
-          page: 1,
-          per_page: 50,
-          total: 0,
-          pages: 0
-        }
-        return { restaurants: [], pagination: pagination.value }
+      restaurants.value = restaurantsData
+      pagination.value = paginationData
+      
+      return parsedData.data
+    } else {
+      // 如果数据结构不符合预期，设置默认值
+      restaurants.value = []
+      pagination.value = {
+        page: 1,
+        per_page: 50,
+        total: 0,
+        pages: 0
       }
+      return { restaurants: [], pagination: pagination.value }
+    }
+  }
+
+  const fetchRestaurants = async (params = {}) => {
+    try {
+      loading.value = true
+      const response = await api.get('/restaurants', { params: buildRestaurantParams(params) })
+      return applyRestaurantsResponse(response.data)
     } catch (err) {
       error.value = '获取餐厅数据失败'
       restaurants.value = []
@@ -220,17 +226,52 @@ export const useDataStore = defineStore('data', () => {
     pagination.value.page = page
   }
 
-  // 初始化数据
+  // 批量请求：一次往返执行多个GET查询，返回 { id: 子响应体 }
+  const fetchBatch = async (requests, sharedParams = {}) => {
+    const response = await api.post('/batch', { requests, params: sharedParams })
+    const results = {}
+    response.data.data.responses.forEach(({ id, status, body }) => {
+      if (status !== 200 || !body?.success) {
+        const err = new Error(body?.error || `${id} 请求失败`)
+        err.response = { status, data: body }
+        results[id] = err
+      } else {
+        results[id] = body
+      }
+    })
+    return results
+  }
+
+  // 初始化数据：摘要、餐厅列表和地理数据合并为一次批量请求
   const initializeData = async () => {
     try {
-      await Promise.all([
-        fetchSummary(),
-        fetchRestaurants(),
-        fetchGeoJSON()
+      loading.value = true
+      error.value = null
+      const results = await fetchBatch([
+        { id: 'summary', path: '/api/summary' },
+        { id: 'restaurants', path: '/api/restaurants', params: buildRestaurantParams() },
+        { id: 'geojson', path: '/api/geojson' }
       ])
+      
+      // 与并行请求时一致：成功的部分照常写入，最后抛出第一个失败
+      if (!(results.summary instanceof Error)) {
+        summary.value = results.summary.data
+        summary.value._lastUpdated = new Date().toISOString()
+      }
+      if (!(results.restaurants instanceof Error)) {
+        applyRestaurantsResponse(results.restaurants)
+      }
+      if (!(results.geojson instanceof Error)) {
+        geojson.value = results.geojson.data
+      }
+      const failed = Object.values(results).find(result => result instanceof Error)
+      if (failed) throw failed
     } catch (err) {
       console.error('初始化数据失败:', err)
+      error.value = '初始化数据失败'
       throw err
+    } finally {
+      loading.value = false
     }
   }
 
@@ -262,6 +303,7 @@ export const useDataStore = defineStore('data', () => {
     fetchAnalytics,
     searchRestaurants,
     generateChart,
+    fetchBatch,
     setFilter,
     clearFilters,
     setPage,
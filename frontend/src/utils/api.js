@@ -345,14 +345,19 @@ export const analyticsApi = {
 
   /**
    * 获取预测分析
-   * @param {string} region - 地区过滤
-   * @param {string} metric - 预测指标
+   * @param {Object} options - 查询选项
+   * @param {string} options.groupBy - 分组维度 overall/stars/region/city/cuisine
+   * @param {string} options.key - 分组键（如 France），不指定时返回该维度的全部序列
+   * @param {number} options.horizon - 预测年数，不指定时使用服务端默认值
    * @returns {Promise} 预测分析数据
    */
-  getForecasts: (region = null, metric = 'count') => {
-    const params = { metric }
-    if (region) {
-      params.region = region
+  getForecasts: ({ groupBy = 'overall', key = null, horizon = null } = {}) => {
+    const params = { group_by: groupBy }
+    if (key) {
+      params.key = key
+    }
+    if (horizon !== null) {
+      params.horizon = horizon
     }
     return api.get('/analytics/forecasts', params)
   }
@@ -4,20 +4,249 @@
 按顺序执行所有数据处理步骤
 """
 
+import os
 import sys
+import json
 import time
+import hashlib
+import argparse
+import importlib
 import logging
+import multiprocessing
+from multiprocessing.connection import wait
 from pathlib import Path
 from datetime import datetime
 
 # 添加scripts目录到Python路径
 sys.path.append(str(Path(__file__).parent / "scripts"))
 
+try:
+    import resource
+except ImportError:  # Windows 上没有 resource 模块，CPU时间改用 process_time，峰值内存不记录
+    resource = None
+
 from utils import logger, setup_logging
 
+PROJECT_ROOT = Path(__file__).parent
+RAW_DATA_FILES = [
+    "data/raw/one-star-michelin-restaurants.csv",
+    "data/raw/two-stars-michelin-restaurants.csv",
+    "data/raw/three-stars-michelin-restaurants.csv"
+]
+
+# 流水线指纹清单：记录每个阶段输入、参数和代码的哈希，未变化的阶段直接复用产物
+MANIFEST_PATH = PROJECT_ROOT / "data" / "pipeline_manifest.json"
+# 清单格式版本，修改指纹计算方式后递增以使全部阶段重新执行
+MANIFEST_VERSION = 1
+
+# 各阶段性能剖析结果（墙钟时间、CPU时间、峰值内存、行数）
+PROFILE_PATH = PROJECT_ROOT / "data" / "pipeline_profile.json"
+
+# 流水线阶段定义（按声明顺序调度）：
+# module/function 为 scripts 下的入口函数（默认 main），params 为固定参数，
+# depends 为必须先完成的阶段，依赖都完成的阶段并行执行；
+# inputs/outputs/code 为相对项目根目录的文件路径；
+# input_digest 为阶段模块中计算单个输入内容摘要的函数，用于输入内嵌生成时间等无关字节的阶段（默认按文件字节）
+STAGES = [
+    {'name': 'clean', 'title': '数据清洗', 'module': 'clean_data', 'depends': [],
+     'inputs': RAW_DATA_FILES,
+     'code': ['scripts/clean_data.py', 'scripts/utils.py'],
+     'outputs': ['data/cleaned/restaurants_cleaned.csv', 'data/cleaned/restaurants_cleaned.json',
+                 'data/cleaned/cleaning_report.json']},
+    {'name': 'geocode', 'title': '地理编码', 'module': 'geocode', 'depends': ['clean'],
+     'params': {'export': False},
+     'inputs': ['data/cleaned/restaurants_cleaned.csv'],
+     'code': ['scripts/geocode.py', 'scripts/utils.py'],
+     'outputs': ['data/cleaned/restaurants_geocoded.csv']},
+    {'name': 'geo_export', 'title': 'GeoJSON导出与地理分析', 'module': 'geocode', 'function': 'export_main',
+     'depends': ['geocode'],
+     'inputs': ['data/cleaned/restaurants_geocoded.csv'],
+     'code': ['scripts/geocode.py', 'scripts/utils.py'],
+     'outputs': ['data/cleaned/restaurants_geo.json', 'data/cleaned/geographic_analysis.json']},
+    {'name': 'features', 'title': '特征工程', 'module': 'feature_engineering', 'depends': ['geocode'],
+     'inputs': ['data/cleaned/restaurants_geocoded.csv'],
+     'code': ['scripts/feature_engineering.py', 'scripts/feature_transform.py', 'scripts/utils.py'],
+     'outputs': ['data/processed/features.joblib', 'data/processed/transformers.joblib',
+                 'data/processed/feature_transform.joblib', 'data/processed/feature_engineering_report.json']},
+    {'name': 'clustering', 'title': '聚类分析', 'module': 'clustering', 'depends': [],
+     'inputs': RAW_DATA_FILES,
+     'code': ['scripts/clustering.py', 'scripts/utils.py'],
+     'outputs': ['data/processed/clusters/manifest.json', 'data/processed/cluster_model.joblib',
+                 'data/processed/restaurants_with_clusters.csv', 'data/processed/clustering_report.json']},
+    {'name': 'forecast', 'title': '时间序列预测', 'module': 'forecast', 'depends': ['geocode'],
+     'inputs': ['data/cleaned/restaurants_geocoded.csv'],
+     'code': ['scripts/forecast.py', 'scripts/utils.py'],
+     'outputs': ['data/processed/forecasts.joblib', 'data/processed/forecast_models.joblib',
+                 'data/processed/forecast_report.json']},
+    {'name': 'render', 'title': '图表渲染', 'module': 'render_figures', 'depends': ['clustering'],
+     'input_digest': 'input_digest',
+     'inputs': ['data/processed/clusters/manifest.json', 'data/processed/restaurants_with_clusters.csv',
+                'data/processed/cluster_model.joblib'],
+     'code': ['scripts/render_figures.py', 'scripts/utils.py'],
+     'outputs': ['data/output/clustering_visualization.png', 'data/output/tsne_clustering.png',
+                 'data/output/cluster_sizes.png', 'data/output/cluster_features_heatmap.png']}
+]
+
+
+def file_hash(path: Path) -> str:
+    """计算文件内容的sha256，文件不存在时返回 missing"""
+    if not path.exists():
+        return 'missing'
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
 
-def run_pipeline():
-    """执行完整的数据处理流水线"""
+class PipelineManifest:
+    """
+    流水线指纹清单
+    
+    阶段指纹由输入文件内容、阶段参数和代码文件内容共同决定；
+    指纹未变化且记录的产物仍然存在且未被修改时，该阶段可以跳过
+    """
+    
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = path
+        self.stages = {}
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == MANIFEST_VERSION:
+                    self.stages = manifest.get('stages', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取流水线清单失败，将重新执行全部阶段: {e}")
+    
+    @staticmethod
+    def fingerprint(stage, params):
+        """计算阶段指纹，返回 (指纹, 输入哈希, 代码哈希)"""
+        input_hash = file_hash
+        if 'input_digest' in stage:
+            input_hash = getattr(importlib.import_module(stage['module']), stage['input_digest'])
+        inputs = {path: input_hash(PROJECT_ROOT / path) for path in stage['inputs']}
+        code = {path: file_hash(PROJECT_ROOT / path) for path in stage['code']}
+        source = json.dumps({'version': MANIFEST_VERSION, 'stage': stage['name'], 'params': params,
+                             'inputs': inputs, 'code': code}, sort_keys=True, default=str)
+        return hashlib.sha256(source.encode()).hexdigest(), inputs, code
+    
+    def is_current(self, stage, fingerprint):
+        """指纹一致且产物完好时返回True"""
+        record = self.stages.get(stage['name'])
+        if not record or record.get('fingerprint') != fingerprint:
+            return False
+        return all(file_hash(PROJECT_ROOT / path) == digest for path, digest in record.get('outputs', {}).items())
+    
+    def record(self, stage, fingerprint, params, inputs, code, elapsed):
+        """记录阶段执行结果并立即写盘，中断后已完成的阶段仍可复用"""
+        self.stages[stage['name']] = {
+            'fingerprint': fingerprint,
+            'params': params,
+            'inputs': inputs,
+            'code': code,
+            'outputs': {path: file_hash(PROJECT_ROOT / path) for path in stage['outputs']},
+            'elapsed_seconds': round(elapsed, 3),
+            'completed_at': datetime.now().isoformat()
+        }
+        self.save()
+    
+    def invalidate(self, stage_name):
+        self.stages.pop(stage_name, None)
+    
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'stages': self.stages}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def _resource_usage():
+    """返回当前进程及其已回收子进程的 (CPU秒数, 峰值RSS MB)"""
+    if resource is None:
+        return time.process_time(), None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_seconds = own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+    # Linux 上 ru_maxrss 单位为KB，macOS 上为字节
+    rss_unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return cpu_seconds, max(own.ru_maxrss, children.ru_maxrss) / rss_unit
+
+
+def _count_rows(result, stage):
+    """从阶段返回值中的DataFrame获取行数，没有时读取阶段输出的第一个CSV"""
+    import pandas as pd
+    candidates = result if isinstance(result, (tuple, list)) else [result]
+    for item in candidates:
+        if isinstance(item, pd.DataFrame):
+            return len(item)
+    for path in stage['outputs']:
+        if path.endswith('.csv') and (PROJECT_ROOT / path).exists():
+            return len(pd.read_csv(PROJECT_ROOT / path, usecols=[0]))
+    return None
+
+
+def _execute_stage(stage, params, connection):
+    """
+    在独立子进程中执行一个阶段，并通过管道回传性能剖析结果
+    
+    每个阶段使用单独的进程，使CPU时间和峰值内存按阶段统计，且不受GIL限制
+    """
+    # RUSAGE_SELF 从子进程启动起累计（含解释器启动和 __mp_main__ 的重新导入），
+    # 因此在导入阶段模块之后再取CPU时间的起点，使CPU时间只统计阶段函数本身；墙钟时间包含模块导入
+    cpu_start, _ = _resource_usage()
+    wall_start = time.perf_counter()
+    profile = {'status': 'completed', 'pid': os.getpid()}
+    try:
+        module = importlib.import_module(stage['module'])
+        cpu_start, _ = _resource_usage()
+        result = getattr(module, stage.get('function', 'main'))(**params)
+        profile['wall_seconds'] = time.perf_counter() - wall_start
+        profile['rows'] = _count_rows(result, stage)
+    except BaseException as e:
+        logger.exception(f"阶段 {stage['name']} 执行出错")
+        profile['wall_seconds'] = time.perf_counter() - wall_start
+        profile['status'] = 'failed'
+        profile['error'] = f"{type(e).__name__}: {e}"
+    cpu_end, profile['peak_rss_mb'] = _resource_usage()
+    profile['cpu_seconds'] = cpu_end - cpu_start
+    connection.send(profile)
+    connection.close()
+
+
+def _write_profile(profile):
+    PROFILE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(PROFILE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+
+
+def run_pipeline(skip_render=False, clean_chunk_size=None, force=False, force_stages=None, jobs=None):
+    """
+    执行完整的数据处理流水线
+    
+    各阶段的输入、参数和代码指纹记录在 data/pipeline_manifest.json 中，
+    指纹未变化的阶段跳过执行并复用已有产物；上游阶段重新执行但产物内容不变时，下游阶段同样跳过。
+    依赖已完成的阶段在独立子进程中并行执行，各阶段的墙钟时间、CPU时间、峰值内存和行数
+    写入 data/pipeline_profile.json
+    
+    Args:
+        skip_render: 是否跳过图表渲染阶段，也可通过环境变量 MICHELIN_SKIP_RENDER=1 设置
+        clean_chunk_size: 设置后数据清洗使用流式模式，按该行数分块处理原始数据
+        force: 忽略指纹清单，重新执行全部阶段
+        force_stages: 强制重新执行的阶段名称列表
+        jobs: 最多同时执行的阶段数，默认为CPU核数，为1时按声明顺序串行执行
+    """
+    skip_render = skip_render or os.environ.get('MICHELIN_SKIP_RENDER', '').lower() in ('1', 'true', 'yes')
+    force_stages = set(force_stages or [])
+    unknown_stages = force_stages - {stage['name'] for stage in STAGES}
+    if unknown_stages:
+        raise ValueError(f"未知阶段: {sorted(unknown_stages)}")
+    jobs = max(1, jobs or os.cpu_count() or 1)
+    
+    stage_params = {
+        'clean': {'chunk_size': clean_chunk_size}
+    }
     
     # 设置日志
     setup_logging()
@@ -25,73 +254,128 @@ def run_pipeline():
     logger.info("=" * 60)
     logger.info("开始执行米其林餐厅数据处理流水线")
     logger.info(f"开始时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info(f"并行度: {jobs}")
     logger.info("=" * 60)
     
     pipeline_start_time = time.time()
+    manifest = PipelineManifest()
+    context = multiprocessing.get_context('spawn')
+    step_numbers = {stage['name']: index for index, stage in enumerate(STAGES, 1)}
+    pending = [stage for stage in STAGES]
+    running = {}
+    finished = set()
+    failed = []
+    executed, reused = [], []
+    stage_profiles = {}
     
-    try:
-        # 步骤1: 数据清洗
-        logger.info("\n[步骤1] 数据清洗")
-        logger.info("-" * 40)
-        step_start = time.time()
-        
-        from clean_data import main as clean_main
-        clean_main()
-        
-        step_time = time.time() - step_start
-        logger.info(f"[完成] 数据清洗完成，耗时: {step_time:.2f}秒")
-        
-        # 步骤2: 地理编码
-        logger.info("\n[步骤2] 地理编码")
-        logger.info("-" * 40)
-        step_start = time.time()
-        
-        from geocode import main as geocode_main
-        geocode_main()
-        
-        step_time = time.time() - step_start
-        logger.info(f"[完成] 地理编码完成，耗时: {step_time:.2f}秒")
-        
-        # 步骤3: 特征工程
-        logger.info("\n[步骤3] 特征工程")
-        logger.info("-" * 40)
-        step_start = time.time()
-        
-        from feature_engineering import main as feature_main
-        feature_main()
-        
-        step_time = time.time() - step_start
-        logger.info(f"[完成] 特征工程完成，耗时: {step_time:.2f}秒")
-        
-        # 步骤4: 聚类分析
-        logger.info("\n[步骤4] 聚类分析")
-        logger.info("-" * 40)
-        step_start = time.time()
-        
-        from clustering import main as clustering_main
-        clustering_main()
-        
-        step_time = time.time() - step_start
-        logger.info(f"[完成] 聚类分析完成，耗时: {step_time:.2f}秒")
+    def start_ready_stages():
+        """启动所有依赖已完成的阶段；跳过的阶段立即视为完成，可能使下游阶段就绪"""
+        progress = True
+        while progress and not failed:
+            progress = False
+            for stage in list(pending):
+                if len(running) >= jobs:
+                    return
+                if not all(dependency in finished for dependency in stage['depends']):
+                    continue
+                pending.remove(stage)
+                progress = True
+                name = stage['name']
+                logger.info(f"\n[步骤{step_numbers[name]}] {stage['title']}")
+                logger.info("-" * 40)
+                
+                if name == 'render' and skip_render:
+                    logger.info("[跳过] 已跳过图表渲染阶段")
+                    stage_profiles[name] = {'status': 'skipped'}
+                    finished.add(name)
+                    continue
+                
+                params = {**stage.get('params', {}), **stage_params.get(name, {})}
+                fingerprint, inputs, code = manifest.fingerprint(stage, params)
+                if not force and name not in force_stages and manifest.is_current(stage, fingerprint):
+                    logger.info(f"[跳过] {stage['title']}的输入、参数和代码均未变化，复用已有产物")
+                    stage_profiles[name] = {'status': 'reused'}
+                    reused.append(name)
+                    finished.add(name)
+                    continue
+                
+                manifest.invalidate(name)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=_execute_stage, args=(stage, params, sender), name=f"stage-{name}")
+                process.start()
+                sender.close()
+                running[receiver] = (stage, process, params, fingerprint, inputs, code, time.time())
+    
+    def collect(receiver):
+        stage, process, params, fingerprint, inputs, code, started = running.pop(receiver)
+        name = stage['name']
+        try:
+            profile = receiver.recv()
+        except EOFError:
+            profile = {'status': 'failed', 'wall_seconds': time.time() - started}
+        process.join()
+        if profile['status'] == 'failed' and 'error' not in profile:
+            profile['error'] = f"子进程异常退出，退出码 {process.exitcode}"
+        profile['start_offset'] = round(started - pipeline_start_time, 3)
+        profile['end_offset'] = round(time.time() - pipeline_start_time, 3)
+        stage_profiles[name] = profile
         
-        # 步骤5: 时间序列预测
-        logger.info("\n[步骤5] 时间序列预测")
-        logger.info("-" * 40)
-        step_start = time.time()
+        if profile['status'] == 'failed':
+            logger.error(f"[错误] {stage['title']}失败: {profile['error']}")
+            failed.append(name)
+            return
         
-        from forecast import main as forecast_main
-        forecast_main()
+        missing_outputs = [path for path in stage['outputs'] if not (PROJECT_ROOT / path).exists()]
+        if missing_outputs:
+            # 阶段未生成完整产物时不记录指纹，下次运行重新执行
+            logger.warning(f"{stage['title']}缺少产物 {missing_outputs}，未记录指纹")
+        else:
+            manifest.record(stage, fingerprint, params, inputs, code, profile['wall_seconds'])
+        executed.append(name)
+        finished.add(name)
+        rss = f"{profile['peak_rss_mb']:.0f}MB" if profile.get('peak_rss_mb') is not None else "未知"
+        logger.info(f"[完成] {stage['title']}完成，耗时: {profile['wall_seconds']:.2f}秒，"
+                    f"CPU: {profile['cpu_seconds']:.2f}秒，峰值内存: {rss}，行数: {profile.get('rows')}")
+    
+    try:
+        try:
+            start_ready_stages()
+            while running:
+                for receiver in wait(list(running)):
+                    collect(receiver)
+                start_ready_stages()
+        finally:
+            # 出错时仍等待已启动的阶段结束，保证其产物和指纹完整记录
+            for receiver in list(running):
+                collect(receiver)
+            total_time = time.time() - pipeline_start_time
+            for stage in pending:
+                stage_profiles[stage['name']] = {'status': 'not_run'}
+            for stage_profile in stage_profiles.values():
+                for key in ('wall_seconds', 'cpu_seconds', 'peak_rss_mb'):
+                    if stage_profile.get(key) is not None:
+                        stage_profile[key] = round(stage_profile[key], 3)
+            _write_profile({
+                'started_at': datetime.fromtimestamp(pipeline_start_time).isoformat(),
+                'wall_seconds': round(total_time, 3),
+                'stage_wall_seconds': round(sum(p.get('wall_seconds', 0) for p in stage_profiles.values()), 3),
+                'jobs': jobs,
+                'cpu_count': os.cpu_count(),
+                'stages': {stage['name']: {'depends': stage['depends'], **stage_profiles[stage['name']]}
+                           for stage in STAGES if stage['name'] in stage_profiles}
+            })
+            manifest.save()
         
-        step_time = time.time() - step_start
-        logger.info(f"[完成] 时间序列预测完成，耗时: {step_time:.2f}秒")
+        if failed:
+            raise RuntimeError(f"阶段执行失败: {failed}")
         
         # 流水线完成
-        total_time = time.time() - pipeline_start_time
-        
         logger.info("\n" + "=" * 60)
         logger.info("[成功] 数据处理流水线执行完成!")
         logger.info(f"总耗时: {total_time:.2f}秒 ({total_time/60:.1f}分钟)")
         logger.info(f"完成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        logger.info(f"执行阶段: {executed or '无'}，复用阶段: {reused or '无'}")
+        logger.info(f"性能剖析: {PROFILE_PATH}")
         logger.info("=" * 60)
         
         # 显示输出文件摘要
@@ -173,6 +457,15 @@ def check_requirements():
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description='米其林餐厅数据处理流水线')
+    parser.add_argument('--skip-render', action='store_true', help='跳过图表渲染阶段')
+    parser.add_argument('--clean-chunk-size', type=int, help='数据清洗使用流式模式时的块大小（行数）')
+    parser.add_argument('--force', action='store_true', help='忽略指纹清单，重新执行全部阶段')
+    parser.add_argument('--force-stage', action='append', default=[],
+                        help='强制重新执行指定阶段，可重复: ' + ','.join(stage['name'] for stage in STAGES))
+    parser.add_argument('--jobs', type=int, help='最多同时执行的阶段数，默认为CPU核数')
+    args = parser.parse_args()
+    
     print("米其林餐厅数据可视化项目")
     print("=" * 50)
     
@@ -191,7 +484,8 @@ def main():
         sys.exit(0)
     
     # 执行流水线
-    success = run_pipeline()
+    success = run_pipeline(skip_render=args.skip_render, clean_chunk_size=args.clean_chunk_size,
+                           force=args.force, force_stages=args.force_stage, jobs=args.jobs)
     
     if success:
         print("\n[成功] 流水线执行成功!")
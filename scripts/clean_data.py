@@ -6,12 +6,153 @@
 import pandas as pd
 import numpy as np
 import re
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+from pathlib import Path
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
-from utils import logger, path_manager, cache_manager, validate_dataframe, export_to_format
+from utils import (
+    logger, path_manager, cache_manager, validate_dataframe, export_to_format,
+    price_level_from_symbols, price_numeric_from_symbols, classify_hemisphere, classify_continent
+)
+
+# 缺失值处理策略（按顺序执行）
+MISSING_VALUE_STRATEGIES = {
+    'name': 'drop',  # 餐厅名为空则删除记录
+    'latitude': 'interpolate',  # 地理坐标插值
+    'longitude': 'interpolate',
+    'city': 'unknown',  # 城市未知
+    'region': 'unknown',  # 地区未知
+    'cuisine': 'unknown',  # 菜系未知
+    'price': 'median',  # 价格用中位数填充
+    'year': 'mode',  # 年份用众数填充
+    'zipCode': 'unknown',  # 邮编未知
+    'url': 'generate'  # 生成默认URL
+}
+
+# 使用IQR方法处理异常值的数值列
+OUTLIER_COLUMNS = ['latitude', 'longitude', 'year']
+
+# 去重键
+DEDUP_COLUMNS = ['name', 'city', 'year']
+
+# 流式清洗的默认块大小
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def outlier_bounds(column: str, q1: float, q3: float) -> Tuple[float, float]:
+    """根据四分位数计算IQR异常值边界，并限制在字段的合法取值范围内"""
+    iqr = q3 - q1
+    lower_bound = q1 - 1.5 * iqr
+    upper_bound = q3 + 1.5 * iqr
+    
+    # 特殊处理地理坐标
+    if column == 'latitude':
+        lower_bound = max(lower_bound, -90)
+        upper_bound = min(upper_bound, 90)
+    elif column == 'longitude':
+        lower_bound = max(lower_bound, -180)
+        upper_bound = min(upper_bound, 180)
+    elif column == 'year':
+        lower_bound = max(lower_bound, 1900)
+        upper_bound = min(upper_bound, datetime.now().year)
+    
+    return lower_bound, upper_bound
+
+
+class ValueCountSketch:
+    """
+    数值列的取值计数摘要
+    
+    以（取值, 次数）的有序数组累积全局分布，可计算与 pandas 相同的分位数、中位数和众数；
+    不同取值超过 max_distinct 时逐级降低小数精度合并取值，内存与行数无关
+    """
+    
+    def __init__(self, max_distinct: int = 100000):
+        self.max_distinct = max_distinct
+        self.values = np.empty(0, dtype=float)
+        self.counts = np.empty(0, dtype=float)
+        self.decimals = None
+    
+    def _merge(self, values: np.ndarray, counts: np.ndarray):
+        if self.decimals is not None:
+            values = np.round(values, self.decimals)
+        merged, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]))
+        self.values = merged
+    
+    def update(self, values, count: int = 1):
+        """累积一批取值（忽略缺失值），count 为每个取值的重复次数"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0 or count <= 0:
+            return
+        unique_values, unique_counts = np.unique(values, return_counts=True)
+        self._merge(unique_values, unique_counts * float(count))
+        
+        while len(self.values) > self.max_distinct:
+            self.decimals = 6 if self.decimals is None else self.decimals - 1
+            values, counts = self.values, self.counts
+            self.values, self.counts = np.empty(0, dtype=float), np.empty(0, dtype=float)
+            self._merge(values, counts)
+    
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+    
+    def quantile(self, q: float) -> float:
+        """线性插值分位数（与 pandas/numpy 默认方法一致）"""
+        if self.n == 0:
+            return np.nan
+        position = (self.n - 1) * q
+        lower_rank = int(np.floor(position))
+        fraction = position - lower_rank
+        cumulative = np.cumsum(self.counts)
+        lower = self.values[np.searchsorted(cumulative, lower_rank + 1)]
+        upper = self.values[np.searchsorted(cumulative, min(lower_rank + 2, self.n))]
+        diff = upper - lower
+        # 与 numpy 的插值公式相同，保证结果逐位一致
+        return upper - diff * (1 - fraction) if fraction >= 0.5 else lower + diff * fraction
+    
+    def median(self) -> float:
+        return self.quantile(0.5)
+    
+    def mode(self) -> Optional[float]:
+        """出现次数最多的取值（并列时取最小值）"""
+        if self.n == 0:
+            return None
+        return float(self.values[np.argmax(self.counts)])
+
+
+class HashDeduplicator:
+    """
+    基于64位键哈希的流式去重器
+    
+    只保存已出现键的有序哈希数组（每个不同键8字节），不保留任何行数据，
+    按输入顺序保留第一次出现的记录
+    """
+    
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.seen = np.empty(0, dtype=np.uint64)
+    
+    def filter(self, df: pd.DataFrame) -> pd.DataFrame:
+        """返回块中首次出现的记录"""
+        columns = [col for col in self.columns if col in df.columns]
+        if not columns or df.empty:
+            return df
+        
+        hashes = pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+        first_in_chunk = ~pd.Series(hashes).duplicated().to_numpy()
+        positions = np.searchsorted(self.seen, hashes)
+        seen_before = (positions < len(self.seen)) & (self.seen[np.minimum(positions, len(self.seen) - 1)] == hashes) \
+            if len(self.seen) else np.zeros(len(hashes), dtype=bool)
+        keep = first_in_chunk & ~seen_before
+        
+        new_hashes = np.sort(hashes[keep])
+        self.seen = np.insert(self.seen, np.searchsorted(self.seen, new_hashes), new_hashes)
+        return df[keep]
 
 
 class DataCleaner:
@@ -21,9 +162,13 @@ class DataCleaner:
         self.cleaning_log = []
         self.original_shape = None
         self.cleaned_shape = None
+        # 流式清洗逐块执行各步骤时关闭逐块日志，只记录汇总
+        self.log_enabled = True
     
     def log_operation(self, operation: str, details: Dict):
         """记录清洗操作"""
+        if not self.log_enabled:
+            return
         log_entry = {
             'timestamp': datetime.now().isoformat(),
             'operation': operation,
@@ -32,26 +177,20 @@ class DataCleaner:
         self.cleaning_log.append(log_entry)
         logger.info(f"Data cleaning: {operation} - {details}")
     
-    def handle_missing_values(self, df: pd.DataFrame) -> pd.DataFrame:
-        """处理缺失值"""
+    def handle_missing_values(self, df: pd.DataFrame, statistics: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        处理缺失值
+        
+        Args:
+            df: 数据
+            statistics: 预先计算的全局统计量 {'median': {列: 值}, 'mode': {列: 值}}，
+                流式清洗时使用，为None时在当前数据上计算
+        """
         logger.info("开始处理缺失值...")
         original_missing = df.isnull().sum()
+        statistics = statistics or {}
         
-        # 处理策略
-        cleaning_strategies = {
-            'name': 'drop',  # 餐厅名为空则删除记录
-            'latitude': 'interpolate',  # 地理坐标插值
-            'longitude': 'interpolate',
-            'city': 'unknown',  # 城市未知
-            'region': 'unknown',  # 地区未知
-            'cuisine': 'unknown',  # 菜系未知
-            'price': 'median',  # 价格用中位数填充
-            'year': 'mode',  # 年份用众数填充
-            'zipCode': 'unknown',  # 邮编未知
-            'url': 'generate'  # 生成默认URL
-        }
-        
-        for column, strategy in cleaning_strategies.items():
+        for column, strategy in MISSING_VALUE_STRATEGIES.items():
             if column in df.columns and df[column].isnull().any():
                 missing_count = df[column].isnull().sum()
                 
@@ -73,13 +212,16 @@ class DataCleaner:
                 
                 elif strategy == 'median':
                     if df[column].dtype in ['float64', 'int64']:
-                        median_val = df[column].median()
+                        median_val = statistics.get('median', {}).get(column, df[column].median())
                         df[column] = df[column].fillna(median_val)
                         self.log_operation(f"Fill {column} with median", 
                                          {'filled_values': missing_count, 'median': median_val})
                 
                 elif strategy == 'mode':
-                    mode_val = df[column].mode().iloc[0] if not df[column].mode().empty else 2019
+                    if column in statistics.get('mode', {}):
+                        mode_val = statistics['mode'][column]
+                    else:
+                        mode_val = df[column].mode().iloc[0] if not df[column].mode().empty else 2019
                     df[column] = df[column].fillna(mode_val)
                     self.log_operation(f"Fill {column} with mode", 
                                      {'filled_values': missing_count, 'mode': mode_val})
@@ -97,31 +239,30 @@ class DataCleaner:
         
         return df
     
-    def handle_outliers(self, df: pd.DataFrame) -> pd.DataFrame:
-        """处理异常值"""
+    def handle_outliers(self, df: pd.DataFrame, bounds: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        处理异常值
+        
+        Args:
+            df: 数据
+            bounds: 预先计算的全局边界 {列: {'lower', 'upper', 'upcast'}}，流式清洗时使用
+        """
         logger.info("开始处理异常值...")
         
-        numeric_columns = ['latitude', 'longitude', 'year']
-        
-        for column in numeric_columns:
+        for column in OUTLIER_COLUMNS:
             if column in df.columns:
-                # 使用IQR方法检测异常值
-                Q1 = df[column].quantile(0.25)
-                Q3 = df[column].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                
-                # 特殊处理地理坐标
-                if column == 'latitude':
-                    lower_bound = max(lower_bound, -90)
-                    upper_bound = min(upper_bound, 90)
-                elif column == 'longitude':
-                    lower_bound = max(lower_bound, -180)
-                    upper_bound = min(upper_bound, 180)
-                elif column == 'year':
-                    lower_bound = max(lower_bound, 1900)
-                    upper_bound = min(upper_bound, datetime.now().year)
+                if bounds is not None:
+                    if column not in bounds:
+                        continue
+                    lower_bound, upper_bound = bounds[column]['lower'], bounds[column]['upper']
+                    if bounds[column]['upcast']:
+                        # 整列处理时替换为非整数边界会把整列转为浮点，逐块处理时保持一致
+                        df[column] = df[column].astype(float)
+                else:
+                    # 使用IQR方法检测异常值
+                    lower_bound, upper_bound = outlier_bounds(
+                        column, df[column].quantile(0.25), df[column].quantile(0.75)
+                    )
                 
                 outliers_mask = (df[column] < lower_bound) | (df[column] > upper_bound)
                 outlier_count = outliers_mask.sum()
@@ -192,38 +333,9 @@ class DataCleaner:
         if 'price' in df.columns:
             original_unique = df['price'].nunique()
             
-            # 创建价格等级映射
-            def map_price_level(price_str):
-                if pd.isna(price_str) or price_str == 'N/A':
-                    return 'Unknown'
-                
-                price_str = str(price_str)
-                dollar_count = price_str.count('$')
-                
-                if dollar_count == 1:
-                    return 'Budget'
-                elif dollar_count == 2:
-                    return 'Moderate'
-                elif dollar_count == 3:
-                    return 'Expensive'
-                elif dollar_count == 4:
-                    return 'Very Expensive'
-                elif dollar_count >= 5:
-                    return 'Luxury'
-                else:
-                    return 'Unknown'
-            
-            # 创建数值化的价格等级
-            def map_price_numeric(price_str):
-                if pd.isna(price_str) or price_str == 'N/A':
-                    return 0
-                
-                price_str = str(price_str)
-                dollar_count = price_str.count('$')
-                return min(dollar_count, 5)  # 最高5级
-            
-            df['price_level'] = df['price'].apply(map_price_level)
-            df['price_numeric'] = df['price'].apply(map_price_numeric)
+            # 按货币符号数量映射价格等级和数值化的价格等级（最高5级）
+            df['price_level'] = price_level_from_symbols(df['price'])
+            df['price_numeric'] = price_numeric_from_symbols(df['price'])
             
             final_unique = df['price_level'].nunique()
             
@@ -248,24 +360,10 @@ class DataCleaner:
         # 添加地理区域特征
         if 'latitude' in df.columns and 'longitude' in df.columns:
             # 简单的地理区域划分
-            df['hemisphere'] = df['latitude'].apply(lambda x: 'Northern' if x >= 0 else 'Southern')
+            df['hemisphere'] = classify_hemisphere(df['latitude'])
             
             # 根据经纬度粗略划分大洲
-            def classify_continent(lat, lon):
-                if -180 <= lon <= -30:  # 美洲
-                    return 'Americas'
-                elif -30 < lon <= 60:   # 欧洲、非洲
-                    if lat >= 35:
-                        return 'Europe'
-                    else:
-                        return 'Africa'
-                else:  # 亚洲、大洋洲
-                    if lat >= -10:
-                        return 'Asia'
-                    else:
-                        return 'Oceania'
-            
-            df['continent'] = df.apply(lambda row: classify_continent(row['latitude'], row['longitude']), axis=1)
+            df['continent'] = classify_continent(df['latitude'], df['longitude'])
         
         # 添加URL相关特征
         if 'url' in df.columns:
@@ -339,6 +437,218 @@ class DataCleaner:
         
         return df
     
+    def _prepare_chunks(self, chunk_source: Callable[[], Iterator[pd.DataFrame]],
+                        float_columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        读取原始数据块：按全局行号重建索引，统一整数/浮点列类型，并删除必填字段缺失的记录
+        
+        数据块按行号连续编号，行为与先合并全部数据再处理一致
+        """
+        offset = 0
+        drop_columns = [col for col, strategy in MISSING_VALUE_STRATEGIES.items() if strategy == 'drop']
+        for chunk in chunk_source():
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            self._rows_read += len(chunk)
+            for col in float_columns or []:
+                if col in chunk.columns and pd.api.types.is_integer_dtype(chunk[col]):
+                    chunk[col] = chunk[col].astype(float)
+            present = [col for col in drop_columns if col in chunk.columns]
+            yield chunk.dropna(subset=present) if present else chunk
+    
+    @staticmethod
+    def _iter_interpolation_windows(chunks: Iterator[pd.DataFrame],
+                                    columns: List[str]) -> Iterator[Tuple[pd.DataFrame, bool]]:
+        """
+        将数据块整理为可以精确线性插值的窗口
+        
+        插值列末尾仍有缺失的记录暂存到下一块，窗口开头带上上一窗口最后一条完整记录作为插值锚点，
+        因此块边界处的插值结果与整列插值相同
+        
+        Yields:
+            (窗口数据, 第一行是否为需要丢弃的锚点)
+        """
+        anchor, held = None, None
+        for chunk in chunks:
+            window = pd.concat([part for part in (anchor, held, chunk) if part is not None])
+            present = [col for col in columns if col in window.columns]
+            complete = window[present].notna().all(axis=1).to_numpy() if present else np.ones(len(window), dtype=bool)
+            complete_positions = np.flatnonzero(complete)
+            has_anchor = anchor is not None
+            
+            if len(complete_positions) == 0 or (has_anchor and complete_positions[-1] == 0):
+                held = window.iloc[1:] if has_anchor else window
+                continue
+            
+            last_complete = complete_positions[-1]
+            yield window.iloc[:last_complete + 1].copy(), has_anchor
+            anchor = window.iloc[[last_complete]]
+            held = window.iloc[last_complete + 1:]
+        
+        if held is not None and len(held):
+            yield pd.concat([part for part in (anchor, held) if part is not None]), anchor is not None
+    
+    def collect_streaming_statistics(self, chunk_source: Callable[[], Iterator[pd.DataFrame]]) -> Dict:
+        """
+        第一遍扫描：计算需要全局上下文的统计量
+        
+        包括中位数/众数填充值、IQR异常值边界（基于缺失值处理后的取值）和需要统一为浮点的列
+        
+        Args:
+            chunk_source: 每次调用返回一个新的原始数据块迭代器
+        
+        Returns:
+            统计量字典
+        """
+        interpolate_columns = [col for col, strategy in MISSING_VALUE_STRATEGIES.items() if strategy == 'interpolate']
+        fill_columns = {col: strategy for col, strategy in MISSING_VALUE_STRATEGIES.items() if strategy in ('median', 'mode')}
+        sketches = {col: ValueCountSketch() for col in set(fill_columns) | set(OUTLIER_COLUMNS)}
+        null_counts = {col: 0 for col in sketches}
+        numeric_columns, float_columns = set(), set()
+        
+        def observe_dtypes(chunks):
+            for chunk in chunks:
+                for col in chunk.columns:
+                    if pd.api.types.is_numeric_dtype(chunk[col]) and not pd.api.types.is_bool_dtype(chunk[col]):
+                        numeric_columns.add(col)
+                        if pd.api.types.is_float_dtype(chunk[col]):
+                            float_columns.add(col)
+                yield chunk
+        
+        self._rows_read = 0
+        for window, has_anchor in self._iter_interpolation_windows(
+                observe_dtypes(self._prepare_chunks(chunk_source)), interpolate_columns):
+            for col in interpolate_columns:
+                if col in window.columns and pd.api.types.is_numeric_dtype(window[col]):
+                    window[col] = window[col].interpolate(method='linear')
+            if has_anchor:
+                window = window.iloc[1:]
+            for col, sketch in sketches.items():
+                if col in window.columns and pd.api.types.is_numeric_dtype(window[col]):
+                    sketch.update(window[col].to_numpy(dtype=float))
+                    null_counts[col] += int(window[col].isnull().sum())
+        
+        statistics = {'median': {}, 'mode': {}, 'bounds': {}, 'rows': self._rows_read,
+                      'float_columns': sorted(float_columns & numeric_columns)}
+        for col, strategy in fill_columns.items():
+            if col not in numeric_columns and strategy == 'median':
+                continue
+            value = sketches[col].median() if strategy == 'median' else sketches[col].mode()
+            if value is not None and not pd.isna(value):
+                statistics[strategy][col] = value
+                # 缺失值填充后再计算异常值边界
+                if col in OUTLIER_COLUMNS:
+                    sketches[col].update([value], count=null_counts[col])
+        
+        for col in OUTLIER_COLUMNS:
+            sketch = sketches[col]
+            if sketch.n == 0:
+                continue
+            lower, upper = outlier_bounds(col, sketch.quantile(0.25), sketch.quantile(0.75))
+            replaced = [bound for bound, hit in ((lower, sketch.values[0] < lower), (upper, sketch.values[-1] > upper)) if hit]
+            statistics['bounds'][col] = {
+                'lower': lower,
+                'upper': upper,
+                'upcast': col not in float_columns and any(float(bound) != int(bound) for bound in replaced)
+            }
+        
+        return statistics
+    
+    def clean_stream(self, chunk_source: Callable[[], Iterator[pd.DataFrame]], output_path: Path,
+                     json_path: Optional[Path] = None) -> Dict:
+        """
+        流式执行完整的数据清洗流程（两遍扫描）
+        
+        第一遍计算全局统计量，第二遍逐块执行与 clean_data 相同的清洗步骤并追加写入输出文件，
+        去重使用键哈希完成；峰值内存由块大小决定，与输入总量无关
+        
+        Args:
+            chunk_source: 每次调用返回一个新的原始数据块迭代器
+            output_path: 输出CSV路径
+            json_path: 可选的输出JSON路径
+        
+        Returns:
+            清洗统计摘要
+        """
+        logger.info("开始流式数据清洗流程...")
+        
+        statistics = self.collect_streaming_statistics(chunk_source)
+        self.log_operation("Streaming global statistics", {
+            'median': statistics['median'],
+            'mode': statistics['mode'],
+            'bounds': statistics['bounds']
+        })
+        
+        interpolate_columns = [col for col, strategy in MISSING_VALUE_STRATEGIES.items() if strategy == 'interpolate']
+        deduplicator = HashDeduplicator(DEDUP_COLUMNS)
+        output_path, json_path = Path(output_path), Path(json_path) if json_path else None
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._rows_read = 0
+        rows_before_dedup, rows_written, n_chunks = 0, 0, 0
+        columns = None
+        json_file = open(json_path, 'w', encoding='utf-8') if json_path else None
+        
+        try:
+            self.log_enabled = False
+            windows = self._iter_interpolation_windows(
+                self._prepare_chunks(chunk_source, statistics['float_columns']), interpolate_columns)
+            for window, has_anchor in windows:
+                chunk = self.handle_missing_values(window, statistics)
+                if has_anchor:
+                    chunk = chunk.iloc[1:].copy()
+                if columns is None:
+                    raw_columns = list(chunk.columns)
+                chunk = self.handle_outliers(chunk, statistics['bounds'])
+                chunk = self.standardize_text_fields(chunk)
+                chunk = self.standardize_price_field(chunk)
+                chunk = self.add_derived_features(chunk)
+                
+                rows_before_dedup += len(chunk)
+                chunk = deduplicator.filter(chunk)
+                
+                chunk.to_csv(output_path, mode='w' if columns is None else 'a', header=columns is None,
+                             index=False, encoding='utf-8')
+                if json_file is not None and len(chunk):
+                    records = self._records_json(chunk)
+                    json_file.write('[\n' if rows_written == 0 else ',\n')
+                    json_file.write(records)
+                columns = list(chunk.columns)
+                rows_written += len(chunk)
+                n_chunks += 1
+            
+            if json_file is not None:
+                json_file.write('\n]' if rows_written else '[]')
+        finally:
+            self.log_enabled = True
+            if json_file is not None:
+                json_file.close()
+        
+        self.original_shape = (statistics['rows'], len(raw_columns) if columns else 0)
+        self.cleaned_shape = (rows_written, len(columns) if columns else 0)
+        
+        self.log_operation("Remove duplicates", {
+            'original_count': rows_before_dedup,
+            'final_count': rows_written,
+            'removed_count': rows_before_dedup - rows_written
+        })
+        self.log_operation("Data cleaning completed", {
+            'mode': 'streaming',
+            'chunks': n_chunks,
+            'original_shape': self.original_shape,
+            'cleaned_shape': self.cleaned_shape,
+            'records_removed': self.original_shape[0] - self.cleaned_shape[0],
+            'features_added': self.cleaned_shape[1] - self.original_shape[1]
+        })
+        
+        return {'rows_read': statistics['rows'], 'rows_written': rows_written, 'chunks': n_chunks}
+    
+    @staticmethod
+    def _records_json(df: pd.DataFrame) -> str:
+        """将数据块编码为 export_to_format 相同格式的JSON记录（不含外层方括号）"""
+        text = df.to_json(orient='records', force_ascii=False, indent=2)
+        return text.strip()[1:-1].strip('\n')
+    
     def get_cleaning_report(self) -> Dict:
         """获取清洗报告"""
         return {
@@ -357,32 +667,52 @@ class DataCleaner:
         }
 
 
-def main():
-    """主函数：执行数据清洗流程"""
+def main(chunk_size: Optional[int] = None):
+    """
+    主函数：执行数据清洗流程
+    
+    Args:
+        chunk_size: 设置后使用流式清洗，按该行数分块读取原始数据，内存占用与输入总量无关
+    
+    Returns:
+        (清洗后的DataFrame（流式清洗时为None）, 清洗报告)
+    """
     logger.info("开始数据清洗主流程...")
     
     try:
-        # 加载原始数据
-        from utils import load_michelin_data
-        df = load_michelin_data(path_manager)
-        
-        logger.info(f"加载原始数据: {df.shape[0]} 条记录, {df.shape[1]} 个字段")
-        
-        # 数据质量验证
-        validation_results = validate_dataframe(df)
-        logger.info(f"数据质量验证完成: {validation_results['total_records']} 条记录")
-        
-        # 执行数据清洗
-        cleaner = DataCleaner()
-        cleaned_df = cleaner.clean_data(df)
-        
-        # 保存清洗后的数据
         output_path = path_manager.get_cleaned_data_path("restaurants_cleaned.csv")
-        export_to_format(cleaned_df, output_path, "csv")
-        
-        # 同时保存为JSON格式
         json_path = path_manager.get_cleaned_data_path("restaurants_cleaned.json")
-        export_to_format(cleaned_df, json_path, "json")
+        cleaner = DataCleaner()
+        
+        if chunk_size:
+            # 流式清洗：两遍扫描原始文件，逐块写出结果
+            from utils import iter_michelin_data_chunks
+            logger.info(f"使用流式清洗，块大小: {chunk_size}")
+            cleaner.clean_stream(
+                lambda: iter_michelin_data_chunks(path_manager, chunk_size),
+                output_path, json_path
+            )
+            logger.info(f"流式清洗结果已保存: {output_path}, {json_path}")
+            cleaned_df = None
+        else:
+            # 加载原始数据
+            from utils import load_michelin_data
+            df = load_michelin_data(path_manager)
+            
+            logger.info(f"加载原始数据: {df.shape[0]} 条记录, {df.shape[1]} 个字段")
+            
+            # 数据质量验证
+            validation_results = validate_dataframe(df)
+            logger.info(f"数据质量验证完成: {validation_results['total_records']} 条记录")
+            
+            # 执行数据清洗
+            cleaned_df = cleaner.clean_data(df)
+            
+            # 保存清洗后的数据
+            export_to_format(cleaned_df, output_path, "csv")
+            
+            # 同时保存为JSON格式
+            export_to_format(cleaned_df, json_path, "json")
         
         # 保存清洗报告
         cleaning_report = cleaner.get_cleaning_report()
@@ -407,8 +737,9 @@ def main():
         
         logger.info(f"清洗报告已保存: {report_path}")
         
-        # 缓存清洗后的数据
-        cache_manager.set_cache("cleaned_data", cleaned_df)
+        # 缓存清洗后的数据（流式清洗不在内存中保留完整结果）
+        if cleaned_df is not None:
+            cache_manager.set_cache("cleaned_data", cleaned_df)
         cache_manager.set_cache("cleaning_report", cleaning_report)
         
         logger.info("数据清洗流程完成!")
@@ -423,4 +754,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='米其林餐厅数据清洗')
+    parser.add_argument('--chunk-size', type=int, help=f'流式清洗的块大小（行数），例如 {DEFAULT_CHUNK_SIZE}')
+    args = parser.parse_args()
+    
+    main(args.chunk_size) 
\ No newline at end of file
@@ -9,9 +9,9 @@
 import os
 import sys
 import json
+import uuid
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 from pathlib import Path
 import joblib
 from sklearn.preprocessing import StandardScaler
@@ -99,18 +99,20 @@ def extract_features(restaurants_df):
     imputer = SimpleImputer(strategy='mean')
     X_imputed = imputer.fit_transform(X)
     
-    return X_imputed, features, restaurants_df
+    return X_imputed, features, restaurants_df, imputer
 
-def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state=42):
+def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state=42, keep_all_candidates=False):
     """
     对餐厅数据执行聚类分析，尝试多种算法和参数
+    
+    默认每种算法只保留最佳候选结果，keep_all_candidates=True 时保留全部参数组合
     """
     # 标准化特征
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
     # 使用PCA降维，便于可视化
-    pca = PCA(n_components=2)
+    pca = PCA(n_components=2, random_state=random_state)
     X_pca = pca.fit_transform(X_scaled)
     
     print(f"PCA解释方差比: {pca.explained_variance_ratio_}")
@@ -146,6 +148,8 @@ def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state
             'best_silhouette': best_kmeans_silhouette,
             'best_result': kmeans_results[best_kmeans_n]
         }
+        if keep_all_candidates:
+            clustering_experiments['kmeans']['candidates'] = kmeans_results
     
     # 2. DBSCAN聚类 - 使用更宽松的参数范围
     dbscan_results = {}
@@ -179,7 +183,8 @@ def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state
                         'labels': labels,
                         'n_clusters': n_clusters,
                         'noise_ratio': noise_ratio,
-                        'params': {'eps': eps, 'min_samples': min_samples}
+                        'params': {'eps': eps, 'min_samples': min_samples},
+                        'core_sample_indices': dbscan.core_sample_indices_
                     }
                     
                     if combined_score > best_dbscan_score:
@@ -195,6 +200,8 @@ def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state
             'best_score': best_dbscan_score,
             'best_result': dbscan_results[best_dbscan_params]
         }
+        if keep_all_candidates:
+            clustering_experiments['dbscan']['candidates'] = dbscan_results
     
     # 3. 层次聚类
     hc_results = {}
@@ -222,6 +229,8 @@ def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state
             'best_silhouette': best_hc_silhouette,
             'best_result': hc_results[best_hc_n]
         }
+        if keep_all_candidates:
+            clustering_experiments['hierarchical']['candidates'] = hc_results
     
     # 优先选择K-means，除非其他算法明显更好
     best_algorithm = None
@@ -277,6 +286,8 @@ def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state
         clustering_result = {
             'best_algorithm': best_algorithm,
             'clustering_experiments': clustering_experiments,
+            'scaler': scaler,
+            'pca': pca,
             'pca_components': pca.components_,
             'pca_explained_variance': pca.explained_variance_ratio_.tolist(),
             'visualizations': {
@@ -288,9 +299,9 @@ def perform_clustering(X, restaurants_df, n_clusters_range=(3, 15), random_state
             'cluster_analysis': cluster_analysis
         }
         
-        return clustering_result, X_pca, best_labels
+        return clustering_result
     
-    return None, X_pca, None
+    return None
 
 def analyze_clusters(restaurants_df, labels):
     """分析聚类特征"""
@@ -335,72 +346,66 @@ def analyze_clusters(restaurants_df, labels):
         'cluster_features': cluster_features
     }
 
-def visualize_clusters(X_pca, labels, restaurants_df, output_path):
+def build_cluster_model(clustering_result, X, features, imputer):
     """
-    可视化聚类结果
+    构建用于在线预测的聚类模型包
+    
+    只保留预测所需的最小状态（特征定义、缺失值填充、标准化参数、
+    各聚类质心以及DBSCAN核心样本），供后端服务一次性加载后批量预测
     """
-    plt.figure(figsize=(12, 8))
-    
-    # 获取唯一聚类标签(排除噪声点)
-    unique_clusters = sorted(list(set([label for label in labels if label != -1])))
-    
-    # 为每个聚类使用不同颜色
-    cmap = plt.cm.get_cmap('tab10', len(unique_clusters))
-    
-    # 绘制每个聚类
-    for i, cluster in enumerate(unique_clusters):
-        cluster_points = X_pca[labels == cluster]
-        plt.scatter(
-            cluster_points[:, 0], 
-            cluster_points[:, 1], 
-            s=50, 
-            color=cmap(i), 
-            alpha=0.7, 
-            label=f'Cluster {cluster}'
-        )
+    best_algorithm = clustering_result['best_algorithm']
+    best_result = clustering_result['clustering_experiments'][best_algorithm]['best_result']
+    scaler = clustering_result['scaler']
+    pca = clustering_result['pca']
+    
+    X_scaled = scaler.transform(X)
+    labels = np.asarray(best_result['labels'])
+    
+    # 各聚类在标准化空间中的质心(排除噪声点)
+    cluster_ids = np.array(sorted(label for label in set(labels) if label != -1))
+    if best_algorithm == 'kmeans' and 'centers' in best_result:
+        centroids = np.asarray(best_result['centers'])
+    else:
+        centroids = np.vstack([X_scaled[labels == cluster_id].mean(axis=0) for cluster_id in cluster_ids])
+    
+    cluster_model = {
+        'algorithm': best_algorithm,
+        'features': list(features),
+        'major_cuisines': [f[len('cuisine_'):] for f in features if f.startswith('cuisine_')],
+        'major_regions': [f[len('region_'):] for f in features if f.startswith('region_')],
+        'imputer_statistics': imputer.statistics_,
+        'scaler_mean': scaler.mean_,
+        'scaler_scale': scaler.scale_,
+        'pca_mean': pca.mean_,
+        'pca_components': pca.components_,
+        'cluster_ids': cluster_ids,
+        'centroids': centroids,
+        'created_at': pd.Timestamp.now().isoformat()
+    }
     
-    # 单独绘制噪声点(如果有)
-    if -1 in labels:
-        noise_points = X_pca[labels == -1]
-        plt.scatter(
-            noise_points[:, 0], 
-            noise_points[:, 1], 
-            s=30, 
-            color='black', 
-            alpha=0.3, 
-            label='Noise'
-        )
+    # DBSCAN没有predict方法，保存核心样本用于近邻归属判断
+    if best_algorithm == 'dbscan':
+        core_indices = best_result['core_sample_indices']
+        cluster_model['core_samples'] = X_scaled[core_indices]
+        cluster_model['core_labels'] = labels[core_indices]
+        cluster_model['eps'] = best_result['params']['eps']
     
-    plt.title('米其林餐厅聚类分析 (PCA降维可视化)')
-    plt.xlabel('主成分 1 (价格和奢华程度)')
-    plt.ylabel('主成分 2 (菜系特色和创新度)')
-    plt.legend()
-    plt.grid(True, linestyle='--', alpha=0.7)
-    
-    # 添加部分餐厅名称标注
-    np.random.seed(42)
-    if 'name' in restaurants_df.columns:
-        sample_indices = np.random.choice(
-            range(len(restaurants_df)), 
-            size=min(20, len(restaurants_df)), 
-            replace=False
-        )
-        
-        for idx in sample_indices:
-            plt.annotate(
-                restaurants_df.iloc[idx]['name'],
-                (X_pca[idx, 0], X_pca[idx, 1]),
-                fontsize=8,
-                alpha=0.8
-            )
-    
-    plt.tight_layout()
-    plt.savefig(output_path)
-    plt.close()
+    return cluster_model
 
-def save_clustering_results(clustering_result, restaurants_df, output_dir):
+def save_cluster_model(cluster_model, output_dir):
+    """
+    保存在线预测用的聚类模型包
+    """
+    model_path = output_dir / 'cluster_model.joblib'
+    joblib.dump(cluster_model, model_path)
+    print(f"聚类预测模型已保存到 {model_path}")
+
+def save_clustering_results(clustering_result, restaurants_df, output_dir, legacy_format=False):
     """
     保存聚类结果
+    
+    默认保存为紧凑格式(JSON清单 + .npy类型化数组)，
+    legacy_format=True 时额外保存旧版 clusters.joblib / clusters.json
     """
     # 创建聚类报告
     cluster_report = {
@@ -426,6 +431,114 @@ def save_clustering_results(clustering_result, restaurants_df, output_dir):
     clustered_df_path = output_dir / 'restaurants_with_clusters.csv'
     restaurants_df.to_csv(clustered_df_path, index=False, encoding='utf-8')
     
+    # 保存紧凑格式的聚类结果
+    save_compact_clustering_artifacts(clustering_result, output_dir / 'clusters')
+    
+    if legacy_format:
+        save_legacy_clustering_results(clustering_result, output_dir)
+    
+    print(f"聚类结果已保存到 {output_dir}")
+
+def _to_builtin(value):
+    """将numpy标量和数组递归转换为可JSON序列化的Python类型"""
+    if isinstance(value, dict):
+        return {str(k): _to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def _label_dtype(labels):
+    """选择能容纳聚类标签的最小整数类型"""
+    labels = np.asarray(labels)
+    if labels.size == 0 or (labels.min() >= np.iinfo(np.int16).min and labels.max() <= np.iinfo(np.int16).max):
+        return np.int16
+    return np.int32
+
+def save_compact_clustering_artifacts(clustering_result, artifact_dir):
+    """
+    以紧凑格式保存聚类结果
+    
+    目录结构:
+        manifest.json     - 算法、评分、参数、聚类分析等小体量元数据
+        *.<运行标识>.npy   - 类型化数组(int16标签、float32 PCA坐标等)，可内存映射加载
+    
+    数组使用本次运行独有的文件名，全部写完后才原子替换清单，
+    读取方看到的清单与其引用的数组总是同一次运行的结果；
+    替换清单后删除新清单不再引用的数组文件（包括之前 keep_all_candidates=True 留下的候选结果）
+    """
+    artifact_dir.mkdir(parents=True, exist_ok=True)
+    run_id = uuid.uuid4().hex[:12]
+    arrays = {}
+    
+    def add_array(name, array, dtype):
+        array = np.ascontiguousarray(array, dtype=dtype)
+        file_name = f'{name}.{run_id}.npy'
+        with open(artifact_dir / file_name, 'wb') as f:
+            np.save(f, array)
+        arrays[name] = {'file': file_name, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+        return name
+    
+    def pack_result(prefix, result):
+        packed = {'_arrays': {}}
+        for key, value in result.items():
+            if key == 'labels':
+                packed['_arrays'][key] = add_array(f'{prefix}.labels', value, _label_dtype(value))
+            elif key == 'core_sample_indices':
+                packed['_arrays'][key] = add_array(f'{prefix}.core_sample_indices', value, np.int32)
+            elif isinstance(value, np.ndarray):
+                packed['_arrays'][key] = add_array(f'{prefix}.{key}', value, np.float32)
+            else:
+                packed[key] = _to_builtin(value)
+        return packed
+    
+    algorithms = {}
+    for alg, alg_data in clustering_result['clustering_experiments'].items():
+        entry = {k: _to_builtin(v) for k, v in alg_data.items() if k not in ('best_result', 'candidates')}
+        entry['best_result'] = pack_result(f'{alg}.best', alg_data['best_result'])
+        if 'candidates' in alg_data:
+            entry['candidates'] = {
+                str(key): pack_result(f'{alg}.candidate_{key}', result)
+                for key, result in alg_data['candidates'].items()
+            }
+        algorithms[alg] = entry
+    
+    pca_data = clustering_result['visualizations']['pca']['data']
+    add_array('pca.data', pca_data, np.float32)
+    add_array('pca.components', clustering_result['pca_components'], np.float32)
+    
+    manifest = {
+        'format_version': 1,
+        'created_at': pd.Timestamp.now().isoformat(),
+        'best_algorithm': str(clustering_result['best_algorithm']),
+        'n_samples': int(len(pca_data)),
+        'pca_explained_variance': _to_builtin(clustering_result['pca_explained_variance']),
+        'algorithms': algorithms,
+        'cluster_analysis': _to_builtin(clustering_result['cluster_analysis']),
+        'arrays': arrays
+    }
+    
+    tmp_manifest = artifact_dir / 'manifest.json.tmp'
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_manifest, artifact_dir / 'manifest.json')
+    
+    # 已按旧清单内存映射的进程不受删除影响（文件在映射关闭后才真正释放）
+    referenced = {info['file'] for info in arrays.values()}
+    for path in artifact_dir.glob('*.npy*'):
+        if path.name not in referenced:
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"删除旧的聚类数组文件 {path} 失败: {e}")
+
+def save_legacy_clustering_results(clustering_result, output_dir):
+    """
+    保存旧版格式的聚类结果(clusters.joblib + clusters.json)
+    """
     # 转换numpy数组为Python列表 - 保存完整的聚类结果
     # 创建可JSON序列化的副本
     serializable_result = {}
@@ -437,7 +550,10 @@ def save_clustering_results(clustering_result, restaurants_df, output_dir):
             for alg, alg_data in value.items():
                 serializable_result[key][alg] = {}
                 for k, v in alg_data.items():
-                    if k == 'best_result':
+                    if k == 'candidates':
+                        # 全部候选结果不写入JSON
+                        continue
+                    elif k == 'best_result':
                         # 处理最佳结果
                         serializable_result[key][alg][k] = {}
                         for res_k, res_v in v.items():
@@ -447,6 +563,9 @@ def save_clustering_results(clustering_result, restaurants_df, output_dir):
                                 serializable_result[key][alg][k][res_k] = res_v
                     else:
                         serializable_result[key][alg][k] = v
+        elif key in ('scaler', 'pca'):
+            # 模型对象只保存在joblib中
+            continue
         elif key == 'pca_components':
             # 处理PCA组件
             if hasattr(value, 'tolist'):
@@ -493,11 +612,13 @@ def save_clustering_results(clustering_result, restaurants_df, output_dir):
     with open(clusters_json_path, 'w', encoding='utf-8') as f:
         json.dump(serializable_result, f, ensure_ascii=False, indent=2)
     
-    print(f"聚类结果已保存到 {output_dir}")
-
-def main():
+def main(keep_all_candidates=False, legacy_format=False):
     """
     主函数 - 执行聚类分析流程
+    
+    Args:
+        keep_all_candidates: 是否保留每种算法的全部候选结果
+        legacy_format: 是否额外输出旧版 clusters.joblib / clusters.json
     """
     # 设置目录
     setup_directories([processed_dir, output_dir])
@@ -512,22 +633,20 @@ def main():
     
     # 提取特征
     print("提取聚类特征...")
-    X, features, enhanced_df = extract_features(restaurants_df)
+    X, features, enhanced_df, imputer = extract_features(restaurants_df)
     
     # 执行聚类
     print("执行聚类分析...")
-    clustering_result, X_pca, labels = perform_clustering(X, enhanced_df)
+    clustering_result = perform_clustering(X, enhanced_df, keep_all_candidates=keep_all_candidates)
     
     if clustering_result:
-        # 可视化聚类结果
-        print("可视化聚类结果...")
-        visualize_clusters(X_pca, labels, enhanced_df, output_dir / 'clustering_visualization.png')
-        
         # 保存结果
         print("保存聚类结果...")
-        save_clustering_results(clustering_result, enhanced_df, processed_dir)
+        save_clustering_results(clustering_result, enhanced_df, processed_dir, legacy_format=legacy_format)
+        save_cluster_model(build_cluster_model(clustering_result, X, features, imputer), processed_dir)
         
         print(f"聚类分析完成! 使用{clustering_result['best_algorithm']}算法识别出{clustering_result['cluster_analysis']['cluster_sizes']}个聚类。")
+        print("聚类图表由 scripts/render_figures.py 单独渲染")
     else:
         print("聚类分析失败，未能找到有效的聚类结果。")
 
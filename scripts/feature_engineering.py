@@ -3,22 +3,189 @@
 处理数据分桶、映射、文本处理等高级特征工程任务
 """
 
+import os
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler, LabelEncoder, MinMaxScaler
 from sklearn.feature_extraction.text import TfidfVectorizer
-import re
 from typing import Dict, List, Tuple, Optional, Any
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import hashlib
+import json
 import joblib
 
 from utils import logger, path_manager, cache_manager, export_to_format
 
+from feature_transform import (
+    SPECIAL_KEYWORDS, FAMOUS_FOOD_CITIES, DEFAULT_AGGREGATION_SPECS, CATEGORICAL_COLUMNS, ONE_HOT_MAX_CARDINALITY,
+    NUMERICAL_COLUMNS, TARGET_ENCODING_COLUMNS, TARGET_ENCODING_FOLDS, TARGET_ENCODING_SMOOTHING,
+    LATITUDE_BINS, LATITUDE_BANDS, LONGITUDE_BINS, LONGITUDE_BANDS, ERA_LABELS, era_bins,
+    price_category, density_level, classify_cuisine_type, name_complexity,
+    detect_name_style, out_of_fold_target_encoding, FeatureTransform
+)
+
+# 特征代码版本，修改任意特征步骤的实现后递增以使全部步骤缓存失效
+FEATURE_CODE_VERSION = 2
+
+# 输出模式：dense 将全部特征列写入同一个DataFrame；
+# sparse 将独热编码保存为CSR矩阵，标准化/归一化变体只在请求时以float32数组保存
+OUTPUT_MODES = ('dense', 'sparse')
+FEATURE_VARIANTS = ('scaled', 'normalized')
+
+# 特征步骤依赖图：每个步骤声明读取的原始列和依赖的上游步骤，
+# 步骤只能看到原始列和祖先步骤的输出列；version 用于单独失效某个步骤的缓存
+FEATURE_STEPS = [
+    {'name': 'price', 'method': 'create_price_features', 'version': 1,
+     'inputs': ['price_numeric', 'stars'], 'depends_on': []},
+    {'name': 'geographic', 'method': 'create_geographic_features', 'version': 1,
+     'inputs': ['latitude', 'longitude', 'city_restaurant_density'], 'depends_on': []},
+    {'name': 'temporal', 'method': 'create_temporal_features', 'version': 1,
+     'inputs': ['year', 'stars'], 'depends_on': []},
+    {'name': 'cuisine', 'method': 'create_cuisine_features', 'version': 1,
+     'inputs': ['cuisine', 'stars'], 'depends_on': []},
+    {'name': 'text', 'method': 'create_text_features', 'version': 1,
+     'inputs': ['name', 'city'], 'depends_on': []},
+    {'name': 'interaction', 'method': 'create_interaction_features', 'version': 1,
+     'inputs': ['stars', 'continent'], 'depends_on': ['price', 'temporal', 'cuisine']},
+    {'name': 'aggregation', 'method': 'create_aggregation_features', 'version': 1,
+     'inputs': [], 'depends_on': []},
+    {'name': 'encoding', 'method': 'encode_categorical_features', 'version': 1,
+     'inputs': ['cuisine', 'city', 'region', 'hemisphere', 'continent', 'climate_zone'],
+     'depends_on': ['price', 'geographic', 'temporal', 'cuisine', 'text']},
+    {'name': 'scaling', 'method': 'scale_numerical_features', 'version': 1,
+     'inputs': ['latitude', 'longitude', 'year', 'stars', 'price_numeric', 'years_since_award', 'name_length',
+                'name_word_count', 'distance_to_ny', 'city_restaurant_density'],
+     'depends_on': ['price', 'temporal', 'cuisine', 'text']},
+    {'name': 'target_encoding', 'method': 'create_target_encoding', 'version': 2,
+     'inputs': ['cuisine', 'city', 'region', 'stars'], 'depends_on': ['temporal', 'cuisine']}
+]
+
+
+def hash_column(series: pd.Series) -> str:
+    """计算单列（含列名、数据类型和索引）的内容哈希"""
+    hasher = hashlib.sha256(f"{series.name}:{series.dtype}".encode())
+    hasher.update(pd.util.hash_pandas_object(series, index=True).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+def build_one_hot_matrix(df: pd.DataFrame, columns: List[str]) -> Tuple[sparse.csr_matrix, List[str]]:
+    """
+    构建与 pd.get_dummies 列顺序一致的CSR独热矩阵
+    
+    Args:
+        df: 数据
+        columns: 需要独热编码的列
+    
+    Returns:
+        (uint8类型的CSR矩阵, 独热列名列表)
+    """
+    rows, cols, names = [], [], []
+    offset = 0
+    for col in columns:
+        series = df[col]
+        if pd.api.types.is_categorical_dtype(series):
+            # 分类类型与 get_dummies 一样保留未出现的类别
+            categories = list(series.cat.categories)
+            codes = series.cat.codes.to_numpy()
+        else:
+            codes, categories = pd.factorize(series, sort=True)
+        valid = codes >= 0
+        rows.append(np.flatnonzero(valid))
+        cols.append(codes[valid] + offset)
+        names.extend(f'{col}_{category}' for category in categories)
+        offset += len(categories)
+    
+    row_index = np.concatenate(rows) if rows else np.empty(0, dtype=int)
+    col_index = np.concatenate(cols) if cols else np.empty(0, dtype=int)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(row_index), dtype=np.uint8), (row_index, col_index)),
+        shape=(len(df), offset)
+    )
+    return matrix, names
+
+
+def compact_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """压缩特征表内存：编码列降为最小整数类型，低基数字符串列转为分类类型"""
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if col.endswith('_encoded') and pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif series.dtype == object and series.nunique(dropna=True) <= len(series) // 2:
+            df[col] = series.astype('category')
+    return df
+
+
+def build_feature_bundle(engineer: 'FeatureEngineer', df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    将稀疏模式的特征工程结果打包为低内存产物
+    
+    Returns:
+        包含基础特征表、CSR独热矩阵、可选float32变体数组和列元数据的字典
+    """
+    frame = compact_feature_frame(df)
+    return {
+        'format': 'sparse',
+        'frame': frame,
+        'one_hot': engineer.feature_arrays.get('one_hot'),
+        'scaled': engineer.feature_arrays.get('scaled'),
+        'normalized': engineer.feature_arrays.get('normalized'),
+        'columns': build_feature_metadata(engineer, frame)
+    }
+
+
+def build_feature_metadata(engineer: 'FeatureEngineer', frame: pd.DataFrame) -> Dict[str, Any]:
+    """记录各部分特征的列名和数据类型"""
+    return {
+        'n_rows': int(len(frame)),
+        'frame': {col: str(dtype) for col, dtype in frame.dtypes.items()},
+        'one_hot': engineer.feature_metadata.get('one_hot', []),
+        'scaled': engineer.feature_metadata.get('scaled', []),
+        'normalized': engineer.feature_metadata.get('normalized', [])
+    }
+
+
+def bundle_to_dataframe(bundle: Dict[str, Any]) -> pd.DataFrame:
+    """将稀疏特征产物还原为稠密DataFrame（兼容旧格式）"""
+    if not isinstance(bundle, dict):
+        return bundle
+    
+    parts = [bundle['frame']]
+    index = bundle['frame'].index
+    if bundle.get('one_hot') is not None:
+        parts.append(pd.DataFrame(bundle['one_hot'].toarray(), columns=bundle['columns']['one_hot'], index=index))
+    for variant in FEATURE_VARIANTS:
+        if bundle.get(variant) is not None:
+            parts.append(pd.DataFrame(bundle[variant], columns=bundle['columns'][variant], index=index))
+    return pd.concat(parts, axis=1)
+
 
 class FeatureEngineer:
     """特征工程器"""
     
-    def __init__(self):
+    def __init__(self, aggregation_specs: Optional[List[Dict]] = None, output_mode: str = 'dense',
+                 feature_variants: Optional[List[str]] = None):
+        """
+        初始化特征工程器
+        
+        Args:
+            aggregation_specs: 追加的聚合特征定义，格式同 DEFAULT_AGGREGATION_SPECS，
+                可选 names 指定结果列名、round 指定保留小数位（默认2）
+            output_mode: dense 或 sparse
+            feature_variants: sparse 模式下需要保存的数值变体（scaled/normalized），默认不保存
+        """
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"不支持的输出模式: {output_mode}")
+        unknown_variants = set(feature_variants or []) - set(FEATURE_VARIANTS)
+        if unknown_variants:
+            raise ValueError(f"不支持的特征变体: {sorted(unknown_variants)}")
+        self.aggregation_specs = DEFAULT_AGGREGATION_SPECS + list(aggregation_specs or [])
+        self.output_mode = output_mode
+        self.feature_variants = list(FEATURE_VARIANTS) if output_mode == 'dense' else list(feature_variants or [])
+        self.feature_arrays = {}
+        self.feature_metadata = {}
         self.feature_transformers = {}
         self.feature_mappings = {}
         self.feature_statistics = {}
@@ -40,19 +207,7 @@ class FeatureEngineer:
         
         if 'price_numeric' in df.columns:
             # 价格分档
-            def price_category(price_num):
-                if price_num <= 1:
-                    return 'Budget'
-                elif price_num <= 2:
-                    return 'Moderate'
-                elif price_num <= 3:
-                    return 'Expensive'
-                elif price_num <= 4:
-                    return 'Very Expensive'
-                else:
-                    return 'Luxury'
-            
-            df['price_category'] = df['price_numeric'].apply(price_category)
+            df['price_category'] = price_category(df['price_numeric'])
             
             # 价格-星级比率（性价比指标）
             if 'stars' in df.columns:
@@ -78,34 +233,21 @@ class FeatureEngineer:
             # 纬度带
             df['latitude_band'] = pd.cut(
                 df['latitude'], 
-                bins=[-90, -60, -30, 0, 30, 60, 90],
-                labels=['Antarctic', 'South Temperate', 'South Subtropical', 
-                       'Equatorial', 'North Subtropical', 'North Temperate']
+                bins=LATITUDE_BINS,
+                labels=LATITUDE_BANDS
             )
             
             # 经度带
             df['longitude_band'] = pd.cut(
                 df['longitude'],
-                bins=[-180, -120, -60, 0, 60, 120, 180],
-                labels=['Far West', 'West', 'West Central', 
-                       'East Central', 'East', 'Far East']
+                bins=LONGITUDE_BINS,
+                labels=LONGITUDE_BANDS
             )
             
             # 地理区域热度（基于餐厅密度）
             if 'city_restaurant_density' in df.columns:
                 density_quantiles = df['city_restaurant_density'].quantile([0.25, 0.5, 0.75])
-                
-                def density_level(density):
-                    if density <= density_quantiles[0.25]:
-                        return 'Low Density'
-                    elif density <= density_quantiles[0.5]:
-                        return 'Medium Density'
-                    elif density <= density_quantiles[0.75]:
-                        return 'High Density'
-                    else:
-                        return 'Very High Density'
-                
-                df['density_level'] = df['city_restaurant_density'].apply(density_level)
+                df['density_level'] = density_level(df['city_restaurant_density'], density_quantiles)
             
             self.log_feature_operation("Create geographic features", {
                 'new_features': ['latitude_band', 'longitude_band', 'density_level'],
@@ -125,8 +267,8 @@ class FeatureEngineer:
             # 年代分组
             df['era'] = pd.cut(
                 df['year'],
-                bins=[1900, 2010, 2015, 2020, current_year + 1],
-                labels=['Historic', 'Early Modern', 'Recent', 'Current'],
+                bins=era_bins(current_year),
+                labels=ERA_LABELS,
                 right=False
             )
             
@@ -158,22 +300,7 @@ class FeatureEngineer:
             df['cuisine_popularity'] = df['cuisine'].map(cuisine_counts)
             
             # 菜系分类
-            asian_cuisines = ['Japanese', 'Chinese', 'Thai', 'Korean', 'Asian', 'Cantonese', 
-                            'Sushi', 'Teppanyaki', 'Shanghainese', 'Sichuan']
-            european_cuisines = ['French', 'Italian', 'Spanish', 'British', 'European']
-            modern_cuisines = ['Modern', 'Contemporary', 'Creative', 'Innovative', 'Fusion']
-            
-            def classify_cuisine_type(cuisine):
-                if cuisine in asian_cuisines:
-                    return 'Asian'
-                elif cuisine in european_cuisines:
-                    return 'European'
-                elif cuisine in modern_cuisines:
-                    return 'Modern'
-                else:
-                    return 'Other'
-            
-            df['cuisine_type'] = df['cuisine'].apply(classify_cuisine_type)
+            df['cuisine_type'] = classify_cuisine_type(df['cuisine'])
             
             # 菜系-星级关系
             if 'stars' in df.columns:
@@ -200,29 +327,15 @@ class FeatureEngineer:
         # 餐厅名特征
         if 'name' in df.columns:
             # 名称复杂度
-            df['name_complexity'] = df['name'].astype(str).apply(
-                lambda x: len(re.findall(r'[A-Z]', x)) + len(re.findall(r'[0-9]', x))
-            )
+            df['name_complexity'] = name_complexity(df['name'])
             
             # 是否包含特殊词汇
-            special_keywords = ['royal', 'grand', 'palace', 'house', 'manor', 'castle']
             df['has_special_keyword'] = df['name'].str.lower().str.contains(
-                '|'.join(special_keywords), na=False
+                '|'.join(SPECIAL_KEYWORDS), na=False
             )
             
             # 名称语言特征（简单检测）
-            def detect_name_style(name):
-                name = str(name).lower()
-                if re.search(r'[àáâãäåæçèéêëìíîïñòóôõöøùúûüý]', name):
-                    return 'European'
-                elif re.search(r'[亜-熹一-龯]', name):
-                    return 'Asian'
-                elif re.search(r'[а-я]', name):
-                    return 'Cyrillic'
-                else:
-                    return 'English'
-            
-            df['name_style'] = df['name'].apply(detect_name_style)
+            df['name_style'] = detect_name_style(df['name'])
         
         # 城市名特征
         if 'city' in df.columns:
@@ -230,9 +343,7 @@ class FeatureEngineer:
             df['city_name_length'] = df['city'].astype(str).str.len()
             
             # 是否为知名美食城市
-            famous_food_cities = ['paris', 'tokyo', 'new york', 'london', 'hong kong', 
-                                'singapore', 'barcelona', 'copenhagen', 'bangkok']
-            df['famous_food_city'] = df['city'].str.lower().isin(famous_food_cities)
+            df['famous_food_city'] = df['city'].str.lower().isin(FAMOUS_FOOD_CITIES)
         
         self.log_feature_operation("Create text features", {
             'new_features': ['name_complexity', 'has_special_keyword', 'name_style', 
@@ -275,41 +386,20 @@ class FeatureEngineer:
         """创建聚合特征"""
         logger.info("创建聚合特征...")
         
-        # 城市层面聚合
-        if 'city' in df.columns:
-            city_stats = df.groupby('city').agg({
-                'stars': ['mean', 'std', 'count'],
-                'price_numeric': ['mean', 'std'] if 'price_numeric' in df.columns else 'count',
-                'years_since_award': ['mean', 'min', 'max'] if 'years_since_award' in df.columns else 'count'
-            }).round(2)
-            
-            # 展平列名
-            city_stats.columns = ['_'.join(col).strip() for col in city_stats.columns.values]
-            city_stats = city_stats.add_prefix('city_')
-            
-            # 合并回原数据
-            df = df.merge(city_stats, left_on='city', right_index=True, how='left')
-        
-        # 菜系层面聚合
-        if 'cuisine' in df.columns:
-            cuisine_stats = df.groupby('cuisine').agg({
-                'stars': ['mean', 'count'],
-                'price_numeric': 'mean' if 'price_numeric' in df.columns else 'count'
-            }).round(2)
-            
-            cuisine_stats.columns = ['_'.join(col).strip() for col in cuisine_stats.columns.values]
-            cuisine_stats = cuisine_stats.add_prefix('cuisine_')
+        # 每个分组键只构建一次分组索引，用 transform 直接回填到原行，避免多次 merge 复制整张宽表
+        groupers = {}
+        for spec in self.aggregation_specs:
+            key, column = spec['key'], spec['column']
+            if key not in df.columns or column not in df.columns:
+                continue
             
-            df = df.merge(cuisine_stats, left_on='cuisine', right_index=True, how='left')
-        
-        # 年份层面聚合
-        if 'year' in df.columns:
-            year_stats = df.groupby('year').agg({
-                'stars': 'count'
-            })
-            year_stats.columns = ['year_total_awards']
+            if key not in groupers:
+                groupers[key] = df.groupby(key, sort=False)
+            grouped_column = groupers[key][column]
             
-            df = df.merge(year_stats, left_on='year', right_index=True, how='left')
+            names = spec.get('names') or [f"{key}_{column}_{func}" for func in spec['functions']]
+            for func, name in zip(spec['functions'], names):
+                df[name] = grouped_column.transform(func).round(spec.get('round', 2))
         
         self.log_feature_operation("Create aggregation features", {
             'city_features_added': len([col for col in df.columns if col.startswith('city_')]),
@@ -323,14 +413,8 @@ class FeatureEngineer:
         """编码分类特征"""
         logger.info("编码分类特征...")
         
-        categorical_columns = [
-            'cuisine', 'city', 'region', 'price_category', 'cuisine_type',
-            'era', 'latitude_band', 'longitude_band', 'density_level',
-            'name_style', 'hemisphere', 'continent', 'climate_zone'
-        ]
-        
         # 标签编码
-        for col in categorical_columns:
+        for col in CATEGORICAL_COLUMNS:
             if col in df.columns:
                 le = LabelEncoder()
                 df[f'{col}_encoded'] = le.fit_transform(df[col].astype(str))
@@ -338,17 +422,25 @@ class FeatureEngineer:
         
         # 独热编码（只对低基数分类变量）
         low_cardinality_cols = []
-        for col in categorical_columns:
-            if col in df.columns and df[col].nunique() <= 10:
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns and df[col].nunique() <= ONE_HOT_MAX_CARDINALITY:
                 low_cardinality_cols.append(col)
         
-        if low_cardinality_cols:
+        one_hot_count = 0
+        if low_cardinality_cols and self.output_mode == 'sparse':
+            # 稀疏模式：独热编码单独保存为CSR矩阵
+            one_hot, one_hot_columns = build_one_hot_matrix(df, low_cardinality_cols)
+            self.feature_arrays['one_hot'] = one_hot
+            self.feature_metadata['one_hot'] = one_hot_columns
+            one_hot_count = len(one_hot_columns)
+        elif low_cardinality_cols:
             encoded_df = pd.get_dummies(df[low_cardinality_cols], prefix=low_cardinality_cols)
             df = pd.concat([df, encoded_df], axis=1)
+            one_hot_count = len([col for col in df.columns if any(col.startswith(prefix + '_') for prefix in low_cardinality_cols)])
         
         self.log_feature_operation("Encode categorical features", {
             'label_encoded_features': len([col for col in df.columns if col.endswith('_encoded')]),
-            'one_hot_encoded_features': len([col for col in df.columns if any(col.startswith(prefix + '_') for prefix in low_cardinality_cols)]),
+            'one_hot_encoded_features': one_hot_count,
             'low_cardinality_columns': low_cardinality_cols
         })
         
@@ -358,111 +450,198 @@ class FeatureEngineer:
         """标准化数值特征"""
         logger.info("标准化数值特征...")
         
-        numerical_columns = [
-            'latitude', 'longitude', 'year', 'stars', 'price_numeric',
-            'years_since_award', 'name_length', 'name_word_count',
-            'distance_to_ny', 'city_restaurant_density', 'price_star_ratio',
-            'value_score', 'price_percentile', 'freshness_score',
-            'cuisine_popularity', 'name_complexity', 'city_name_length'
-        ]
-        
-        # 标准化
-        scaler = StandardScaler()
-        numerical_features = [col for col in numerical_columns if col in df.columns]
-        
-        if numerical_features:
-            scaled_features = scaler.fit_transform(df[numerical_features])
-            scaled_df = pd.DataFrame(
-                scaled_features, 
-                columns=[f'{col}_scaled' for col in numerical_features],
-                index=df.index
-            )
-            df = pd.concat([df, scaled_df], axis=1)
-            self.feature_transformers['standard_scaler'] = scaler
-        
-        # 最小-最大标准化
-        minmax_scaler = MinMaxScaler()
-        if numerical_features:
-            normalized_features = minmax_scaler.fit_transform(df[numerical_features])
-            normalized_df = pd.DataFrame(
-                normalized_features,
-                columns=[f'{col}_normalized' for col in numerical_features],
-                index=df.index
-            )
-            df = pd.concat([df, normalized_df], axis=1)
-            self.feature_transformers['minmax_scaler'] = minmax_scaler
+        numerical_features = [col for col in NUMERICAL_COLUMNS if col in df.columns]
+        
+        # 标准化与最小-最大标准化，变体未被请求时只拟合转换器
+        variant_scalers = [('scaled', 'standard_scaler', StandardScaler()), ('normalized', 'minmax_scaler', MinMaxScaler())]
+        variant_counts = {}
+        for variant, transformer_name, scaler in variant_scalers:
+            variant_counts[variant] = 0
+            if not numerical_features:
+                continue
+            
+            variant_columns = [f'{col}_{variant}' for col in numerical_features]
+            if variant not in self.feature_variants:
+                scaler.fit(df[numerical_features])
+            elif self.output_mode == 'sparse':
+                self.feature_arrays[variant] = scaler.fit_transform(df[numerical_features]).astype(np.float32)
+                self.feature_metadata[variant] = variant_columns
+                variant_counts[variant] = len(variant_columns)
+            else:
+                variant_df = pd.DataFrame(
+                    scaler.fit_transform(df[numerical_features]),
+                    columns=variant_columns,
+                    index=df.index
+                )
+                df = pd.concat([df, variant_df], axis=1)
+                variant_counts[variant] = len(variant_columns)
+            self.feature_transformers[transformer_name] = scaler
         
         self.log_feature_operation("Scale numerical features", {
-            'standardized_features': len([col for col in df.columns if col.endswith('_scaled')]),
-            'normalized_features': len([col for col in df.columns if col.endswith('_normalized')]),
+            'standardized_features': variant_counts.get('scaled', 0),
+            'normalized_features': variant_counts.get('normalized', 0),
             'numerical_columns_processed': len(numerical_features)
         })
         
         return df
     
-    def create_target_encoding(self, df: pd.DataFrame, target_col: str = 'stars') -> pd.DataFrame:
-        """创建目标编码特征"""
+    def create_target_encoding(self, df: pd.DataFrame, target_col: str = 'stars',
+                               n_folds: int = TARGET_ENCODING_FOLDS,
+                               smoothing: float = TARGET_ENCODING_SMOOTHING) -> pd.DataFrame:
+        """
+        创建目标编码特征
+        
+        使用K折袋外估计（每行只看到其他折的目标值）并向全局均值平滑，
+        所有分类列在一次分组计数中完成
+        """
         logger.info(f"创建基于 {target_col} 的目标编码特征...")
         
         if target_col not in df.columns:
             logger.warning(f"目标列 {target_col} 不存在，跳过目标编码")
             return df
         
-        categorical_columns = ['cuisine', 'city', 'region', 'cuisine_type', 'era']
-        
-        for col in categorical_columns:
-            if col in df.columns:
-                # 计算每个类别的目标均值
-                target_mean = df.groupby(col)[target_col].mean()
-                df[f'{col}_target_encoded'] = df[col].map(target_mean)
-                
-                # 计算每个类别的目标标准差
-                target_std = df.groupby(col)[target_col].std().fillna(0)
-                df[f'{col}_target_std'] = df[col].map(target_std)
+        columns = [col for col in TARGET_ENCODING_COLUMNS if col in df.columns]
+        if columns:
+            encoded = out_of_fold_target_encoding(df, columns, target_col, n_folds, smoothing)
+            for col in columns:
+                df[f'{col}_target_encoded'] = encoded[f'{col}_target_encoded']
+                df[f'{col}_target_std'] = encoded[f'{col}_target_std']
         
         self.log_feature_operation("Create target encoding", {
             'target_encoded_features': len([col for col in df.columns if col.endswith('_target_encoded')]),
             'target_column': target_col,
-            'processed_columns': [col for col in categorical_columns if col in df.columns]
+            'processed_columns': [col for col in TARGET_ENCODING_COLUMNS if col in df.columns],
+            'n_folds': n_folds,
+            'smoothing': smoothing
         })
         
         return df
     
-    def process_features(self, df: pd.DataFrame) -> pd.DataFrame:
-        """执行完整的特征工程流程"""
+    def _step_inputs(self, step: Dict) -> List[str]:
+        """获取步骤读取的原始列（聚合步骤由聚合定义决定）"""
+        columns = list(step['inputs'])
+        if step['name'] == 'aggregation':
+            for spec in self.aggregation_specs:
+                columns.extend([spec['key'], spec['column']])
+        return list(dict.fromkeys(columns))
+    
+    def _step_context(self, step: Dict) -> str:
+        """步骤结果依赖的非数据参数，计入缓存键"""
+        if step['name'] == 'temporal':
+            # 年代分组和新鲜度评分基于当前年份
+            return str(datetime.now().year)
+        if step['name'] == 'aggregation':
+            return json.dumps(self.aggregation_specs, sort_keys=True)
+        if step['name'] in ('encoding', 'scaling'):
+            return f"{self.output_mode}:{','.join(sorted(self.feature_variants))}"
+        return ''
+    
+    def _run_step(self, step: Dict, frame: pd.DataFrame) -> Dict[str, Any]:
+        """
+        在独立的特征工程器上执行单个步骤，返回新增列、转换器、稀疏数组和日志
+        
+        frame 为该步骤专用的新表（只含声明的输入列和祖先步骤的输出列），步骤可以直接修改
+        """
+        worker = FeatureEngineer(output_mode=self.output_mode, feature_variants=self.feature_variants)
+        worker.aggregation_specs = self.aggregation_specs
+        input_columns = set(frame.columns)
+        result = getattr(worker, step['method'])(frame)
+        new_columns = [col for col in result.columns if col not in input_columns]
+        return {
+            'columns': result[new_columns],
+            'transformers': worker.feature_transformers,
+            'arrays': worker.feature_arrays,
+            'metadata': worker.feature_metadata,
+            'log': worker.processing_log
+        }
+    
+    def process_features(self, df: pd.DataFrame, use_cache: bool = True, max_workers: Optional[int] = None) -> pd.DataFrame:
+        """
+        执行完整的特征工程流程
+        
+        各步骤按 FEATURE_STEPS 依赖图调度，互不依赖的步骤并行执行；
+        每个步骤的输出按输入列哈希、上游步骤缓存键和代码版本缓存，
+        输入未变化的步骤直接复用缓存
+        
+        Args:
+            df: 地理编码后的餐厅数据
+            use_cache: 是否读写步骤缓存
+            max_workers: 并行线程数，默认为CPU核数（最多4个）
+        
+        Returns:
+            追加了全部特征列的DataFrame，列顺序与步骤声明顺序一致
+        """
         logger.info("开始完整特征工程流程...")
         
         original_shape = df.shape
-        
-        # 1. 创建价格特征
-        df = self.create_price_features(df)
-        
-        # 2. 创建地理特征
-        df = self.create_geographic_features(df)
-        
-        # 3. 创建时间特征
-        df = self.create_temporal_features(df)
-        
-        # 4. 创建菜系特征
-        df = self.create_cuisine_features(df)
-        
-        # 5. 创建文本特征
-        df = self.create_text_features(df)
-        
-        # 6. 创建交互特征
-        df = self.create_interaction_features(df)
-        
-        # 7. 创建聚合特征
-        df = self.create_aggregation_features(df)
-        
-        # 8. 编码分类特征
-        df = self.encode_categorical_features(df)
-        
-        # 9. 标准化数值特征
-        df = self.scale_numerical_features(df)
-        
-        # 10. 创建目标编码
-        df = self.create_target_encoding(df)
+        steps = {step['name']: step for step in FEATURE_STEPS}
+        outputs = {}
+        step_keys = {}
+        cache_hits = []
+        column_hashes = {}
+        
+        def ancestors(name):
+            found = set()
+            for parent in steps[name]['depends_on']:
+                found |= {parent} | ancestors(parent)
+            return found
+        
+        def step_key(name):
+            step = steps[name]
+            inputs = [col for col in self._step_inputs(step) if col in df.columns]
+            for col in inputs:
+                if col not in column_hashes:
+                    column_hashes[col] = hash_column(df[col])
+            key_source = ':'.join([
+                str(FEATURE_CODE_VERSION), name, str(step['version']), self._step_context(step),
+                *[column_hashes[col] for col in inputs], *[step_keys[parent] for parent in step['depends_on']]
+            ])
+            return hashlib.sha256(key_source.encode()).hexdigest()[:24]
+        
+        def step_frame(name):
+            # 只传入步骤声明读取的原始列和祖先步骤的输出列，不复制整张宽表
+            inputs = [col for col in self._step_inputs(steps[name]) if col in df.columns]
+            upstream = [outputs[step['name']]['columns'] for step in FEATURE_STEPS if step['name'] in ancestors(name)]
+            return pd.concat([df[inputs]] + upstream, axis=1)
+        
+        def submit_ready(executor, pending):
+            futures = {}
+            for name in list(pending):
+                if all(parent in outputs for parent in steps[name]['depends_on']):
+                    pending.remove(name)
+                    step_keys[name] = step_key(name)
+                    cached = cache_manager.get_cache(f"feature_step_{name}_{step_keys[name]}") if use_cache else None
+                    if cached is not None:
+                        outputs[name] = cached
+                        cache_hits.append(name)
+                    else:
+                        futures[executor.submit(self._run_step, steps[name], step_frame(name))] = name
+            return futures
+        
+        pending = [step['name'] for step in FEATURE_STEPS]
+        max_workers = max_workers or min(4, os.cpu_count() or 1)
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+            while pending or running:
+                running.update(submit_ready(executor, pending))
+                if not running:
+                    # 所有可执行步骤均命中缓存，继续调度下游步骤
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    outputs[name] = future.result()
+                    if use_cache:
+                        self._store_step_cache(name, step_keys[name], outputs[name])
+        
+        # 按声明顺序合并结果，保证列顺序和日志顺序确定
+        for step in FEATURE_STEPS:
+            self.feature_transformers.update(outputs[step['name']]['transformers'])
+            self.feature_arrays.update(outputs[step['name']]['arrays'])
+            self.feature_metadata.update(outputs[step['name']]['metadata'])
+            self.processing_log.extend(outputs[step['name']]['log'])
+        df = pd.concat([df] + [outputs[step['name']]['columns'] for step in FEATURE_STEPS], axis=1)
         
         final_shape = df.shape
         
@@ -470,11 +649,21 @@ class FeatureEngineer:
             'original_shape': original_shape,
             'final_shape': final_shape,
             'features_added': final_shape[1] - original_shape[1],
-            'total_operations': len(self.processing_log)
+            'total_operations': len(self.processing_log),
+            'cached_steps': cache_hits,
+            'recomputed_steps': [step['name'] for step in FEATURE_STEPS if step['name'] not in cache_hits]
         })
         
         return df
     
+    def _store_step_cache(self, name: str, key: str, output: Dict[str, Any]):
+        """保存步骤缓存，并删除该步骤的旧缓存文件"""
+        cache_key = f"feature_step_{name}_{key}"
+        for stale_file in cache_manager.cache_dir.glob(f"feature_step_{name}_*.pkl"):
+            if stale_file.stem != cache_key:
+                stale_file.unlink()
+        cache_manager.set_cache(cache_key, output)
+    
     def get_feature_importance_analysis(self, df: pd.DataFrame) -> Dict:
         """获取特征重要性分析"""
         logger.info("分析特征重要性...")
@@ -512,8 +701,14 @@ class FeatureEngineer:
         return analysis
 
 
-def main():
-    """主函数：执行特征工程流程"""
+def main(output_mode: str = 'sparse', feature_variants: Optional[List[str]] = None):
+    """
+    主函数：执行特征工程流程
+    
+    Args:
+        output_mode: sparse 保存低内存特征产物（默认），dense 保存包含全部列的DataFrame
+        feature_variants: sparse 模式下额外保存的数值变体（scaled/normalized）
+    """
     logger.info("开始特征工程主流程...")
     
     try:
@@ -528,7 +723,7 @@ def main():
         logger.info(f"加载地理编码数据: {df.shape[0]} 条记录, {df.shape[1]} 个特征")
         
         # 执行特征工程
-        engineer = FeatureEngineer()
+        engineer = FeatureEngineer(output_mode=output_mode, feature_variants=feature_variants)
         enhanced_df = engineer.process_features(df)
         
         # 分析特征重要性
@@ -536,14 +731,30 @@ def main():
         
         # 保存增强后的数据
         features_path = path_manager.get_processed_data_path("features.joblib")
-        joblib.dump(enhanced_df, features_path)
+        if output_mode == 'sparse':
+            feature_bundle = build_feature_bundle(engineer, enhanced_df)
+            joblib.dump(feature_bundle, features_path, compress=3)
+            
+            # 列元数据单独保存，读取列信息时无需加载特征数据
+            columns_path = path_manager.get_processed_data_path("feature_columns.json")
+            with open(columns_path, 'w', encoding='utf-8') as f:
+                json.dump(feature_bundle['columns'], f, indent=2, ensure_ascii=False)
+            logger.info(f"特征列元数据已保存: {columns_path}")
+        else:
+            joblib.dump(enhanced_df, features_path)
         logger.info(f"特征数据已保存: {features_path}")
         
         # 保存特征转换器
         transformers_path = path_manager.get_processed_data_path("transformers.joblib")
         joblib.dump(engineer.feature_transformers, transformers_path)
         logger.info(f"特征转换器已保存: {transformers_path}")
-        
+
+        # 保存在线特征转换器（记录全部拟合统计量，供后端为新餐厅计算特征）
+        feature_transform = FeatureTransform().fit(df, engineer.aggregation_specs)
+        feature_transform_path = path_manager.get_processed_data_path("feature_transform.joblib")
+        joblib.dump(feature_transform, feature_transform_path)
+        logger.info(f"在线特征转换器已保存: {feature_transform_path} ({len(feature_transform.feature_columns)} 个特征)")
+
         # 保存特征工程报告
         report = {
             'processing_log': engineer.processing_log,
@@ -551,7 +762,6 @@ def main():
             'transformers_info': {name: str(type(transformer)) for name, transformer in engineer.feature_transformers.items()}
         }
         
-        import json
         report_path = path_manager.get_processed_data_path("feature_engineering_report.json")
         with open(report_path, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False, default=str)
@@ -559,7 +769,7 @@ def main():
         logger.info(f"特征工程报告已保存: {report_path}")
         
         # 缓存数据
-        cache_manager.set_cache("enhanced_features", enhanced_df)
+        cache_manager.set_cache("enhanced_features", feature_bundle if output_mode == 'sparse' else enhanced_df)
         cache_manager.set_cache("feature_transformers", engineer.feature_transformers)
         cache_manager.set_cache("feature_analysis", feature_analysis)
         
@@ -576,4 +786,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='米其林餐厅特征工程')
+    parser.add_argument('--output-mode', choices=OUTPUT_MODES, default='sparse', help='特征产物输出模式')
+    parser.add_argument('--variants', default='', help='sparse模式下保存的数值变体，逗号分隔: scaled,normalized')
+    args = parser.parse_args()
+    
+    main(args.output_mode, [variant for variant in args.variants.split(',') if variant]) 
\ No newline at end of file
@@ -0,0 +1,675 @@
+"""
+特征转换模块
+定义特征工程共用的规则和向量化函数，并提供可序列化的拟合转换器：
+在训练数据上一次性记录全部统计量，之后无需完整数据集即可为单条或批量新餐厅计算特征
+
+本模块只依赖 pandas / numpy（拟合时使用 scikit-learn），后端可直接导入
+"""
+
+import re
+import math
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, List, Tuple, Optional, Any
+
+import numpy as np
+import pandas as pd
+
+# 菜系分类表
+ASIAN_CUISINES = ['Japanese', 'Chinese', 'Thai', 'Korean', 'Asian', 'Cantonese',
+                  'Sushi', 'Teppanyaki', 'Shanghainese', 'Sichuan']
+EUROPEAN_CUISINES = ['French', 'Italian', 'Spanish', 'British', 'European']
+MODERN_CUISINES = ['Modern', 'Contemporary', 'Creative', 'Innovative', 'Fusion']
+
+# 名称语言特征检测的字符集（按优先级排列）
+NAME_STYLE_PATTERNS = [
+    ('European', r'[àáâãäåæçèéêëìíîïñòóôõöøùúûüý]'),
+    ('Asian', r'[亜-熹一-龯]'),
+    ('Cyrillic', r'[а-я]')
+]
+
+SPECIAL_KEYWORDS = ['royal', 'grand', 'palace', 'house', 'manor', 'castle']
+FAMOUS_FOOD_CITIES = ['paris', 'tokyo', 'new york', 'london', 'hong kong',
+                      'singapore', 'barcelona', 'copenhagen', 'bangkok']
+
+PRICE_CATEGORIES = ['Budget', 'Moderate', 'Expensive', 'Very Expensive', 'Luxury']
+DENSITY_LEVELS = ['Low Density', 'Medium Density', 'High Density', 'Very High Density']
+
+# 分箱定义
+LATITUDE_BINS = [-90, -60, -30, 0, 30, 60, 90]
+LATITUDE_BANDS = ['Antarctic', 'South Temperate', 'South Subtropical',
+                  'Equatorial', 'North Subtropical', 'North Temperate']
+LONGITUDE_BINS = [-180, -120, -60, 0, 60, 120, 180]
+LONGITUDE_BANDS = ['Far West', 'West', 'West Central', 'East Central', 'East', 'Far East']
+ERA_LABELS = ['Historic', 'Early Modern', 'Recent', 'Current']
+
+# 聚合特征定义：按 key 分组后对 column 计算 functions，结果列默认命名为 {key}_{column}_{function}
+DEFAULT_AGGREGATION_SPECS = [
+    {'key': 'city', 'column': 'stars', 'functions': ['mean', 'std', 'count']},
+    {'key': 'city', 'column': 'price_numeric', 'functions': ['mean', 'std']},
+    {'key': 'city', 'column': 'years_since_award', 'functions': ['mean', 'min', 'max']},
+    {'key': 'cuisine', 'column': 'stars', 'functions': ['mean', 'count']},
+    {'key': 'cuisine', 'column': 'price_numeric', 'functions': ['mean']},
+    {'key': 'year', 'column': 'stars', 'functions': ['count'], 'names': ['year_total_awards']}
+]
+
+CATEGORICAL_COLUMNS = [
+    'cuisine', 'city', 'region', 'price_category', 'cuisine_type',
+    'era', 'latitude_band', 'longitude_band', 'density_level',
+    'name_style', 'hemisphere', 'continent', 'climate_zone'
+]
+# 取值数不超过该阈值的分类列做独热编码
+ONE_HOT_MAX_CARDINALITY = 10
+
+NUMERICAL_COLUMNS = [
+    'latitude', 'longitude', 'year', 'stars', 'price_numeric',
+    'years_since_award', 'name_length', 'name_word_count',
+    'distance_to_ny', 'city_restaurant_density', 'price_star_ratio',
+    'value_score', 'price_percentile', 'freshness_score',
+    'cuisine_popularity', 'name_complexity', 'city_name_length'
+]
+
+TARGET_ENCODING_COLUMNS = ['cuisine', 'city', 'region', 'cuisine_type', 'era']
+
+# 目标编码：K折袋外估计的折数，以及向全局均值收缩的平滑强度（等效样本数）
+TARGET_ENCODING_FOLDS = 5
+TARGET_ENCODING_SMOOTHING = 10.0
+
+
+def era_bins(current_year: int) -> List[int]:
+    """年代分组边界（左闭右开）"""
+    return [1900, 2010, 2015, 2020, current_year + 1]
+
+
+def map_unique_values(series: pd.Series, func) -> np.ndarray:
+    """
+    只对去重后的取值计算映射，再按编码回填到每一行
+
+    Args:
+        series: 输入列
+        func: 接收去重取值Series、返回等长数组的向量化函数
+
+    Returns:
+        与输入等长的结果数组
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    return np.asarray(func(pd.Series(uniques, dtype=object)))[codes]
+
+
+def price_category(price_numeric: pd.Series) -> np.ndarray:
+    """价格分档（右闭区间，缺失值排在最后归入最高档，与逐行比较的结果一致）"""
+    labels = np.array(PRICE_CATEGORIES, dtype=object)
+    return labels[np.searchsorted([1, 2, 3, 4], price_numeric.to_numpy(dtype=float), side='left')]
+
+
+def density_level(density: pd.Series, quantiles: pd.Series) -> np.ndarray:
+    """按四分位数划分城市餐厅密度等级"""
+    labels = np.array(DENSITY_LEVELS, dtype=object)
+    bins = np.array([quantiles[0.25], quantiles[0.5], quantiles[0.75]], dtype=float)
+    if np.isnan(bins).any():
+        # 全部缺失时分位数为NaN，逐行比较全部不成立
+        return np.full(len(density), labels[-1], dtype=object)
+    return labels[np.searchsorted(bins, density.to_numpy(dtype=float), side='left')]
+
+
+def classify_cuisine_type(cuisine: pd.Series) -> np.ndarray:
+    """菜系分类（只对去重后的菜系取值做查找）"""
+    return map_unique_values(cuisine, lambda cuisines: np.select(
+        [cuisines.isin(ASIAN_CUISINES), cuisines.isin(EUROPEAN_CUISINES), cuisines.isin(MODERN_CUISINES)],
+        ['Asian', 'European', 'Modern'],
+        default='Other'
+    ).astype(object))
+
+
+def name_complexity(names: pd.Series) -> np.ndarray:
+    """名称复杂度：大写字母与数字的个数"""
+    return map_unique_values(names.astype(str), lambda unique_names: unique_names.str.count(r'[A-Z0-9]'))
+
+
+def detect_name_style(names: pd.Series) -> np.ndarray:
+    """名称语言特征（简单检测，按字符集优先级匹配）"""
+    def classify(unique_names):
+        lowered = unique_names.str.lower()
+        return np.select(
+            [lowered.str.contains(pattern, regex=True) for _, pattern in NAME_STYLE_PATTERNS],
+            [style for style, _ in NAME_STYLE_PATTERNS],
+            default='English'
+        ).astype(object)
+
+    return map_unique_values(names.astype(str), classify)
+
+
+def factorize_columns(df: pd.DataFrame, columns: List[str]) -> Tuple[np.ndarray, List[np.ndarray], np.ndarray]:
+    """
+    将多个分类列编码到同一个分组编号空间
+
+    Args:
+        df: 数据
+        columns: 分类列
+
+    Returns:
+        (形状为 (行数, 列数) 的全局分组编号矩阵（缺失为-1）, 每列的取值数组, 每列的编号偏移)
+    """
+    codes = np.empty((len(df), len(columns)), dtype=np.int64)
+    uniques, offsets = [], np.zeros(len(columns), dtype=np.int64)
+    offset = 0
+    for i, col in enumerate(columns):
+        column_codes, column_uniques = pd.factorize(df[col])
+        codes[:, i] = np.where(column_codes >= 0, column_codes + offset, -1)
+        uniques.append(np.asarray(column_uniques, dtype=object))
+        offsets[i] = offset
+        offset += len(column_uniques)
+    return codes, uniques, offsets
+
+
+def grouped_target_sums(codes: np.ndarray, target: np.ndarray, n_groups: int,
+                        folds: Optional[np.ndarray] = None, n_folds: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    一次 np.bincount 计算每个（折, 分组）的目标计数、和与平方和
+
+    Returns:
+        三个形状为 (折数, 分组数) 的数组
+    """
+    valid = (codes >= 0) & ~np.isnan(target)[:, None]
+    keys = codes if folds is None else codes + folds[:, None] * n_groups
+    keys = keys[valid]
+    values = np.broadcast_to(target[:, None], codes.shape)[valid]
+    size = n_folds * n_groups
+    counts = np.bincount(keys, minlength=size).reshape(n_folds, n_groups).astype(float)
+    sums = np.bincount(keys, weights=values, minlength=size).reshape(n_folds, n_groups)
+    sum_squares = np.bincount(keys, weights=values * values, minlength=size).reshape(n_folds, n_groups)
+    return counts, sums, sum_squares
+
+
+def smoothed_target_statistics(counts: np.ndarray, sums: np.ndarray, sum_squares: np.ndarray,
+                               prior: np.ndarray, smoothing: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由分组计数和与平方和计算平滑目标均值和样本标准差
+
+    均值按 (和 + smoothing * 先验) / (计数 + smoothing) 向先验收缩，样本数不足2的分组标准差为0
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (sums + smoothing * prior) / (counts + smoothing)
+        variance = (sum_squares - sums * sums / counts) / (counts - 1)
+    stds = np.where(counts >= 2, np.sqrt(np.clip(variance, 0, None)), 0.0)
+    return means, stds
+
+
+def out_of_fold_target_encoding(df: pd.DataFrame, columns: List[str], target_col: str = 'stars',
+                                n_folds: int = TARGET_ENCODING_FOLDS, smoothing: float = TARGET_ENCODING_SMOOTHING,
+                                random_state: int = 42) -> pd.DataFrame:
+    """
+    K折袋外目标编码：每行的编码只使用其他折的目标值，避免目标泄漏
+
+    所有分类列编码到同一分组编号空间，对（折, 分组）键只做一次 np.bincount，
+    用全量统计减去本折统计得到袋外统计
+
+    Args:
+        df: 数据
+        columns: 需要目标编码的分类列
+        target_col: 目标列
+        n_folds: 折数，行数不足时自动减少
+        smoothing: 向袋外全局均值收缩的平滑强度
+        random_state: 折划分的随机种子
+
+    Returns:
+        包含 {col}_target_encoded 和 {col}_target_std 列的DataFrame
+    """
+    n_rows = len(df)
+    target = pd.to_numeric(df[target_col], errors='coerce').to_numpy(dtype=float)
+    codes, uniques, _ = factorize_columns(df, columns)
+    n_groups = sum(len(values) for values in uniques)
+    n_folds = max(1, min(n_folds, n_rows))
+    folds = np.random.default_rng(random_state).permutation(n_rows) % n_folds
+
+    counts, sums, sum_squares = grouped_target_sums(codes, target, n_groups, folds, n_folds)
+    if n_folds > 1:
+        # 袋外统计 = 全量统计 - 本折统计
+        counts, sums, sum_squares = (total.sum(axis=0) - total for total in (counts, sums, sum_squares))
+
+    valid_target = ~np.isnan(target)
+    fold_counts = np.bincount(folds[valid_target], minlength=n_folds).astype(float)
+    fold_sums = np.bincount(folds[valid_target], weights=target[valid_target], minlength=n_folds)
+    if n_folds > 1:
+        fold_counts, fold_sums = fold_counts.sum() - fold_counts, fold_sums.sum() - fold_sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prior = fold_sums / fold_counts
+    means, stds = smoothed_target_statistics(counts, sums, sum_squares, prior[:, None], smoothing)
+
+    row_folds = np.broadcast_to(folds[:, None], codes.shape)
+    safe_codes = np.where(codes >= 0, codes, 0)
+    encoded = np.where(codes >= 0, means[row_folds, safe_codes], np.nan)
+    encoded_std = np.where(codes >= 0, stds[row_folds, safe_codes], np.nan)
+
+    result = {}
+    for i, col in enumerate(columns):
+        result[f'{col}_target_encoded'] = encoded[:, i]
+        result[f'{col}_target_std'] = encoded_std[:, i]
+    return pd.DataFrame(result, index=df.index)
+
+
+# ---- 单条记录使用的纯Python规则 ----
+
+_NAME_STYLE_REGEXES = [(style, re.compile(pattern)) for style, pattern in NAME_STYLE_PATTERNS]
+_SPECIAL_KEYWORD_REGEX = re.compile('|'.join(SPECIAL_KEYWORDS))
+_COMPLEXITY_REGEX = re.compile(r'[A-Z0-9]')
+_ASIAN_SET, _EUROPEAN_SET, _MODERN_SET = set(ASIAN_CUISINES), set(EUROPEAN_CUISINES), set(MODERN_CUISINES)
+_FAMOUS_CITY_SET = set(FAMOUS_FOOD_CITIES)
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _string_values(values: pd.Series) -> pd.Series:
+    """非字符串取值置为缺失，使 .str 访问器对任意输入可用（与单条记录路径的 isinstance(value, str) 判断一致）"""
+    return values.astype(object).where(values.map(lambda value: isinstance(value, str)))
+
+
+def _label_values(values: pd.Series) -> pd.Series:
+    """标签编码使用的字符串取值；缺失值（None或NaN）统一为 'nan'，与从CSV读取的训练数据及单条记录路径一致"""
+    return values.astype(object).where(values.notna(), 'nan').astype(str)
+
+
+def _as_float(value) -> float:
+    if _is_missing(value):
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _cut_label(value: float, bins: List[float], labels: List[str], right: bool = True) -> Optional[str]:
+    """与 pd.cut 相同的单值分箱"""
+    if math.isnan(value):
+        return None
+    if right:
+        if value <= bins[0] or value > bins[-1]:
+            return None
+        return labels[bisect_left(bins, value) - 1]
+    if value < bins[0] or value >= bins[-1]:
+        return None
+    return labels[bisect_right(bins, value) - 1]
+
+
+def _cut_series(values: pd.Series, bins: List[float], labels: List[str], right: bool = True) -> pd.Categorical:
+    return pd.cut(values, bins=bins, labels=labels, right=right)
+
+
+class FeatureTransform:
+    """
+    拟合后的特征转换器
+
+    功能：
+    1. fit 时记录价格分位、密度分位、分组均值/计数、标签编码、独热类别、标准化参数和目标编码
+    2. transform 批量计算特征（向量化），transform_record 计算单条记录（纯Python字典查找）
+    3. 在训练数据上，除目标编码列（*_target_encoded / *_target_std）外的结果与 FeatureEngineer 的稠密输出一致；
+       FeatureEngineer 对训练数据使用折外目标编码，而 fit 保存的是全量数据上的平滑统计量，用于新记录
+    """
+
+    def __init__(self):
+        self.fitted = False
+        self.feature_columns = []
+
+    def fit(self, df: pd.DataFrame, aggregation_specs: Optional[List[Dict]] = None,
+            target_col: str = 'stars', current_year: Optional[int] = None,
+            smoothing: float = TARGET_ENCODING_SMOOTHING) -> 'FeatureTransform':
+        """
+        在训练数据（地理编码后的餐厅表）上拟合全部统计量
+
+        Args:
+            df: 训练数据
+            aggregation_specs: 聚合特征定义，默认 DEFAULT_AGGREGATION_SPECS
+            target_col: 目标编码使用的目标列
+            current_year: 计算年代和新鲜度的参考年份，默认当前年份
+            smoothing: 目标编码的平滑强度
+
+        Returns:
+            self
+        """
+        from sklearn.preprocessing import StandardScaler, MinMaxScaler
+
+        self.current_year = current_year or datetime.now().year
+        self.target_col = target_col
+        self.input_columns = list(df.columns)
+
+        # 价格分位：排序后的训练价格，按平均秩计算百分位
+        if 'price_numeric' in df.columns:
+            self.price_sorted = np.sort(df['price_numeric'].dropna().to_numpy(dtype=float))
+            self._price_list = self.price_sorted.tolist()
+
+        # 密度分位与城市密度（新餐厅未提供密度时按城市回填）
+        if 'city_restaurant_density' in df.columns:
+            quantiles = df['city_restaurant_density'].quantile([0.25, 0.5, 0.75])
+            self.density_quantiles = {q: float(quantiles[q]) for q in (0.25, 0.5, 0.75)}
+            if 'city' in df.columns:
+                self.city_density = df.groupby('city')['city_restaurant_density'].first().to_dict()
+
+        if 'year' in df.columns and 'stars' in df.columns:
+            self.year_avg_stars = df.groupby('year')['stars'].mean().to_dict()
+
+        if 'cuisine' in df.columns:
+            self.cuisine_counts = df['cuisine'].value_counts().to_dict()
+            if 'stars' in df.columns:
+                self.cuisine_avg_stars = df.groupby('cuisine')['stars'].mean().to_dict()
+
+        # 聚合特征：每个结果列对应一个 分组键 -> 取值 的映射
+        self.aggregations = []
+        for spec in (aggregation_specs if aggregation_specs is not None else DEFAULT_AGGREGATION_SPECS):
+            key, column = spec['key'], spec['column']
+            if key not in df.columns or column not in df.columns:
+                continue
+            names = spec.get('names') or [f"{key}_{column}_{func}" for func in spec['functions']]
+            grouped = df.groupby(key)[column]
+            for func, name in zip(spec['functions'], names):
+                self.aggregations.append((name, key, grouped.agg(func).round(spec.get('round', 2)).to_dict()))
+
+        self.fitted = True
+        base = self._base_features(df)
+
+        # 标签编码与独热类别
+        self.label_classes = {}
+        self.one_hot_categories = {}
+        for col in CATEGORICAL_COLUMNS:
+            if col not in base.columns:
+                continue
+            classes = np.unique(_label_values(base[col]))
+            self.label_classes[col] = {value: index for index, value in enumerate(classes)}
+            if base[col].nunique() <= ONE_HOT_MAX_CARDINALITY:
+                if pd.api.types.is_categorical_dtype(base[col]):
+                    self.one_hot_categories[col] = list(base[col].cat.categories)
+                else:
+                    self.one_hot_categories[col] = sorted(base[col].dropna().unique())
+
+        # 标准化参数
+        self.numerical_features = [col for col in NUMERICAL_COLUMNS if col in base.columns]
+        if self.numerical_features:
+            standard_scaler = StandardScaler().fit(base[self.numerical_features])
+            minmax_scaler = MinMaxScaler().fit(base[self.numerical_features])
+            self.scaler_mean = standard_scaler.mean_
+            self.scaler_scale = standard_scaler.scale_
+            self.minmax_scale = minmax_scaler.scale_
+            self.minmax_min = minmax_scaler.min_
+            # 单条记录路径使用Python浮点数，避免逐元素访问numpy数组的开销
+            self._record_scaling = [
+                (col, float(mean), float(scale), float(mm_scale), float(mm_min))
+                for col, mean, scale, mm_scale, mm_min in zip(
+                    self.numerical_features, self.scaler_mean, self.scaler_scale, self.minmax_scale, self.minmax_min)
+            ]
+
+        # 目标编码：在线计算时使用全量数据的平滑统计（训练特征为袋外编码），未见过的类别取全局均值
+        self.target_encodings = {}
+        if target_col in base.columns:
+            columns = [col for col in TARGET_ENCODING_COLUMNS if col in base.columns]
+            target = pd.to_numeric(base[target_col], errors='coerce').to_numpy(dtype=float)
+            codes, uniques, offsets = factorize_columns(base, columns)
+            self.target_prior = float(np.nanmean(target)) if (~np.isnan(target)).any() else math.nan
+            counts, sums, sum_squares = grouped_target_sums(codes, target, sum(len(values) for values in uniques))
+            means, stds = smoothed_target_statistics(counts[0], sums[0], sum_squares[0], self.target_prior, smoothing)
+            for col, values, offset in zip(columns, uniques, offsets):
+                keys = [str(value) for value in values]
+                self.target_encodings[col] = (
+                    dict(zip(keys, means[offset:offset + len(values)].tolist())),
+                    dict(zip(keys, stds[offset:offset + len(values)].tolist()))
+                )
+
+        self.feature_columns = list(self.transform(df.head(0)).columns)
+        return self
+
+    def _base_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """计算编码和标准化之前的派生特征（价格、地理、时间、菜系、文本、交互和聚合）"""
+        n = len(df)
+
+        def column(name):
+            if name in df.columns:
+                return df[name]
+            return pd.Series([np.nan] * n, index=df.index, dtype=object)
+
+        out = pd.DataFrame(index=df.index)
+        for name in self.input_columns:
+            out[name] = column(name)
+
+        stars = pd.to_numeric(column('stars'), errors='coerce')
+
+        # 价格特征
+        if hasattr(self, 'price_sorted'):
+            price = pd.to_numeric(column('price_numeric'), errors='coerce')
+            out['price_category'] = price_category(price)
+            out['price_star_ratio'] = price / stars
+            out['value_score'] = stars / (price + 1)
+            values = price.to_numpy(dtype=float)
+            left = np.searchsorted(self.price_sorted, values, side='left')
+            right = np.searchsorted(self.price_sorted, values, side='right')
+            percentile = (left + (right - left + 1) / 2) / len(self.price_sorted) * 100
+            out['price_percentile'] = np.where(np.isnan(values), np.nan, percentile)
+
+        # 地理特征
+        out['latitude_band'] = _cut_series(pd.to_numeric(column('latitude'), errors='coerce'), LATITUDE_BINS, LATITUDE_BANDS)
+        out['longitude_band'] = _cut_series(pd.to_numeric(column('longitude'), errors='coerce'), LONGITUDE_BINS, LONGITUDE_BANDS)
+        if hasattr(self, 'density_quantiles'):
+            density = pd.to_numeric(column('city_restaurant_density'), errors='coerce')
+            if hasattr(self, 'city_density'):
+                density = density.fillna(column('city').map(self.city_density))
+                out['city_restaurant_density'] = density
+            out['density_level'] = density_level(density, pd.Series(self.density_quantiles))
+
+        # 时间特征
+        year = pd.to_numeric(column('year'), errors='coerce')
+        out['era'] = _cut_series(year, era_bins(self.current_year), ERA_LABELS, right=False)
+        out['freshness_score'] = np.exp(-(self.current_year - year) / 5)
+        if hasattr(self, 'year_avg_stars'):
+            out['year_avg_stars'] = year.map(self.year_avg_stars)
+            out['above_year_avg'] = stars > out['year_avg_stars']
+
+        # 菜系特征（训练集中未出现的菜系流行度为0，菜系缺失时与训练特征一样为缺失值）
+        if hasattr(self, 'cuisine_counts'):
+            cuisine = column('cuisine')
+            popularity = cuisine.map(self.cuisine_counts)
+            out['cuisine_popularity'] = popularity.where(popularity.notna() | cuisine.isna(), 0)
+            out['cuisine_type'] = classify_cuisine_type(cuisine)
+            if hasattr(self, 'cuisine_avg_stars'):
+                out['cuisine_avg_stars'] = cuisine.map(self.cuisine_avg_stars)
+                out['above_cuisine_avg'] = stars > out['cuisine_avg_stars']
+            out['rare_cuisine'] = out['cuisine_popularity'] <= 3
+
+        # 文本特征
+        if 'name' in self.input_columns:
+            names = column('name')
+            out['name_complexity'] = name_complexity(names)
+            out['has_special_keyword'] = _string_values(names).str.lower().str.contains('|'.join(SPECIAL_KEYWORDS), na=False)
+            out['name_style'] = detect_name_style(names)
+        if 'city' in self.input_columns:
+            city = column('city')
+            out['city_name_length'] = city.astype(str).str.len()
+            out['famous_food_city'] = _string_values(city).str.lower().isin(FAMOUS_FOOD_CITIES)
+
+        # 交互特征
+        if 'cuisine_type' in out.columns:
+            out['stars_cuisine_interaction'] = column('stars').astype(str) + '_' + out['cuisine_type']
+        if 'price_category' in out.columns and 'continent' in self.input_columns:
+            out['price_continent_interaction'] = out['price_category'] + '_' + column('continent')
+        out['era_stars_interaction'] = out['era'].astype(str) + '_' + column('stars').astype(str) + 'star'
+
+        # 聚合特征
+        for name, key, mapping in self.aggregations:
+            out[name] = column(key).map(mapping)
+
+        return out
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        批量计算特征
+
+        Args:
+            df: 与训练数据结构相同的餐厅表，缺失的输入列按缺失值处理
+
+        Returns:
+            只包含特征列的DataFrame，列顺序与 FeatureEngineer 的稠密输出一致
+        """
+        if not self.fitted:
+            raise RuntimeError("FeatureTransform 尚未拟合")
+
+        base = self._base_features(df)
+        features = base.drop(columns=self.input_columns + ['city_restaurant_density'], errors='ignore')
+
+        extra = {}
+        for col, classes in self.label_classes.items():
+            extra[f'{col}_encoded'] = _label_values(base[col]).map(classes).fillna(-1).astype(int)
+        for col, categories in self.one_hot_categories.items():
+            values = base[col].astype(object)
+            for category in categories:
+                extra[f'{col}_{category}'] = (values == category).astype(np.uint8)
+
+        if self.numerical_features:
+            # 输入列可能含无法解析的取值（如 year: "abc"），与单条记录路径一样按缺失值处理
+            X = base[self.numerical_features].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+            scaled = (X - self.scaler_mean) / self.scaler_scale
+            normalized = X * self.minmax_scale + self.minmax_min
+            for i, col in enumerate(self.numerical_features):
+                extra[f'{col}_scaled'] = scaled[:, i]
+            for i, col in enumerate(self.numerical_features):
+                extra[f'{col}_normalized'] = normalized[:, i]
+
+        for col, (means, stds) in self.target_encodings.items():
+            present = base[col].notna()
+            keys = base[col].astype(object).where(present).astype(str)
+            extra[f'{col}_target_encoded'] = keys.map(means).astype(float).where(~present | keys.isin(means), self.target_prior)
+            extra[f'{col}_target_std'] = keys.map(stds).astype(float).where(~present | keys.isin(stds), 0.0)
+
+        return pd.concat([features, pd.DataFrame(extra, index=df.index)], axis=1)
+
+    def transform_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        计算单条记录的特征（纯Python实现，无pandas开销）
+
+        Args:
+            record: 餐厅字段字典
+
+        Returns:
+            特征名到取值的字典，键与 feature_columns 一致
+        """
+        if not self.fitted:
+            raise RuntimeError("FeatureTransform 尚未拟合")
+
+        out = {}
+        raw_stars = record.get('stars')
+        stars = _as_float(raw_stars)
+
+        # 价格特征
+        if hasattr(self, 'price_sorted'):
+            price = _as_float(record.get('price_numeric'))
+            out['price_category'] = PRICE_CATEGORIES[bisect_left([1, 2, 3, 4], price)] if not math.isnan(price) else 'Luxury'
+            out['price_star_ratio'] = price / stars if stars else (math.nan if math.isnan(price) or price == 0 else math.copysign(math.inf, price))
+            out['value_score'] = stars / (price + 1) if price != -1 else math.nan
+            if math.isnan(price):
+                out['price_percentile'] = math.nan
+            else:
+                left = bisect_left(self._price_list, price)
+                right = bisect_right(self._price_list, price)
+                out['price_percentile'] = (left + (right - left + 1) / 2) / len(self._price_list) * 100
+
+        # 地理特征
+        out['latitude_band'] = _cut_label(_as_float(record.get('latitude')), LATITUDE_BINS, LATITUDE_BANDS)
+        out['longitude_band'] = _cut_label(_as_float(record.get('longitude')), LONGITUDE_BINS, LONGITUDE_BANDS)
+        density = _as_float(record.get('city_restaurant_density'))
+        if hasattr(self, 'density_quantiles'):
+            if math.isnan(density) and hasattr(self, 'city_density'):
+                density = _as_float(self.city_density.get(record.get('city')))
+            quantiles = self.density_quantiles
+            if math.isnan(quantiles[0.25]):
+                out['density_level'] = DENSITY_LEVELS[-1]
+            else:
+                out['density_level'] = DENSITY_LEVELS[bisect_left([quantiles[0.25], quantiles[0.5], quantiles[0.75]], density)
+                                                      if not math.isnan(density) else -1]
+
+        # 时间特征
+        year = _as_float(record.get('year'))
+        out['era'] = _cut_label(year, era_bins(self.current_year), ERA_LABELS, right=False)
+        out['freshness_score'] = math.exp(-(self.current_year - year) / 5) if not math.isnan(year) else math.nan
+        if hasattr(self, 'year_avg_stars'):
+            year_avg = self.year_avg_stars.get(int(year) if not math.isnan(year) and year.is_integer() else year, math.nan)
+            out['year_avg_stars'] = year_avg
+            out['above_year_avg'] = bool(stars > year_avg)
+
+        # 菜系特征
+        cuisine = record.get('cuisine')
+        if hasattr(self, 'cuisine_counts'):
+            out['cuisine_popularity'] = math.nan if _is_missing(cuisine) else self.cuisine_counts.get(cuisine, 0)
+            out['cuisine_type'] = ('Asian' if cuisine in _ASIAN_SET else 'European' if cuisine in _EUROPEAN_SET
+                                   else 'Modern' if cuisine in _MODERN_SET else 'Other')
+            if hasattr(self, 'cuisine_avg_stars'):
+                cuisine_avg = self.cuisine_avg_stars.get(cuisine, math.nan)
+                out['cuisine_avg_stars'] = cuisine_avg
+                out['above_cuisine_avg'] = bool(stars > cuisine_avg)
+            out['rare_cuisine'] = out['cuisine_popularity'] <= 3
+
+        # 文本特征
+        if 'name' in self.input_columns:
+            name = record.get('name')
+            name_text = str(name) if not _is_missing(name) else 'nan'
+            out['name_complexity'] = len(_COMPLEXITY_REGEX.findall(name_text))
+            out['has_special_keyword'] = (isinstance(name, str) and
+                                          _SPECIAL_KEYWORD_REGEX.search(name.lower()) is not None)
+            lowered = name_text.lower()
+            out['name_style'] = next((style for style, regex in _NAME_STYLE_REGEXES if regex.search(lowered)), 'English')
+        city = record.get('city')
+        if 'city' in self.input_columns:
+            out['city_name_length'] = len(str(city)) if not _is_missing(city) else 3
+            out['famous_food_city'] = isinstance(city, str) and city.lower() in _FAMOUS_CITY_SET
+
+        # 交互特征
+        stars_text = str(raw_stars) if not _is_missing(raw_stars) else 'nan'
+        if 'cuisine_type' in out:
+            out['stars_cuisine_interaction'] = f"{stars_text}_{out['cuisine_type']}"
+        if 'price_category' in out and 'continent' in self.input_columns:
+            continent = record.get('continent')
+            out['price_continent_interaction'] = (math.nan if _is_missing(continent)
+                                                  else f"{out['price_category']}_{continent}")
+        out['era_stars_interaction'] = f"{out['era'] if out['era'] is not None else 'nan'}_{stars_text}star"
+
+        # 聚合特征
+        for name, key, mapping in self.aggregations:
+            out[name] = mapping.get(record.get(key), math.nan)
+
+        # 编码特征
+        def categorical_value(col):
+            return out[col] if col in out else record.get(col)
+
+        for col, classes in self.label_classes.items():
+            value = categorical_value(col)
+            out[f'{col}_encoded'] = classes.get(str(value) if not _is_missing(value) else 'nan', -1)
+        for col, categories in self.one_hot_categories.items():
+            value = categorical_value(col)
+            for category in categories:
+                out[f'{col}_{category}'] = int(value == category)
+
+        # 标准化特征
+        if self.numerical_features:
+            numeric_values = {'city_restaurant_density': density}
+            values = [_as_float(out[col]) if col in out else
+                      numeric_values.get(col, _as_float(record.get(col))) for col in self.numerical_features]
+            for value, (col, mean, scale, _, _) in zip(values, self._record_scaling):
+                out[f'{col}_scaled'] = (value - mean) / scale
+            for value, (col, _, _, mm_scale, mm_min) in zip(values, self._record_scaling):
+                out[f'{col}_normalized'] = value * mm_scale + mm_min
+
+        # 目标编码
+        for col, (means, stds) in self.target_encodings.items():
+            value = categorical_value(col)
+            if _is_missing(value):
+                out[f'{col}_target_encoded'] = out[f'{col}_target_std'] = math.nan
+            else:
+                out[f'{col}_target_encoded'] = means.get(str(value), self.target_prior)
+                out[f'{col}_target_std'] = stds.get(str(value), 0.0)
+
+        return {col: out.get(col, math.nan) for col in self.feature_columns}
+
+    def get_info(self) -> Dict[str, Any]:
+        """获取转换器摘要信息"""
+        return {
+            'fitted': self.fitted,
+            'n_features': len(self.feature_columns),
+            'reference_year': getattr(self, 'current_year', None),
+            'input_columns': getattr(self, 'input_columns', [])
+        }
@@ -0,0 +1,486 @@
+"""
+时间序列预测模块
+按年份统计各地区、城市、菜系及星级的获奖餐厅数量，
+在 年份×分组 的计数矩阵上以矩阵形式批量拟合线性趋势和Holt指数平滑模型，
+为所有序列同时生成未来若干年的预测
+"""
+
+import os
+import json
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from utils import logger, path_manager, cache_manager
+
+# 预测年数
+FORECAST_YEARS = 5
+
+# 分组维度 -> 数据列；overall 为全部餐厅的单一序列
+FORECAST_GROUPS = {
+    'overall': None,
+    'stars': 'stars',
+    'region': 'region',
+    'city': 'city',
+    'cuisine': 'cuisine'
+}
+
+# 模型编码，保存在 forecast_models.joblib 中
+MODEL_NAMES = ['naive', 'linear_trend', 'holt']
+NAIVE, LINEAR_TREND, HOLT = range(len(MODEL_NAMES))
+
+# Holt指数平滑的参数网格，每个序列独立选择一步预测误差最小的组合
+HOLT_ALPHAS = np.linspace(0.1, 0.9, 9)
+HOLT_BETAS = np.linspace(0.05, 0.5, 10)
+
+# 预测区间使用的正态分位数（95%）
+INTERVAL_Z = 1.96
+
+# 序列数超过该值时按列分块并行拟合，否则进程开销大于收益
+PARALLEL_MIN_SERIES = 5000
+
+# 增长率超过该比例视为上升/下降趋势
+TREND_THRESHOLD = 0.05
+
+
+def build_count_matrix(df: pd.DataFrame, column: Optional[str], years: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    """
+    构建 年份×分组 的获奖数量矩阵
+
+    Args:
+        df: 餐厅数据，需包含 year 列
+        column: 分组列，为None时所有餐厅作为单一序列
+        years: 连续的年份数组，缺失年份计数为0
+
+    Returns:
+        (计数矩阵 shape=(年份数, 分组数), 分组键列表)
+    """
+    year_codes = (df['year'].to_numpy() - years[0]).astype(np.int64)
+    if column is None:
+        counts = np.bincount(year_codes, minlength=len(years)).astype(float)
+        return counts[:, None], ['total_awards']
+
+    values = df[column]
+    if column == 'stars':
+        values = values.astype(int).astype(str) + '_star'
+    group_codes, keys = pd.factorize(values, sort=True)
+    valid = group_codes >= 0
+    n_groups = len(keys)
+    flat = np.bincount(year_codes[valid] * n_groups + group_codes[valid], minlength=len(years) * n_groups)
+    return flat.reshape(len(years), n_groups).astype(float), [str(key) for key in keys]
+
+
+def linear_trend(Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对每列做最小二乘线性拟合
+
+    Returns:
+        (末期水平, 斜率, 残差平方和)，只有一个时间点时斜率为0
+    """
+    t = np.arange(Y.shape[0], dtype=float)
+    t -= t.mean()
+    denominator = t @ t
+    mean = Y.mean(axis=0)
+    slope = (t @ (Y - mean)) / denominator if denominator > 0 else np.zeros(Y.shape[1])
+    residuals = Y - (mean + np.outer(t, slope))
+    return mean + slope * t[-1], slope, (residuals ** 2).sum(axis=0)
+
+
+def holt_smoothing(Y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Holt线性指数平滑，在参数网格上对所有序列同时递推
+
+    状态数组形状为 (参数组合数, 序列数)，每个序列选择一步预测误差平方和最小的参数组合。
+    需要至少3个时间点
+
+    Returns:
+        (末期水平, 末期趋势, 一步预测误差平方和)
+    """
+    alpha, beta = (grid.ravel()[:, None] for grid in np.meshgrid(HOLT_ALPHAS, HOLT_BETAS))
+    level = np.broadcast_to(Y[1], (len(alpha), Y.shape[1])).copy()
+    trend = np.broadcast_to(Y[1] - Y[0], level.shape).copy()
+    sse = np.zeros_like(level)
+
+    for t in range(2, Y.shape[0]):
+        prediction = level + trend
+        sse += (Y[t] - prediction) ** 2
+        new_level = alpha * Y[t] + (1 - alpha) * prediction
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        level = new_level
+
+    best = sse.argmin(axis=0)
+    columns = np.arange(Y.shape[1])
+    return level[best, columns], trend[best, columns], sse[best, columns]
+
+
+def fit_models(Y: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    为计数矩阵的每一列拟合预测模型
+
+    - 1个时间点：朴素模型（水平外推），误差按泊松分布估计
+    - 2~3个时间点：线性趋势
+    - 4个及以上：留出最后一年，线性趋势与Holt平滑中一步预测误差较小者胜出，再用全部数据重新拟合
+
+    Args:
+        Y: 计数矩阵 shape=(年份数, 序列数)
+
+    Returns:
+        各序列的模型编码、末期水平、趋势、残差标准差和留出误差
+    """
+    n_years, n_series = Y.shape
+    model = np.full(n_series, NAIVE)
+    level, trend = Y[-1].copy(), np.zeros(n_series)
+    holdout_error = np.full(n_series, np.nan)
+    # 数据点不足以估计残差时按泊松计数的标准差估计
+    sigma = np.sqrt(np.maximum(Y[-1], 1.0))
+
+    if n_years >= 2:
+        model[:] = LINEAR_TREND
+        level, trend, sse = linear_trend(Y)
+        if n_years >= 3:
+            sigma = np.sqrt(sse / (n_years - 2))
+
+    if n_years >= 4:
+        train, actual = Y[:-1], Y[-1]
+        linear_level, linear_slope, _ = linear_trend(train)
+        holt_level, holt_trend, _ = holt_smoothing(train)
+        linear_error = np.abs(actual - (linear_level + linear_slope))
+        holt_error = np.abs(actual - (holt_level + holt_trend))
+        use_holt = holt_error < linear_error
+        holdout_error = np.where(use_holt, holt_error, linear_error)
+
+        full_level, full_trend, full_sse = holt_smoothing(Y)
+        model = np.where(use_holt, HOLT, LINEAR_TREND)
+        level = np.where(use_holt, full_level, level)
+        trend = np.where(use_holt, full_trend, trend)
+        sigma = np.where(use_holt, np.sqrt(full_sse / (n_years - 2)), sigma)
+
+    return {
+        'model': model,
+        'level': level,
+        'trend': trend,
+        'sigma': sigma,
+        'holdout_error': holdout_error
+    }
+
+
+def fit_models_parallel(Y: np.ndarray, n_jobs: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    按列分块在多个进程中拟合模型，序列数较少时直接在当前进程中计算
+
+    Args:
+        Y: 计数矩阵 shape=(年份数, 序列数)
+        n_jobs: 进程数，默认为CPU核数
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs <= 1 or Y.shape[1] < PARALLEL_MIN_SERIES:
+        return fit_models(Y)
+
+    blocks = np.array_split(Y, n_jobs, axis=1)
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        results = list(executor.map(fit_models, blocks))
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+def predict(params: Dict[str, np.ndarray], horizon: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    由拟合参数生成预测值及95%预测区间
+
+    Args:
+        params: fit_models 返回的参数（可为单个序列的切片）
+        horizon: 预测年数
+
+    Returns:
+        (预测值, 下界, 上界)，shape=(horizon, 序列数)，计数不小于0
+    """
+    steps = np.arange(1, horizon + 1, dtype=float)[:, None]
+    point = params['level'] + steps * params['trend']
+    spread = INTERVAL_Z * params['sigma'] * np.sqrt(steps)
+    return np.maximum(point, 0), np.maximum(point - spread, 0), np.maximum(point + spread, 0)
+
+
+def build_group_forecasts(Y: np.ndarray, keys: List[str], years: np.ndarray,
+                          params: Dict[str, np.ndarray], horizon: int) -> Dict[str, Dict]:
+    """将一个分组维度的拟合结果展开为按分组键索引的预测字典"""
+    history_years = [str(int(year)) for year in years]
+    future_years = [str(int(year)) for year in range(years[-1] + 1, years[-1] + 1 + horizon)]
+    # 先整体取整并转换为Python列表，避免逐元素转换numpy标量
+    history = Y.T.tolist()
+    point, lower, upper = (np.round(values, 2).T.tolist() for values in predict(params, horizon))
+    models = [MODEL_NAMES[code] for code in params['model']]
+    trends = np.round(params['trend'], 4).tolist()
+
+    forecasts = {}
+    for index, key in enumerate(keys):
+        forecasts[key] = {
+            'model': models[index],
+            'history': dict(zip(history_years, history[index])),
+            'forecast': dict(zip(future_years, point[index])),
+            'lower_bound': dict(zip(future_years, lower[index])),
+            'upper_bound': dict(zip(future_years, upper[index])),
+            'trend': trends[index]
+        }
+    return forecasts
+
+
+def summarize_performance(Y: np.ndarray, params: Dict[str, np.ndarray], fit_seconds: float) -> Dict:
+    """统计一个分组维度的模型分布与留出误差"""
+    evaluated = ~np.isnan(params['holdout_error'])
+    performance = {
+        'series_count': int(Y.shape[1]),
+        'data_points': int(Y.shape[0]),
+        'model_counts': {name: int((params['model'] == code).sum()) for code, name in enumerate(MODEL_NAMES)},
+        'evaluated_series': int(evaluated.sum()),
+        'holdout_mae': None,
+        'holdout_mape': None,
+        'fit_seconds': round(fit_seconds, 4)
+    }
+    if evaluated.any():
+        actual = Y[-1, evaluated]
+        errors = params['holdout_error'][evaluated]
+        performance['holdout_mae'] = round(float(errors.mean()), 4)
+        nonzero = actual > 0
+        if nonzero.any():
+            performance['holdout_mape'] = round(float((errors[nonzero] / actual[nonzero]).mean() * 100), 2)
+    return performance
+
+
+def _growth_rates(Y: np.ndarray, params: Dict[str, np.ndarray], horizon: int) -> np.ndarray:
+    """预测期末相对最近一年的增长率"""
+    final = predict(params, horizon)[0][-1]
+    current = Y[-1]
+    return np.divide(final - current, current, out=np.zeros_like(final), where=current > 0)
+
+
+def _direction(growth_rate: float) -> str:
+    if growth_rate > TREND_THRESHOLD:
+        return 'increasing'
+    if growth_rate < -TREND_THRESHOLD:
+        return 'declining'
+    return 'stable'
+
+
+def _trend_summary(Y, keys, params, horizon, indices) -> Dict[str, Dict]:
+    growth = _growth_rates(Y, params, horizon)
+    final = predict(params, horizon)[0][-1]
+    return {
+        keys[index]: {
+            'current': float(Y[-1, index]),
+            'forecast_final': round(float(final[index]), 2),
+            'growth_rate': round(float(growth[index]) * 100, 2),
+            'direction': _direction(growth[index])
+        }
+        for index in indices
+    }
+
+
+def analyze_insights(matrices: Dict[str, Tuple[np.ndarray, List[str]]],
+                     fitted: Dict[str, Dict[str, np.ndarray]], horizon: int) -> Dict:
+    """
+    从全部分组的拟合结果中提取趋势洞察
+
+    Args:
+        matrices: 分组维度 -> (计数矩阵, 分组键)
+        fitted: 分组维度 -> 拟合参数
+        horizon: 预测年数
+    """
+    Y, keys = matrices['overall']
+    insights = {
+        'overall_trends': _trend_summary(Y, keys, fitted['overall'], horizon, range(len(keys))),
+        'comparative_analysis': {},
+        'risk_assessment': {},
+        'recommendations': []
+    }
+
+    Y, keys = matrices['stars']
+    insights['comparative_analysis']['star_level_trends'] = _trend_summary(
+        Y, keys, fitted['stars'], horizon, range(len(keys)))
+
+    # 地区按当前获奖数量取前10
+    Y, keys = matrices['region']
+    top_regions = np.argsort(-Y[-1], kind='stable')[:10]
+    insights['comparative_analysis']['regional_trends'] = _trend_summary(
+        Y, keys, fitted['region'], horizon, top_regions)
+
+    # 风险评估：历史波动大（变异系数>0.5）及预测下降的序列
+    high_volatility, declining = [], []
+    total_series = 0
+    for group_by in ('region', 'city', 'cuisine'):
+        Y, keys = matrices[group_by]
+        total_series += len(keys)
+        if Y.shape[0] >= 3:
+            mean = Y.mean(axis=0)
+            cv = np.divide(Y.std(axis=0), mean, out=np.zeros_like(mean), where=mean > 0)
+            high_volatility.extend(f"{group_by}:{keys[index]}" for index in np.flatnonzero(cv > 0.5))
+        growth = _growth_rates(Y, fitted[group_by], horizon)
+        declining.extend(f"{group_by}:{keys[index]}" for index in np.flatnonzero(growth < -TREND_THRESHOLD))
+
+    declining_share = len(declining) / total_series if total_series else 0.0
+    if declining_share > 0.3:
+        risk_level = 'high'
+    elif declining_share > 0.1 or high_volatility:
+        risk_level = 'medium'
+    else:
+        risk_level = 'low'
+
+    insights['risk_assessment'] = {
+        'high_volatility_series': high_volatility[:20],
+        'declining_trends': declining[:20],
+        'high_volatility_count': len(high_volatility),
+        'declining_count': len(declining),
+        'overall_risk_level': risk_level
+    }
+
+    recommendations = insights['recommendations']
+    n_years = matrices['overall'][0].shape[0]
+    if n_years < 4:
+        recommendations.append(f"当前仅有 {n_years} 个年份的数据，预测主要为水平外推，补充更多年份后可启用趋势模型评估")
+    overall = next(iter(insights['overall_trends'].values()))
+    if overall['direction'] == 'increasing':
+        recommendations.append(f"整体获奖数量预计增长 {overall['growth_rate']:.1f}%，可关注新增米其林餐厅的地区")
+    elif overall['direction'] == 'declining':
+        recommendations.append(f"整体获奖数量预计下降 {abs(overall['growth_rate']):.1f}%，需关注评级收缩的地区")
+    if declining:
+        recommendations.append(f"{len(declining)} 个序列呈下降趋势，建议优先复核: {', '.join(declining[:5])}")
+    if high_volatility:
+        recommendations.append(f"{len(high_volatility)} 个序列历史波动较大，预测区间较宽，应谨慎使用")
+
+    return insights
+
+
+def run_forecasting(df: pd.DataFrame, horizon: int = FORECAST_YEARS,
+                    n_jobs: Optional[int] = None) -> Tuple[Dict, Dict]:
+    """
+    对所有分组维度批量拟合并预测
+
+    Args:
+        df: 地理编码后的餐厅数据
+        horizon: 预测年数
+        n_jobs: 并行拟合的进程数
+
+    Returns:
+        (预测结果, 拟合参数)：前者包含 forecasts/insights/model_performance，
+        后者按分组维度保存各序列的模型参数，可在不重新拟合的情况下生成任意年数的预测
+    """
+    df = df.dropna(subset=['year'])
+    year_values = df['year'].astype(int)
+    years = np.arange(year_values.min(), year_values.max() + 1)
+    df = df.assign(year=year_values)
+    logger.info(f"预测数据: {len(df)} 条记录, 年份范围 {years[0]}-{years[-1]}")
+
+    matrices, fitted = {}, {}
+    forecasts, performance = {}, {}
+    for group_by, column in FORECAST_GROUPS.items():
+        if column is not None and column not in df.columns:
+            logger.warning(f"缺少分组列 {column}，跳过 {group_by} 预测")
+            continue
+
+        start_time = time.perf_counter()
+        Y, keys = build_count_matrix(df, column, years)
+        params = fit_models_parallel(Y, n_jobs)
+        fit_seconds = time.perf_counter() - start_time
+
+        matrices[group_by] = (Y, keys)
+        fitted[group_by] = params
+        forecasts[group_by] = build_group_forecasts(Y, keys, years, params, horizon)
+        performance[group_by] = summarize_performance(Y, params, fit_seconds)
+        logger.info(f"{group_by}: {len(keys)} 个序列拟合完成，耗时 {fit_seconds:.3f}秒")
+
+    forecast_parameters = {
+        'forecast_years': horizon,
+        'history_range': f"{years[0]}-{years[-1]}",
+        'forecast_period': f"{years[-1] + 1}-{years[-1] + horizon}",
+        'models_trained': int(sum(len(keys) for _, keys in matrices.values())),
+        'successful_forecasts': int(sum(len(group) for group in forecasts.values()))
+    }
+    results = {
+        'forecasts': forecasts,
+        'insights': analyze_insights(matrices, fitted, horizon),
+        'model_performance': performance,
+        'forecast_parameters': forecast_parameters,
+        'generated_at': datetime.now().isoformat()
+    }
+
+    models = {
+        group_by: {
+            'keys': matrices[group_by][1],
+            'years': years,
+            'counts': matrices[group_by][0],
+            'model_names': MODEL_NAMES,
+            'interval_z': INTERVAL_Z,
+            **params
+        }
+        for group_by, params in fitted.items()
+    }
+    return results, models
+
+
+def main(horizon: int = FORECAST_YEARS, n_jobs: Optional[int] = None):
+    """
+    主函数：执行时间序列预测流程
+
+    Args:
+        horizon: 预测年数
+        n_jobs: 并行拟合的进程数，默认为CPU核数
+    """
+    logger.info("开始时间序列预测主流程...")
+
+    try:
+        # 加载地理编码后的数据
+        geocoded_data_path = path_manager.get_cleaned_data_path("restaurants_geocoded.csv")
+
+        if not geocoded_data_path.exists():
+            logger.error("地理编码数据文件不存在，请先运行地理编码")
+            return
+
+        df = pd.read_csv(geocoded_data_path)
+        logger.info(f"加载地理编码数据: {df.shape[0]} 条记录")
+
+        results, models = run_forecasting(df, horizon, n_jobs)
+
+        forecasts_path = path_manager.get_processed_data_path("forecasts.joblib")
+        joblib.dump(results, forecasts_path)
+        logger.info(f"预测结果已保存: {forecasts_path}")
+
+        models_path = path_manager.get_processed_data_path("forecast_models.joblib")
+        joblib.dump(models, models_path)
+        logger.info(f"预测模型参数已保存: {models_path}")
+
+        # 保存预测报告（不含逐序列预测明细）
+        report = {
+            'insights': results['insights'],
+            'model_performance': results['model_performance'],
+            'forecast_parameters': results['forecast_parameters'],
+            'generated_at': results['generated_at']
+        }
+        report_path = path_manager.get_processed_data_path("forecast_report.json")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logger.info(f"预测报告已保存: {report_path}")
+
+        cache_manager.set_cache("forecasts", results)
+
+        logger.info("时间序列预测流程完成!")
+        logger.info(f"共拟合 {results['forecast_parameters']['models_trained']} 个序列")
+
+        return results, models
+
+    except Exception as e:
+        logger.error(f"时间序列预测过程中发生错误: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='米其林餐厅获奖数量时间序列预测')
+    parser.add_argument('--horizon', type=int, default=FORECAST_YEARS, help='预测年数')
+    parser.add_argument('--jobs', type=int, help='并行拟合的进程数，默认为CPU核数')
+    args = parser.parse_args()
+
+    main(horizon=args.horizon, n_jobs=args.jobs)
@@ -355,8 +355,69 @@ def analyze_geographic_distribution(df: pd.DataFrame) -> Dict:
     return analysis
 
 
-def main():
-    """主函数：执行地理编码流程"""
+def export_geographic_outputs(df: pd.DataFrame) -> Tuple[Dict, Dict]:
+    """
+    生成并保存GeoJSON和地理分布分析报告
+    
+    Args:
+        df: 地理编码后的数据
+    
+    Returns:
+        (GeoJSON数据, 地理分析报告)
+    """
+    # 分析地理分布
+    geo_analysis = analyze_geographic_distribution(df)
+    
+    # 创建GeoJSON
+    geojson_data = create_geojson(df)
+    
+    # 保存GeoJSON
+    geojson_path = path_manager.get_cleaned_data_path("restaurants_geo.json")
+    with open(geojson_path, 'w', encoding='utf-8') as f:
+        json.dump(geojson_data, f, indent=2, ensure_ascii=False)
+    
+    logger.info(f"GeoJSON已保存: {geojson_path}")
+    
+    # 保存地理分析报告
+    analysis_path = path_manager.get_cleaned_data_path("geographic_analysis.json")
+    with open(analysis_path, 'w', encoding='utf-8') as f:
+        json.dump(geo_analysis, f, indent=2, ensure_ascii=False)
+    
+    logger.info(f"地理分析报告已保存: {analysis_path}")
+    
+    cache_manager.set_cache("geojson_data", geojson_data)
+    cache_manager.set_cache("geographic_analysis", geo_analysis)
+    
+    return geojson_data, geo_analysis
+
+
+def export_main():
+    """
+    基于已保存的地理编码数据导出GeoJSON和地理分析报告
+    
+    供流水线在地理编码完成后与特征工程并行执行
+    """
+    geocoded_data_path = path_manager.get_cleaned_data_path("restaurants_geocoded.csv")
+    
+    if not geocoded_data_path.exists():
+        logger.error("地理编码数据文件不存在，请先运行地理编码")
+        return
+    
+    df = pd.read_csv(geocoded_data_path)
+    logger.info(f"加载地理编码数据: {df.shape[0]} 条记录")
+    
+    geojson_data, geo_analysis = export_geographic_outputs(df)
+    return df, geojson_data, geo_analysis
+
+
+def main(export: bool = True):
+    """
+    主函数：执行地理编码流程
+    
+    Args:
+        export: 是否同时导出GeoJSON和地理分析报告；
+            为False时只保存地理编码CSV，导出由 export_main 单独完成
+    """
     logger.info("开始地理编码主流程...")
     
     try:
@@ -377,35 +438,14 @@ def main():
         # 创建增强地理特征
         df = geocoder.create_enhanced_features(df)
         
-        # 分析地理分布
-        geo_analysis = analyze_geographic_distribution(df)
-        
-        # 创建GeoJSON
-        geojson_data = create_geojson(df)
-        
-        # 保存结果
         # 保存增强后的CSV
         enhanced_csv_path = path_manager.get_cleaned_data_path("restaurants_geocoded.csv")
         export_to_format(df, enhanced_csv_path, "csv")
         
-        # 保存GeoJSON
-        geojson_path = path_manager.get_cleaned_data_path("restaurants_geo.json")
-        with open(geojson_path, 'w', encoding='utf-8') as f:
-            json.dump(geojson_data, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"GeoJSON已保存: {geojson_path}")
-        
-        # 保存地理分析报告
-        analysis_path = path_manager.get_cleaned_data_path("geographic_analysis.json")
-        with open(analysis_path, 'w', encoding='utf-8') as f:
-            json.dump(geo_analysis, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"地理分析报告已保存: {analysis_path}")
-        
         # 缓存数据
         cache_manager.set_cache("geocoded_data", df)
-        cache_manager.set_cache("geojson_data", geojson_data)
-        cache_manager.set_cache("geographic_analysis", geo_analysis)
+        
+        geojson_data, geo_analysis = export_geographic_outputs(df) if export else (None, None)
         
         logger.info("地理编码流程完成!")
         logger.info(f"成功处理 {len(df)} 条记录")
@@ -0,0 +1,334 @@
+"""
+聚类图表渲染模块
+作为独立的流水线阶段，从聚类结果产物并行渲染PNG图表，并按输入指纹缓存
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import joblib
+
+from utils import logger, path_manager
+
+# 渲染器代码版本，修改任意图表的绘制逻辑后递增以使缓存失效
+RENDER_VERSION = 1
+
+OUTPUT_DIR = path_manager.data_dir / "output"
+RENDER_CACHE_PATH = OUTPUT_DIR / "render_cache.json"
+
+# 各图表依赖的输入产物
+INPUT_PATHS = {
+    'manifest': path_manager.processed_data_dir / "clusters" / "manifest.json",
+    'clustered_csv': path_manager.processed_data_dir / "restaurants_with_clusters.csv",
+    'cluster_model': path_manager.processed_data_dir / "cluster_model.joblib"
+}
+
+
+def _setup_matplotlib():
+    """在工作进程中初始化非交互式绘图后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+
+def _load_manifest() -> dict:
+    with open(INPUT_PATHS['manifest'], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _load_array(manifest: dict, array_name: str) -> np.ndarray:
+    """按清单读取数组（数组文件名带有生成该结果的运行标识）"""
+    return np.load(INPUT_PATHS['manifest'].parent / manifest['arrays'][array_name]['file'])
+
+
+def _load_best_labels(manifest: Optional[dict] = None) -> np.ndarray:
+    """读取最佳聚类算法的标签数组"""
+    manifest = manifest or _load_manifest()
+    best_algorithm = manifest['best_algorithm']
+    return _load_array(manifest, manifest['algorithms'][best_algorithm]['best_result']['_arrays']['labels'])
+
+
+def _scatter_by_cluster(plt, coords: np.ndarray, labels: np.ndarray):
+    """按聚类着色绘制二维散点，噪声点单独绘制"""
+    unique_clusters = sorted(set(labels.tolist()) - {-1})
+    cmap = plt.cm.get_cmap('tab10', max(len(unique_clusters), 1))
+
+    for i, cluster in enumerate(unique_clusters):
+        cluster_points = coords[labels == cluster]
+        plt.scatter(cluster_points[:, 0], cluster_points[:, 1], s=50, color=cmap(i), alpha=0.7, label=f'Cluster {cluster}')
+
+    if -1 in labels:
+        noise_points = coords[labels == -1]
+        plt.scatter(noise_points[:, 0], noise_points[:, 1], s=30, color='black', alpha=0.3, label='Noise')
+
+
+def render_clustering_visualization(output_path: Path):
+    """PCA降维聚类散点图，并标注部分餐厅名称"""
+    plt = _setup_matplotlib()
+    manifest = _load_manifest()
+    X_pca = _load_array(manifest, 'pca.data')
+    labels = _load_best_labels(manifest)
+    restaurants_df = pd.read_csv(INPUT_PATHS['clustered_csv'])
+
+    plt.figure(figsize=(12, 8))
+    _scatter_by_cluster(plt, X_pca, labels)
+
+    plt.title('米其林餐厅聚类分析 (PCA降维可视化)')
+    plt.xlabel('主成分 1 (价格和奢华程度)')
+    plt.ylabel('主成分 2 (菜系特色和创新度)')
+    plt.legend()
+    plt.grid(True, linestyle='--', alpha=0.7)
+
+    # 添加部分餐厅名称标注
+    np.random.seed(42)
+    if 'name' in restaurants_df.columns:
+        sample_indices = np.random.choice(
+            range(len(restaurants_df)),
+            size=min(20, len(restaurants_df)),
+            replace=False
+        )
+
+        for idx in sample_indices:
+            plt.annotate(
+                restaurants_df.iloc[idx]['name'],
+                (X_pca[idx, 0], X_pca[idx, 1]),
+                fontsize=8,
+                alpha=0.8
+            )
+
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def render_tsne_clustering(output_path: Path):
+    """t-SNE降维聚类散点图"""
+    from sklearn.manifold import TSNE
+
+    plt = _setup_matplotlib()
+    labels = _load_best_labels()
+    cluster_model = joblib.load(INPUT_PATHS['cluster_model'])
+    restaurants_df = pd.read_csv(INPUT_PATHS['clustered_csv'])
+
+    # 复用训练时的特征定义和标准化参数
+    X = restaurants_df[cluster_model['features']].to_numpy(dtype=float)
+    X = np.where(np.isnan(X), cluster_model['imputer_statistics'], X)
+    X_scaled = (X - cluster_model['scaler_mean']) / cluster_model['scaler_scale']
+
+    X_tsne = TSNE(n_components=2, perplexity=min(30, len(X_scaled) - 1), init='pca', random_state=42).fit_transform(X_scaled)
+
+    plt.figure(figsize=(12, 8))
+    _scatter_by_cluster(plt, X_tsne, labels)
+    plt.title('米其林餐厅聚类分析 (t-SNE降维可视化)')
+    plt.grid(True, linestyle='--', alpha=0.7)
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def render_cluster_sizes(output_path: Path):
+    """各聚类餐厅数量柱状图"""
+    plt = _setup_matplotlib()
+    cluster_sizes = _load_manifest()['cluster_analysis']['cluster_sizes']
+
+    sizes = pd.Series(cluster_sizes).sort_values(ascending=False)
+
+    plt.figure(figsize=(14, 6))
+    sizes.plot(kind='bar', color='steelblue')
+    plt.title('各聚类餐厅数量')
+    plt.xlabel('聚类')
+    plt.ylabel('餐厅数量')
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+def render_cluster_features_heatmap(output_path: Path):
+    """各聚类核心特征均值热力图"""
+    import seaborn as sns
+
+    plt = _setup_matplotlib()
+    restaurants_df = pd.read_csv(INPUT_PATHS['clustered_csv'])
+
+    feature_columns = [col for col in ['stars', 'price_level', 'latitude', 'longitude'] if col in restaurants_df.columns]
+    profile = restaurants_df[restaurants_df['cluster'] != -1].groupby('cluster')[feature_columns].mean()
+
+    # 按列归一化，便于跨特征比较
+    value_range = (profile.max() - profile.min()).replace(0, 1)
+    normalized = (profile - profile.min()) / value_range
+
+    plt.figure(figsize=(8, max(6, len(profile) * 0.2)))
+    sns.heatmap(normalized, cmap='YlOrRd', cbar_kws={'label': '归一化均值'})
+    plt.title('聚类特征热力图')
+    plt.tight_layout()
+    plt.savefig(output_path)
+    plt.close()
+
+
+# 图表注册表：名称 -> (渲染函数, 依赖的输入)
+FIGURES = {
+    'clustering_visualization': (render_clustering_visualization, ['manifest', 'clustered_csv']),
+    'tsne_clustering': (render_tsne_clustering, ['manifest', 'cluster_model', 'clustered_csv']),
+    'cluster_sizes': (render_cluster_sizes, ['manifest']),
+    'cluster_features_heatmap': (render_cluster_features_heatmap, ['clustered_csv'])
+}
+
+
+def _hash_file(hasher, path: Path):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(block)
+
+
+def _hash_manifest(hasher, manifest_path: Path):
+    """聚类清单去掉生成时间后的内容，加上其引用的各数组文件内容"""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest.pop('created_at', None)
+    arrays = manifest.pop('arrays', {})
+    hasher.update(json.dumps(manifest, sort_keys=True).encode())
+    for name in sorted(arrays):
+        spec = arrays[name]
+        hasher.update(f"{name}:{spec['dtype']}:{spec['shape']}".encode())
+        _hash_file(hasher, manifest_path.parent / spec['file'])
+
+
+def _hash_cluster_model(hasher, model_path: Path):
+    """聚类预测模型去掉生成时间后的内容"""
+    cluster_model = joblib.load(model_path)
+    hasher.update(joblib.hash({key: value for key, value in cluster_model.items() if key != 'created_at'}).encode())
+
+
+# 内嵌生成时间的输入按内容计算指纹，重新运行聚类但结果不变时不会触发重新渲染
+INPUT_HASHERS = {
+    'manifest': _hash_manifest,
+    'cluster_model': _hash_cluster_model
+}
+
+
+def input_digest(path: Path) -> str:
+    """
+    单个输入产物的内容摘要（与图表指纹相同的计算方式），文件不存在时返回 missing
+
+    供流水线判断图表阶段的输入是否变化
+    """
+    path = Path(path)
+    if not path.exists():
+        return 'missing'
+    hasher = hashlib.sha256()
+    input_name = next((name for name, input_path in INPUT_PATHS.items() if input_path.resolve() == path.resolve()), None)
+    INPUT_HASHERS.get(input_name, _hash_file)(hasher, path)
+    return hasher.hexdigest()
+
+
+def compute_fingerprint(figure_name: str) -> str:
+    """根据图表名称、渲染器版本和输入内容计算指纹"""
+    hasher = hashlib.sha256(f"{figure_name}:{RENDER_VERSION}".encode())
+    for input_name in FIGURES[figure_name][1]:
+        INPUT_HASHERS.get(input_name, _hash_file)(hasher, INPUT_PATHS[input_name])
+    return hasher.hexdigest()
+
+
+def _render_one(figure_name: str, output_path: str) -> str:
+    """在工作进程中渲染单个图表"""
+    FIGURES[figure_name][0](Path(output_path))
+    return figure_name
+
+
+def _load_render_cache() -> Dict[str, str]:
+    if RENDER_CACHE_PATH.exists():
+        with open(RENDER_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def render_figures(figures: Optional[List[str]] = None, workers: Optional[int] = None, force: bool = False) -> Dict[str, str]:
+    """
+    并行渲染聚类图表
+
+    Args:
+        figures: 要渲染的图表名称列表，默认全部
+        workers: 工作进程数，默认取CPU核数与图表数的较小值
+        force: 是否忽略缓存强制重新渲染
+
+    Returns:
+        每个图表的处理状态 (rendered|cached|failed|missing_inputs)
+    """
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    figures = figures or list(FIGURES)
+    render_cache = _load_render_cache()
+    status = {}
+    pending = {}
+
+    for figure_name in figures:
+        if figure_name not in FIGURES:
+            raise ValueError(f"未知图表: {figure_name}")
+
+        missing = [name for name in FIGURES[figure_name][1] if not INPUT_PATHS[name].exists()]
+        if missing:
+            logger.warning(f"图表 {figure_name} 缺少输入 {missing}，跳过")
+            status[figure_name] = 'missing_inputs'
+            continue
+
+        fingerprint = compute_fingerprint(figure_name)
+        output_path = OUTPUT_DIR / f"{figure_name}.png"
+        if not force and render_cache.get(figure_name) == fingerprint and output_path.exists():
+            logger.info(f"图表 {figure_name} 输入未变化，使用缓存")
+            status[figure_name] = 'cached'
+            continue
+
+        pending[figure_name] = (fingerprint, output_path)
+
+    if pending:
+        max_workers = workers or min(len(pending), os.cpu_count() or 1)
+        logger.info(f"使用 {max_workers} 个进程渲染 {len(pending)} 个图表...")
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_render_one, figure_name, str(output_path)): figure_name
+                for figure_name, (_, output_path) in pending.items()
+            }
+            for future in as_completed(futures):
+                figure_name = futures[future]
+                try:
+                    future.result()
+                    render_cache[figure_name] = pending[figure_name][0]
+                    status[figure_name] = 'rendered'
+                    logger.info(f"图表已渲染: {pending[figure_name][1]}")
+                except Exception as e:
+                    render_cache.pop(figure_name, None)
+                    status[figure_name] = 'failed'
+                    logger.error(f"渲染图表 {figure_name} 失败: {e}")
+
+        with open(RENDER_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(render_cache, f, indent=2)
+
+    return status
+
+
+def main(figures: Optional[List[str]] = None, workers: Optional[int] = None, force: bool = False):
+    """主函数：执行图表渲染流程"""
+    logger.info("开始图表渲染主流程...")
+    status = render_figures(figures, workers, force)
+    logger.info(f"图表渲染完成: {status}")
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='渲染聚类分析图表')
+    parser.add_argument('--figures', help='逗号分隔的图表名称，默认全部: ' + ','.join(FIGURES))
+    parser.add_argument('--workers', type=int, help='并行工作进程数')
+    parser.add_argument('--force', action='store_true', help='忽略缓存强制重新渲染')
+    args = parser.parse_args()
+
+    main(args.figures.split(',') if args.figures else None, args.workers, args.force)
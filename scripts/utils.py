@@ -4,13 +4,15 @@
 """
 
 import os
+import re
 import json
 import pickle
 import hashlib
 import logging
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 
@@ -168,6 +170,14 @@ class CacheManager:
                 logger.info(f"Memory cache cleared: {key}")
 
 
+# 原始数据文件及对应的星级
+MICHELIN_DATA_FILES = {
+    "one-star-michelin-restaurants.csv": 1,
+    "two-stars-michelin-restaurants.csv": 2,
+    "three-stars-michelin-restaurants.csv": 3
+}
+
+
 def load_michelin_data(path_manager: PathManager = None) -> pd.DataFrame:
     """
     加载所有米其林餐厅数据并合并
@@ -182,24 +192,14 @@ def load_michelin_data(path_manager: PathManager = None) -> pd.DataFrame:
         path_manager = PathManager()
     
     dataframes = []
-    files = [
-        "one-star-michelin-restaurants.csv",
-        "two-stars-michelin-restaurants.csv", 
-        "three-stars-michelin-restaurants.csv"
-    ]
     
-    for file in files:
+    for file, stars in MICHELIN_DATA_FILES.items():
         file_path = path_manager.get_raw_data_path(file)
         if file_path.exists():
             try:
                 df = pd.read_csv(file_path)
                 # 从文件名提取星级信息
-                if "one-star" in file:
-                    df['stars'] = 1
-                elif "two-stars" in file:
-                    df['stars'] = 2
-                elif "three-stars" in file:
-                    df['stars'] = 3
+                df['stars'] = stars
                 
                 dataframes.append(df)
                 logger.info(f"Loaded {len(df)} records from {file}")
@@ -219,6 +219,64 @@ def load_michelin_data(path_manager: PathManager = None) -> pd.DataFrame:
     return combined_df
 
 
+def _infer_chunked_dtypes(file_path: Path, chunk_size: int) -> Dict[str, Any]:
+    """
+    逐块扫描CSV文件，得到与整体读取该文件一致的列类型
+    
+    分块读取时 read_csv 按块推断类型，同一列在不同块中可能是整数、浮点或字符串
+    （如邮编列在只含数字的块中被读成数值，写出为 87568.0）；
+    任一块为字符串的列按字符串读取，其余块中有浮点的数值列按浮点读取
+    
+    Returns:
+        可传给 read_csv 的 dtype 字典，只包含需要固定类型的列
+    """
+    observed = {}
+    for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+        for col, dtype in chunk.dtypes.items():
+            observed.setdefault(col, set()).add(dtype)
+    
+    dtypes = {}
+    for col, kinds in observed.items():
+        if len(kinds) == 1:
+            continue
+        if all(pd.api.types.is_numeric_dtype(kind) and not pd.api.types.is_bool_dtype(kind) for kind in kinds):
+            dtypes[col] = float
+        else:
+            dtypes[col] = str
+    return dtypes
+
+
+def iter_michelin_data_chunks(path_manager: PathManager = None, chunk_size: int = 50000) -> Iterator[pd.DataFrame]:
+    """
+    按块读取米其林餐厅原始数据，块的顺序与 load_michelin_data 合并后的行顺序一致
+    
+    Args:
+        path_manager: 路径管理器实例
+        chunk_size: 每块的最大行数
+        
+    Yields:
+        带有stars列的数据块
+    """
+    if path_manager is None:
+        path_manager = PathManager()
+    
+    found = False
+    for file, stars in MICHELIN_DATA_FILES.items():
+        file_path = path_manager.get_raw_data_path(file)
+        if not file_path.exists():
+            logger.warning(f"File not found: {file_path}")
+            continue
+        
+        found = True
+        dtypes = _infer_chunked_dtypes(file_path, chunk_size)
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, dtype=dtypes):
+            chunk['stars'] = stars
+            yield chunk
+    
+    if not found:
+        raise FileNotFoundError("No data files found")
+
+
 def validate_dataframe(df: pd.DataFrame) -> Dict[str, Any]:
     """
     验证DataFrame的质量并返回统计信息
@@ -321,7 +379,10 @@ def create_project_summary() -> Dict[str, Any]:
             'cleaned_data_available': (path_manager.cleaned_data_dir / "restaurants_cleaned.csv").exists(),
             'geocoded_data_available': (path_manager.cleaned_data_dir / "restaurants_geo.json").exists(),
             'features_available': (path_manager.processed_data_dir / "features.joblib").exists(),
-            'clusters_available': (path_manager.processed_data_dir / "clusters.joblib").exists(),
+            'clusters_available': (
+                (path_manager.processed_data_dir / "clusters" / "manifest.json").exists() or
+                (path_manager.processed_data_dir / "clusters.joblib").exists()
+            ),
             'processed_files_count': len(processed_files)
         }
         
@@ -410,6 +471,103 @@ def load_restaurants(raw_data_dir):
     
     return combined_df
 
+# 美元符号数量对应的价格等级（5个及以上为Luxury）
+PRICE_SYMBOL_LEVELS = ['Unknown', 'Budget', 'Moderate', 'Expensive', 'Very Expensive', 'Luxury']
+# 数字价格的分档边界（左闭右开），对应等级1-5
+NUMERIC_PRICE_BINS = [300, 800, 1500, 3000]
+
+
+def _map_unique(values: pd.Series, func) -> np.ndarray:
+    """只对去重后的取值计算映射（价格列的取值种类很少），再按编码回填到每一行"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.asarray(func(pd.Series(uniques, dtype=object)))[codes]
+
+
+def count_price_symbols(price: pd.Series, symbol: str = '$') -> np.ndarray:
+    """
+    统计价格字符串中货币符号的个数
+    
+    Args:
+        price: 价格列（如 "$$$"），缺失值和 'N/A' 计为0
+        symbol: 货币符号
+        
+    Returns:
+        int64数组
+    """
+    def count(unique_prices):
+        counts = unique_prices.astype(str).str.count(re.escape(symbol)).to_numpy(dtype=np.int64)
+        counts[(unique_prices.isna() | (unique_prices == 'N/A')).to_numpy()] = 0
+        return counts
+    
+    return _map_unique(price, count)
+
+
+def price_level_from_symbols(price: pd.Series) -> np.ndarray:
+    """按美元符号数量映射价格等级名称（Budget ~ Luxury，无符号为Unknown）"""
+    labels = np.array(PRICE_SYMBOL_LEVELS, dtype=object)
+    return labels[np.minimum(count_price_symbols(price), 5)]
+
+
+def price_numeric_from_symbols(price: pd.Series) -> np.ndarray:
+    """按美元符号数量得到数值价格等级（0-5）"""
+    return np.minimum(count_price_symbols(price), 5)
+
+
+def parse_price_level(price: pd.Series, default: int = 2) -> np.ndarray:
+    """
+    解析混合格式的价格为1-5级
+    
+    以¥开头的价格按字符串长度定级；纯数字价格按 NUMERIC_PRICE_BINS 分档；
+    缺失值、'未知'和其他格式取默认等级
+    
+    Args:
+        price: 价格列
+        default: 无法解析时的默认等级（中等价位）
+        
+    Returns:
+        int64数组
+    """
+    def parse(unique_prices):
+        levels = np.full(len(unique_prices), default, dtype=np.int64)
+        # 只解析字符串取值；数值等非字符串取值置为缺失，与缺失值一样取默认等级
+        # （整列都不是字符串时 .str 访问器会报错）
+        text = unique_prices.where(unique_prices.map(lambda value: isinstance(value, str))).str
+        
+        numeric_mask = text.fullmatch(r'\d+\.?\d*|\.\d+').fillna(False).to_numpy(dtype=bool)
+        if numeric_mask.any():
+            values = unique_prices[numeric_mask].astype(float).to_numpy()
+            levels[numeric_mask] = np.searchsorted(NUMERIC_PRICE_BINS, values, side='right') + 1
+        
+        yen_mask = text.startswith('¥').fillna(False).to_numpy(dtype=bool)
+        levels[yen_mask] = text.len().to_numpy()[yen_mask]
+        return levels
+    
+    return _map_unique(price, parse)
+
+
+def classify_hemisphere(latitude: pd.Series) -> np.ndarray:
+    """按纬度划分南北半球（缺失值归为Southern）"""
+    labels = np.array(['Southern', 'Northern'], dtype=object)
+    return labels[(latitude.to_numpy(dtype=float) >= 0).astype(np.intp)]
+
+
+def classify_continent(latitude: pd.Series, longitude: pd.Series) -> np.ndarray:
+    """
+    根据经纬度粗略划分大洲
+    
+    经度[-180, -30]为美洲；(-30, 60]以北纬35度为界分为欧洲和非洲；
+    其余以南纬10度为界分为亚洲和大洋洲
+    """
+    lat = latitude.to_numpy(dtype=float)
+    lon = longitude.to_numpy(dtype=float)
+    europe_africa = (lon > -30) & (lon <= 60)
+    return np.select(
+        [(lon >= -180) & (lon <= -30), europe_africa & (lat >= 35), europe_africa, lat >= -10],
+        ['Americas', 'Europe', 'Africa', 'Asia'],
+        default='Oceania'
+    ).astype(object)
+
+
 def preprocess_restaurant_data(df):
     """
     预处理餐厅数据用于聚类分析
@@ -478,31 +636,7 @@ def preprocess_restaurant_data(df):
     # 6. 处理价格信息 - 转换为价格级别
     if 'price' in processed_df.columns:
         # 创建价格级别
-        def parse_price_level(price):
-            if pd.isna(price) or price == '未知':
-                return 2  # 默认中等价位
-            if isinstance(price, str):
-                if price.startswith('¥'):
-                    return len(price)  # 根据¥符号数量确定级别
-                elif price.isdigit() or (price.replace('.', '', 1).isdigit() and price.count('.') <= 1):
-                    # 如果是数字，根据数值范围确定级别
-                    try:
-                        price_val = float(price)
-                        if price_val < 300:
-                            return 1
-                        elif price_val < 800:
-                            return 2
-                        elif price_val < 1500:
-                            return 3
-                        elif price_val < 3000:
-                            return 4
-                        else:
-                            return 5
-                    except:
-                        return 2
-            return 2  # 默认中等价位
-        
-        processed_df['price_level'] = processed_df['price'].apply(parse_price_level)
+        processed_df['price_level'] = parse_price_level(processed_df['price'])
         logger.info("已创建价格级别(price_level)列")
     
     # 7. 规范化菜系信息
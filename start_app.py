@@ -8,8 +8,13 @@ import subprocess
 import sys
 import time
 import os
+import json
+import signal
 import socket
 import webbrowser
+import importlib.util
+import urllib.request
+import urllib.error
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 import argparse
@@ -61,6 +66,29 @@ def wait_for_service(port, service_name, timeout=30):
     print_colored(f"❌ {service_name} 启动超时", Colors.FAIL)
     return False
 
+def wait_for_ready(url, service_name, timeout=120):
+    """等待服务就绪（就绪检查接口返回200，即数据加载完成）"""
+    print_colored(f"⏳ 等待 {service_name} 加载数据...", Colors.CYAN)
+    start_time = time.time()
+    
+    while time.time() - start_time < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                status = json.loads(response.read().decode('utf-8'))
+                print_colored(f"✅ {service_name} 已就绪 (数据版本 {status.get('data_version')})", Colors.GREEN)
+                return True
+        except urllib.error.HTTPError as e:
+            # 503: 服务已启动但数据未加载
+            if e.code != 503:
+                print_colored(f"❌ 就绪检查失败: HTTP {e.code}", Colors.FAIL)
+                return False
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(1)
+    
+    print_colored(f"❌ {service_name} 未能在{timeout}秒内就绪", Colors.FAIL)
+    return False
+
 def check_requirements():
     """检查运行环境"""
     print_colored("🔍 检查运行环境...", Colors.CYAN)
@@ -136,8 +164,90 @@ def install_frontend_deps():
         print_colored("✅ 前端依赖已存在", Colors.GREEN)
         return True
 
-def start_backend():
+def start_production_backend(workers=None, threads=None, use_asgi=False):
+    """
+    以生产模式启动后端：gunicorn预加载应用（数据只加载一次，worker写时复制共享），
+    多worker多线程处理请求，就绪检查通过后才视为启动成功；
+    use_asgi 时使用uvicorn worker运行ASGI入口，threads 为每个worker处理请求的线程池大小
+    """
+    print_colored("🚀 启动后端生产服务 (gunicorn)...", Colors.BLUE)
+    backend_dir = Path("backend")
+    
+    if platform.system() == "Windows":
+        print_colored("❌ gunicorn不支持Windows，请使用开发模式或在WSL/容器中运行", Colors.FAIL)
+        return None
+    if importlib.util.find_spec("gunicorn") is None:
+        print_colored("❌ 未安装gunicorn，请先运行 pip install -r requirements.txt", Colors.FAIL)
+        return None
+    if use_asgi and importlib.util.find_spec("uvicorn") is None:
+        print_colored("❌ 未安装uvicorn，请先运行 pip install -r requirements.txt", Colors.FAIL)
+        return None
+    
+    command = [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py"]
+    env = os.environ.copy()
+    if workers:
+        command += ["--workers", str(workers)]
+    if use_asgi:
+        command += ["--worker-class", "uvicorn.workers.UvicornWorker", "asgi:application"]
+        if threads:
+            env["MICHELIN_ASGI_THREADS"] = str(threads)
+    else:
+        if threads:
+            command += ["--threads", str(threads)]
+        command.append("app:app")
+    
+    try:
+        # 访问日志量大，直接输出到终端而不是管道，避免管道写满阻塞服务
+        process = subprocess.Popen(command, cwd=backend_dir, env=env)
+        
+        if wait_for_ready("http://localhost:5000/api/ready", "后端API服务"):
+            print_colored("🔗 后端服务地址: http://localhost:5000", Colors.GREEN)
+            print_colored(f"🔁 平滑重启worker: kill -HUP {process.pid}", Colors.CYAN)
+            return process
+        process.terminate()
+        
+    except Exception as e:
+        print_colored(f"❌ 启动后端服务失败: {e}", Colors.FAIL)
+    
+    return None
+
+def start_asgi_backend(threads=None):
+    """以单进程ASGI模式（uvicorn）启动后端"""
+    print_colored("🚀 启动后端ASGI服务 (uvicorn)...", Colors.BLUE)
+    backend_dir = Path("backend")
+    
+    if importlib.util.find_spec("uvicorn") is None:
+        print_colored("❌ 未安装uvicorn，请先运行 pip install -r requirements.txt", Colors.FAIL)
+        return None
+    
+    env = os.environ.copy()
+    if threads:
+        env["MICHELIN_ASGI_THREADS"] = str(threads)
+    
+    try:
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "asgi:application", "--host", "0.0.0.0", "--port", "5000"],
+            cwd=backend_dir,
+            env=env
+        )
+        
+        if wait_for_ready("http://localhost:5000/api/ready", "后端API服务"):
+            print_colored("🔗 后端服务地址: http://localhost:5000", Colors.GREEN)
+            return process
+        process.terminate()
+        
+    except Exception as e:
+        print_colored(f"❌ 启动后端服务失败: {e}", Colors.FAIL)
+    
+    return None
+
+def start_backend(production=False, workers=None, threads=None, use_asgi=False):
     """启动后端服务"""
+    if production:
+        return start_production_backend(workers, threads, use_asgi)
+    if use_asgi:
+        return start_asgi_backend(threads)
+    
     print_colored("🚀 启动后端Flask服务...", Colors.BLUE)
     backend_dir = Path("backend")
     
@@ -201,6 +311,10 @@ def main():
     parser.add_argument('--frontend-only', action='store_true', help='只启动前端服务')
     parser.add_argument('--no-browser', action='store_true', help='不自动打开浏览器')
     parser.add_argument('--install-deps', action='store_true', help='强制重新安装依赖')
+    parser.add_argument('--production', action='store_true', help='后端以生产模式运行（gunicorn预加载多进程）')
+    parser.add_argument('--workers', type=int, help='生产模式的worker进程数（默认CPU核数）')
+    parser.add_argument('--threads', type=int, help='生产模式每个worker的线程数（默认4；ASGI模式为线程池大小，默认32）')
+    parser.add_argument('--asgi', action='store_true', help='后端以ASGI模式运行（uvicorn事件循环，适合大量并发连接）')
     
     args = parser.parse_args()
     
@@ -211,6 +325,7 @@ def main():
         sys.exit(1)
     
     processes = []
+    backend_process = None
     frontend_port = None
     
     try:
@@ -226,8 +341,10 @@ def main():
         print_colored("\n" + "="*60, Colors.HEADER)
         
         # 启动服务
+        backend_options = {'production': args.production, 'workers': args.workers, 'threads': args.threads,
+                           'use_asgi': args.asgi}
         if args.backend_only:
-            backend_process = start_backend()
+            backend_process = start_backend(**backend_options)
             if backend_process:
                 processes.append(backend_process)
                 
@@ -242,7 +359,7 @@ def main():
             # 同时启动前后端
             with ThreadPoolExecutor(max_workers=2) as executor:
                 # 先启动后端
-                backend_future = executor.submit(start_backend)
+                backend_future = executor.submit(start_backend, **backend_options)
                 
                 # 安装前端依赖并启动
                 if install_frontend_deps():
@@ -286,6 +403,10 @@ def main():
             except:
                 pass
         
+        # 生产模式下将启动脚本收到的SIGHUP转发给gunicorn主进程，平滑重启worker
+        if args.production and backend_process and hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: os.kill(backend_process.pid, signal.SIGHUP))
+        
         print_colored("\n⏳ 服务运行中...\n", Colors.BLUE)
         
         # 保持运行直到用户中断
@@ -314,7 +435,8 @@ def main():
             try:
                 if process.poll() is None:
                     process.terminate()
-                    process.wait(timeout=5)
+                    # gunicorn收到SIGTERM后等待进行中的请求完成
+                    process.wait(timeout=35 if args.production else 5)
                     print_colored(f"✅ 进程 {process.pid} 已停止", Colors.GREEN)
             except subprocess.TimeoutExpired:
                 process.kill()